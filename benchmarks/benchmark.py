@@ -0,0 +1,421 @@
+"""
+Benchmarks for serial round-trip latency and acquisition throughput.
+
+Runs against `use_the_force.simulator.SimulatedSensor`, so no hardware is needed (Linux only).
+
+    python benchmarks/benchmark.py                      # run and print the results
+    python benchmarks/benchmark.py --save 0.2.1         # store as benchmarks/baselines/0.2.1.json
+    python benchmarks/benchmark.py --compare 0.2.1      # report regressions against a stored baseline
+    python benchmarks/benchmark.py transport --port /dev/ttyUSB0   # SR round trip with and without low latency mode
+
+Keys ending in `_ms` or `_us` are lower-is-better, keys ending in `PerSecond` are higher-is-better.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+from time import perf_counter, perf_counter_ns, sleep
+from types import SimpleNamespace
+
+import numpy as np
+
+from use_the_force._logging import Logging
+from use_the_force.binaryLog import BinaryLogReader
+from use_the_force.calibration import CalibratedColumn
+from use_the_force.crParser import CRParser
+from use_the_force.forceSensor import ForceSensor
+from use_the_force.simulator import SimulatedSensor
+
+BASELINES: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def latencyStats(latencies: list[int]) -> dict[str, float]:
+    """
+    Summarises latencies in [ns] as a distribution in [ms].
+    """
+    values: np.ndarray = np.asarray(latencies, dtype=np.float64) / 1e6
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p90_ms": float(np.percentile(values, 90)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+        "max_ms": float(values.max()),
+    }
+
+
+def simulator(args: argparse.Namespace) -> SimulatedSensor:
+    return SimulatedSensor(
+        latency=args.latency, sampleRate=args.sampleRate, noise=50, homed=True
+    )
+
+
+def measureSR(sensor: ForceSensor, reads: int) -> list[int]:
+    """
+    Round trip times of `reads` calls of `Commands.SR()` [ns], after a few warm-up calls.
+    """
+    for _ in range(10):
+        sensor.cmds.SR()
+    latencies: list[int] = []
+    for _ in range(reads):
+        start: int = perf_counter_ns()
+        sensor.cmds.SR()
+        latencies.append(perf_counter_ns() - start)
+    return latencies
+
+
+def benchSR(args: argparse.Namespace) -> dict:
+    """
+    Latency distribution of a single `Commands.SR()` for every `stdDelay`.
+    """
+    results: dict = {}
+    for stdDelay in args.stdDelays:
+        with simulator(args) as sim:
+            sensor = ForceSensor(sim.port)
+            sensor.cmds.stdDelay = stdDelay
+            latencies: list[int] = measureSR(sensor, args.reads)
+            sensor.ClosePort()
+        results[f"stdDelay={stdDelay}"] = latencyStats(latencies)
+    return results
+
+
+def benchTransport(args: argparse.Namespace) -> dict:
+    """
+    Latency distribution of `Commands.SR()` with the low latency mode of the serial driver off and on.
+
+    Pseudo-terminals have no such mode, pass `--port` to measure a real USB-serial adapter.
+    """
+    results: dict = {}
+    for lowLatency in (False, True):
+        if args.port is None:
+            with simulator(args) as sim:
+                sensor = ForceSensor(sim.port, lowLatency=lowLatency, exclusive=True)
+                latencies: list[int] = measureSR(sensor, args.reads)
+                active: bool = sensor.lowLatencyActive
+                sensor.ClosePort()
+        else:
+            sensor = ForceSensor(args.port, lowLatency=lowLatency, exclusive=True)
+            latencies = measureSR(sensor, args.reads)
+            active = sensor.lowLatencyActive
+            sensor.ClosePort()
+        stats: dict = latencyStats(latencies)
+        stats["active"] = active
+        results[f"lowLatency={lowLatency}"] = stats
+    return results
+
+
+def benchRead(args: argparse.Namespace) -> dict:
+    """
+    Averaged reads per second as done by `mainLogWorker.read()`, for every `singleReadForces`.
+    """
+    results: dict = {}
+    with simulator(args) as sim:
+        sensor = ForceSensor(sim.port)
+        for singleReadForces in args.singleReadForces:
+            reads: int = max(10, args.reads // singleReadForces)
+            latencies: list[int] = []
+            for _ in range(reads):
+                start: int = perf_counter_ns()
+                sensor.cmds.SRBatch(singleReadForces)
+                latencies.append(perf_counter_ns() - start)
+            stats: dict[str, float] = latencyStats(latencies)
+            stats["readsPerSecond"] = 1e3 / stats["mean_ms"]
+            results[f"singleReadForces={singleReadForces}"] = stats
+        sensor.ClosePort()
+    return results
+
+
+def benchCR(args: argparse.Namespace) -> dict:
+    """
+    Sustained throughput of `ForceSensor.stream()` for every chunk size.
+    """
+    results: dict = {}
+    for chunk in args.chunks:
+        with simulator(args) as sim:
+            sensor = ForceSensor(sim.port)
+            samples = sensor.stream(chunk, 0)
+            deviceTimes: list[int] = []
+            start: float = perf_counter()
+            while perf_counter() - start < args.duration:
+                deviceTimes.append(next(samples)[0])
+            elapsed: float = perf_counter() - start
+            samples.close()
+            sensor.ClosePort()
+        intervals: np.ndarray = np.diff(deviceTimes)
+        results[f"chunk={chunk}"] = {
+            "samplesPerSecond": len(deviceTimes) / elapsed,
+            "intervalStd_ms": float(intervals.std()) if len(intervals) > 0 else 0.0,
+        }
+    return results
+
+
+def benchParse(args: argparse.Namespace) -> dict:
+    """
+    CPU time per sample to parse `CR` output, a line at a time and with `CRParser`, for every read size.
+
+    `perLine` only parses lines that are already split, `readLine` also splits them off the same reads
+    like `Commands._readLine()`, which is what `CR` did before `CRParser`.
+    """
+    samples: int = args.rows
+    output: bytes = b"".join(
+        b"[CR]: %d,%.1f\r\n" % (i, 411023 + i % 97) for i in range(samples)
+    )
+    sensor = ForceSensor()
+    start: int = perf_counter_ns()
+    for line in output.splitlines():
+        sensor.cmds._parseCRLine(line.decode(errors="replace").strip())
+    results: dict = {"perLine": {"perSample_us": (perf_counter_ns() - start) / samples / 1e3}}
+
+    for readSize in (64, 4096):
+        buffer: bytearray = bytearray()
+        start = perf_counter_ns()
+        for offset in range(0, len(output), readSize):
+            buffer += output[offset : offset + readSize]
+            index: int = buffer.find(b"\n")
+            while index >= 0:
+                rawLine: bytes = bytes(buffer[: index + 1])
+                del buffer[: index + 1]
+                sensor.cmds._parseCRLine(rawLine.decode(errors="replace").strip())
+                index = buffer.find(b"\n")
+        elapsed: int = perf_counter_ns() - start
+        results[f"readLine, read={readSize}"] = {"perSample_us": elapsed / samples / 1e3}
+
+    parser: CRParser = CRParser(samples)
+    for readSize in (64, 4096):
+        start = perf_counter_ns()
+        for offset in range(0, len(output), readSize):
+            parser.feed(output[offset : offset + readSize])
+        elapsed: int = perf_counter_ns() - start
+        parser.clear()
+        results[f"CRParser, read={readSize}"] = {"perSample_us": elapsed / samples / 1e3}
+    return results
+
+
+def benchLogWorker(args: argparse.Namespace) -> dict:
+    """
+    End-to-end rate of `mainLogWorker.run()`, with a thread doing the work of the plot timer.
+    """
+    try:
+        from use_the_force.gui.gui import mainLogWorker
+    except ImportError as e:
+        return {"skipped": str(e)}
+
+    results: dict = {}
+    configurations: list[tuple[bool, int, int, int]] = [
+        (stream, forces, skips, interval)
+        for stream in (False, True)
+        for forces in args.singleReadForces
+        for skips in (0, 10)
+        for interval in args.plotIntervals
+    ]
+    for streamMode, singleReadForces, singleReadSkips, plotInterval in configurations:
+        with simulator(args) as sim:
+            sensor = ForceSensor(sim.port)
+            caller = SimpleNamespace(
+                sensor=sensor,
+                velocity=60,
+                ui=SimpleNamespace(
+                    setStartPos=SimpleNamespace(value=lambda: sim.homePos),
+                    setEndPos=SimpleNamespace(value=lambda: sim.homePos),
+                    setTime=SimpleNamespace(value=lambda: args.duration),
+                    butSave=None,
+                ),
+                singleReadForces=singleReadForces,
+                singleReadSkips=singleReadSkips,
+                streamMode=streamMode,
+                streamChunk=1000,
+                streamInterval=0,
+                decimationFilter="boxcar",
+                recording=True,
+                threadReachedEnd=False,
+                plotIndexX=0,
+                data=[
+                    [],
+                    [],
+                    CalibratedColumn(sensor.ForceFix, lambda: sensor.calibrationVersion),
+                ],
+                enableElement=lambda *elements: None,
+            )
+            caller.butRecord = lambda: setattr(caller, "recording", False)
+
+            def plotTimer() -> None:
+                # the heavy part of `UserInterface.updatePlot()`
+                while caller.recording:
+                    forces: np.ndarray = np.asarray(caller.data[2], dtype=np.float64)
+                    if len(forces) > 0:
+                        forces.min()
+                        forces.max()
+                    sleep(plotInterval / 1000)
+
+            plotThread = threading.Thread(target=plotTimer, daemon=True)
+            worker = mainLogWorker(caller)
+            worker.logLess = True
+            plotThread.start()
+            worker.run()
+            caller.recording = False
+            plotThread.join()
+            sensor.ClosePort()
+
+        times: np.ndarray = np.asarray(caller.data[0])
+        intervals: np.ndarray = np.diff(times) * 1e3
+        key: str = (
+            f"stream={streamMode},singleReadForces={singleReadForces},"
+            f"singleReadSkips={singleReadSkips},plotInterval={plotInterval}"
+        )
+        results[key] = {
+            "samplesPerSecond": len(times) / max(times[-1], 1e-9),
+            "intervalStd_ms": float(intervals.std()) if len(intervals) > 0 else 0.0,
+        }
+    return results
+
+
+def benchWriteLog(args: argparse.Namespace) -> dict:
+    """
+    Cost per row of `Logging.writeLog()` for the caller, and including `closeFile()` for the rows to reach the file.
+    """
+    results: dict = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for neverCloseFile, background in ((False, False), (True, False), (False, True)):
+            log = Logging(
+                os.path.join(directory, f"bench_{neverCloseFile}_{background}.csv"),
+                neverCloseFile,
+                background=background,
+            )
+            log.createLogGUI()
+            start: int = perf_counter_ns()
+            for i in range(args.rows):
+                log.writeLog([i / 1000, i / 3000, 12.345678912])
+            elapsed: int = perf_counter_ns() - start
+            log.closeFile()
+            total: int = perf_counter_ns() - start
+            results[f"NeverCloseFile={neverCloseFile},background={background}"] = {
+                "perRow_us": elapsed / args.rows / 1e3,
+                "rowsPerSecond": args.rows / total * 1e9,
+            }
+    return results
+
+
+def benchLogFormat(args: argparse.Namespace) -> dict:
+    """
+    Time to save a whole recording with `Logging.writeLogFull()` and to load it back, as CSV and as binary log.
+    """
+    rows: int = args.rows * 10
+    data: list[np.ndarray] = [
+        np.arange(rows) / 1000,
+        np.arange(rows) / 3000,
+        np.random.default_rng(0).normal(12.3, 0.1, rows),
+    ]
+    results: dict = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for binary in (False, True):
+            log = Logging(os.path.join(directory, "bench.log"), binary=binary)
+            log.createLogGUI()
+            start: int = perf_counter_ns()
+            log.writeLogFull(data)
+            log.closeFile()
+            saved: int = perf_counter_ns() - start
+            start = perf_counter_ns()
+            if binary:
+                forces: np.ndarray = BinaryLogReader(log.full_filename).column("Force")
+            else:
+                forces = np.loadtxt(log.full_filename, delimiter=",", skiprows=1)[:, 2]
+            loaded: int = perf_counter_ns() - start
+            results[f"binary={binary}"] = {
+                "savePerRow_us": saved / rows / 1e3,
+                "loadPerRow_us": loaded / len(forces) / 1e3,
+                "bytesPerRow": os.path.getsize(log.full_filename) / rows,
+            }
+    return results
+
+
+BENCHMARKS = {
+    "SR": benchSR,
+    "transport": benchTransport,
+    "read": benchRead,
+    "CR": benchCR,
+    "parse": benchParse,
+    "mainLogWorker": benchLogWorker,
+    "writeLog": benchWriteLog,
+    "logFormat": benchLogFormat,
+}
+
+
+def compare(current: dict, baseline: dict, tolerance: float, path: str = "") -> list[str]:
+    """
+    Lists every value that got worse than the baseline by more than `tolerance`.
+    """
+    regressions: list[str] = []
+    for key, value in current.items():
+        if key not in baseline:
+            continue
+        name: str = f"{path}/{key}" if path else key
+        if isinstance(value, dict) and isinstance(baseline[key], dict):
+            regressions += compare(value, baseline[key], tolerance, name)
+        elif isinstance(value, (int, float)) and isinstance(baseline[key], (int, float)):
+            old: float = baseline[key]
+            if key.endswith(("_ms", "_us")) and value > old * (1 + tolerance):
+                regressions.append(f"{name}: {old:.4g} -> {value:.4g}")
+            elif key.endswith("PerSecond") and value < old * (1 - tolerance):
+                regressions.append(f"{name}: {old:.4g} -> {value:.4g}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "benchmarks", nargs="*", metavar="BENCHMARK", help=f"any of: {', '.join(BENCHMARKS)}"
+    )
+    parser.add_argument("--quick", action="store_true", help="fewer reads and shorter runs")
+    parser.add_argument("--latency", type=float, default=0.0005, help="simulated reply latency [s]")
+    parser.add_argument("--sample-rate", dest="sampleRate", type=float, default=1000.0)
+    parser.add_argument("--port", help="serial port of a real sensor for the transport benchmark")
+    parser.add_argument("--save", metavar="NAME", help="store results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name}")
+
+    args.reads = 200 if args.quick else 2000
+    args.rows = 2000 if args.quick else 20000
+    args.duration = 1.0 if args.quick else 5.0
+    args.stdDelays = [0.0, 0.005]
+    args.singleReadForces = [1, 5, 20]
+    args.chunks = [100, 1000]
+    args.plotIntervals = [200] if args.quick else [50, 200]
+
+    results: dict = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "sampleRate": args.sampleRate,
+            "quick": args.quick,
+        }
+    }
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"running {name}...", file=sys.stderr)
+        results[name] = BENCHMARKS[name](args)
+    print(json.dumps(results, indent=2))
+
+    if args.save:
+        os.makedirs(BASELINES, exist_ok=True)
+        with open(os.path.join(BASELINES, f"{args.save}.json"), "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(os.path.join(BASELINES, f"{args.compare}.json")) as file:
+            baseline: dict = json.load(file)
+        regressions: list[str] = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return int(len(regressions) > 0)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
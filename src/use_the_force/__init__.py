@@ -3,7 +3,49 @@ Small module to be used in the Use the Force! practicum at VU & UvA.
 """
 
 from use_the_force._logging import *
+from use_the_force.asyncSensor import *
+from use_the_force.binaryLog import *
+from use_the_force.calibration import *
+from use_the_force.clockSync import *
+from use_the_force.crParser import *
+from use_the_force.discovery import *
 from use_the_force.forceSensor import *
+from use_the_force.framing import *
+from use_the_force.journal import *
+from use_the_force.logWriter import *
+from use_the_force.metrics import *
 from use_the_force.plotting import *
+from use_the_force.runningStats import *
+from use_the_force.sensorGroup import *
+from use_the_force.serialReader import *
+from use_the_force.serialTrace import *
 
-__all__ = ["ForceSensor", "Logging", "Plotting", "Commands"]  # type: ignore
+__all__ = [
+    "ForceSensor",
+    "Logging",
+    "Plotting",
+    "Commands",
+    "Reply",
+    "SerialReader",
+    "RingBuffer",
+    "AsyncForceSensor",
+    "AsyncCommands",
+    "SensorGroup",
+    "ClockSync",
+    "Calibration",
+    "RunningStats",
+    "DiscoveredSensor",
+    "discover",
+    "Metrics",
+    "RecordingSerial",
+    "ReplaySerial",
+    "CRParser",
+    "Framer",
+    "FramingError",
+    "ReplyTimeout",
+    "LogWriter",
+    "BinaryLogWriter",
+    "BinaryLogReader",
+    "SessionJournal",
+    "recoverSession",
+]  # type: ignore
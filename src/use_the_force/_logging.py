@@ -1,27 +1,205 @@
+import os
+import re
+import shutil
+import warnings
+from functools import lru_cache
 from io import TextIOWrapper
+from itertools import islice
+from typing import Iterator
 
-__all__ = ["Logging"]
+import numpy as np
+
+from use_the_force.binaryLog import (
+    BINARY_EXTENSION,
+    BinaryLogReader,
+    BinaryLogWriter,
+    isBinaryLog,
+)
+from use_the_force.logWriter import LogWriter
+
+__all__ = ["Logging", "readCSV", "repairLog"]
+
+
+def repairLog(filename: str) -> int:
+    """
+    Cuts off a torn last row, as left behind by a crash while writing.
+
+    For a CSV that is everything after the last line ending, for a binary log an incomplete last chunk.
+
+    :param filename: CSV or binary log
+    :type filename: str
+
+    :returns: amount of bytes cut off
+    :rtype: int
+    """
+    size: int = os.path.getsize(filename)
+    end: int = size
+    if isBinaryLog(filename):
+        reader: BinaryLogReader = BinaryLogReader(filename)
+        end = reader.dataEnd
+        # the memory map has to be gone before the file can be truncated on Windows
+        del reader
+    else:
+        with open(filename, "rb") as file:
+            # far more than a single row
+            file.seek(max(0, size - 4096))
+            tail: bytes = file.read()
+        newline: int = tail.rfind(b"\n")
+        if newline >= 0:
+            end = size - len(tail) + newline + 1
+    if end < size:
+        os.truncate(filename, end)
+    return size - end
+
+
+# a single number as Python writes it, including nan and inf
+_NUMBER: str = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|[-+]?(?:nan|inf)"
+
+
+@lru_cache
+def _rowPattern(nColumns: int) -> re.Pattern:
+    """
+    Matches every line of `nColumns` comma separated numbers in a block of text.
+    """
+    return re.compile(
+        rf"^ *(?:{_NUMBER}) *(?:, *(?:{_NUMBER}) *){{{nColumns - 1}}}\r?$",
+        re.MULTILINE | re.IGNORECASE,
+    )
+
+
+def parseCSV(lines: list[str], nColumns: int) -> np.ndarray:
+    """
+    Parses lines of comma separated numbers into an array of shape `(rows, nColumns)`.
+
+    All lines are parsed with a single `np.loadtxt()` call. If one of them is not a row of `nColumns` numbers,
+    like a header or a torn last row, the rows are picked out with a single regular expression and the others skipped.
+    """
+    try:
+        with warnings.catch_warnings():
+            # only blank lines
+            warnings.simplefilter("ignore", UserWarning)
+            values: np.ndarray = np.loadtxt(lines, delimiter=",", ndmin=2)
+        if values.shape == (len(lines), nColumns):
+            return values
+    except ValueError:
+        pass
+
+    rows: list[str] = _rowPattern(nColumns).findall("".join(lines))
+    if len(rows) == 0:
+        return np.empty((0, nColumns))
+    return np.loadtxt(rows, delimiter=",", ndmin=2)
+
+
+def readCSV(
+    filename: str,
+    chunkRows: int = 65536,
+    start: float | None = None,
+    end: float | None = None,
+) -> Iterator[list[np.ndarray]]:
+    """
+    Reads a CSV log in blocks of rows, see `Logging.readLog()`.
+
+    The header is optional, the amount of columns is taken from the first row. Rows have to be in order of
+    time, the first column, reading stops after `end`.
+
+    :returns: generator of the columns of every block
+    :rtype: Iterator[list[np.ndarray]]
+    """
+    with open(filename, "r") as file:
+        first: str = file.readline()
+        nColumns: int = first.count(",") + 1
+        pending: list[str] = []
+        if len(parseCSV([first], nColumns)) > 0:
+            # no header
+            pending.append(first)
+        while True:
+            lines: list[str] = pending + list(islice(file, chunkRows - len(pending)))
+            pending = []
+            if len(lines) == 0:
+                return
+            block: np.ndarray = parseCSV(lines, nColumns)
+            if len(block) == 0:
+                continue
+            if end is not None and block[0, 0] > end:
+                return
+            if start is not None or end is not None:
+                times: np.ndarray = block[:, 0]
+                inWindow: np.ndarray = np.ones(len(block), dtype=bool)
+                if start is not None:
+                    inWindow &= times >= start
+                if end is not None:
+                    inWindow &= times <= end
+                block = block[inWindow]
+            if len(block) > 0:
+                yield [np.ascontiguousarray(column) for column in block.T]
 
 
 class Logging:
     def __init__(
-        self, filename: str = "", NeverCloseFile: bool = False, extension: str = ".csv"
+        self,
+        filename: str = "",
+        NeverCloseFile: bool = False,
+        extension: str = ".csv",
+        background: bool = False,
+        binary: bool = False,
+        undo: bool = False,
+        **kwargs,
     ) -> None:
         """
         Class to log the data from the force sensor
 
         Allows for multiple measurements to be taken with the files increasing the `_i` identifier.
+
+        With `background`, rows are written by a `LogWriter` thread, so `writeLog()` never waits for the disk:
+        >>> log = Logging("DATA/measurement.csv", background=True, fsyncInterval=5)
+        >>> log.createLogGUI()
+        >>> log.writeLog([0.001, 0.0, 12.345678912])
+        >>> log.closeFile()
+
+        With `binary`, rows are stored as typed columns with `BinaryLogWriter` instead of CSV,
+        see `exportCSV()` to get a CSV back:
+        >>> log = Logging("DATA/measurement.utflog", binary=True)
+
+        With `undo`, the offset at which every row starts is kept, so `deleteLastRow()` cuts the last row off
+        in constant time instead of rewriting the file.
+
+        :param background: write from a background thread, until `closeFile()`, CSV only
+        :type background: bool
+        :param binary: write a binary log instead of CSV
+        :type binary: bool
+        :param undo: keep track of the rows of a CSV for `deleteLastRow()`, always written directly
+        :type undo: bool
+        :param kwargs: passed on to the `LogWriter`, like `flushInterval` and `fsyncInterval`,
+            or the `BinaryLogWriter` with `binary`, like `metadata`
         """
         self.filename: str = filename
         self.full_filename: str
         self.HAND: TextIOWrapper
         self.NeverCloseFile: bool = NeverCloseFile
         self.extension: str = extension
+        self.background: bool = background
+        self.binary: bool = binary
+        self.writerOptions: dict = kwargs
+        self.writer: LogWriter | None = None
+        self.binaryLog: BinaryLogWriter | None = None
+        self.header: str = str()
+        self.undo: bool = undo
+        # byte offset of every row written, with `undo`
+        self.rowOffsets: list[int] = []
 
-    def createLog(self, ext: str = ".csv") -> None:
+    def createLog(
+        self, ext: str = ".csv", header: str = "Time,Displacement,Force"
+    ) -> None:
         """
         Creates a new file for logging.
+
+        :param ext: file extension, `BINARY_EXTENSION` for a binary log if left to `.csv`
+        :type ext: str
+        :param header: comma separated column names
+        :type header: str
         """
+        if self.binary and ext == ".csv":
+            ext = BINARY_EXTENSION
 
         # Check for a file that does not exist yet.
         i = 0
@@ -35,42 +213,123 @@ class Logging:
             except:
                 break
 
+        if self.createBinary(header):
+            return
+
         # Create this file.
         self.HAND = open(self.full_filename, "w+")
 
-        self.HAND.write("Time,Displacement,Force\n")
+        self.HAND.write(header + "\n")
+        self.rowOffsets.clear()
 
         if not self.NeverCloseFile:
             self.HAND.close()
+        self.startWriter()
 
-    def createLogGUI(self) -> None:
+    def createLogGUI(self, header: str = "Time,Displacement,Force") -> None:
         """
         Creates a new file for logging, GUI variant.
+
+        :param header: comma separated column names
+        :type header: str
         """
 
         # Check for a file that does not exist yet.
         self.full_filename = self.filename
+        if self.createBinary(header):
+            return
 
         # Create this file.
         self.HAND = open(self.full_filename, "w+")
-        self.HAND.write("Time,Displacement,Force\n")
+        self.HAND.write(header + "\n")
         self.HAND.close()
+        self.rowOffsets.clear()
         if self.NeverCloseFile:
             self.HAND = open(self.full_filename, "a+")
+        self.startWriter()
+
+    def createBinary(self, header: str) -> bool:
+        """
+        Creates `full_filename` as a binary log if `binary` is set.
+
+        :param header: comma separated column names
+        :type header: str
+
+        :returns: if a binary log was created
+        :rtype: bool
+        """
+        self.header = header
+        if not self.binary:
+            return False
+        if self.binaryLog is not None:
+            self.binaryLog.close()
+        self.binaryLog = BinaryLogWriter(
+            self.full_filename, header.split(","), **self.writerOptions
+        )
+        return True
+
+    def startWriter(self) -> None:
+        """
+        Starts the `LogWriter` if `background` is set, called when the log is created.
+        """
+        if not self.background or self.undo:
+            return
+        if self.writer is not None:
+            self.writer.stop()
+        if self.NeverCloseFile:
+            # the writer keeps its own handle
+            self.HAND.flush()
+        self.writer = LogWriter(self.full_filename, **self.writerOptions)
+        self.writer.start()
+
+    def flush(self, sync: bool = False) -> None:
+        """
+        Waits until every row written so far is in the file.
+
+        :param sync: also wait until the rows are on the disk
+        :type sync: bool
+        """
+        if self.binaryLog is not None:
+            self.binaryLog.flush(sync)
+        elif self.writer is not None:
+            self.writer.flush(sync=sync)
+        elif self.NeverCloseFile and hasattr(self, "HAND") and not self.HAND.closed:
+            self.HAND.flush()
+            if sync:
+                os.fsync(self.HAND.fileno())
 
     def replaceFile(self, data: list[float | int]):
+        if self.binaryLog is not None:
+            self.createBinary(self.header)
+            self.binaryLog.appendColumns(data)
+            return
+        # rows still queued would end up after the new contents, the writer appends after them again
+        self.flush()
+        writer, self.writer = self.writer, None
         self.HAND = open(self.full_filename, "w+t")
+        self.rowOffsets.clear()
         self.NeverCloseFile = True
         self.writeLogFull(data=data)
         self.NeverCloseFile = False
         self.HAND.close()
+        self.writer = writer
 
     ### ===LOGGING FUNCTION===###
     # Puts the values in the given list into the opened log file.
     def writeLog(self, data: list[float | int]) -> None:
+        if self.binaryLog is not None:
+            self.binaryLog.append(data)
+            return
+        if self.writer is not None:
+            self.writer.put(data)
+            return
+
         # Open file
         if not self.NeverCloseFile:
             self.HAND = open(self.full_filename, "a+")
+        if self.undo:
+            # where the row starts, to cut it off again in `deleteLastRow()`
+            self.rowOffsets.append(self.HAND.tell())
 
         # Write data
         for i, d in enumerate(data):
@@ -88,6 +347,13 @@ class Logging:
             self.HAND.close()
 
     def writeLogFull(self, data: list[float | int]) -> None:
+        if self.binaryLog is not None:
+            self.binaryLog.appendColumns(data)
+            return
+        if self.writer is not None:
+            self.writer.putColumns(data)
+            return
+
         # Open file
         if not self.NeverCloseFile:
             self.HAND = open(self.full_filename, "a+")
@@ -99,35 +365,96 @@ class Logging:
             for indexUnit in range(len(data)):
                 lineValues.append(str(data[indexUnit][indexData]))
             line = ",".join(lineValues) + "\n"
+            if self.undo:
+                self.rowOffsets.append(self.HAND.tell())
             self.HAND.write(line)
 
         # Close file
         if not self.NeverCloseFile:
             self.HAND.close()
 
+    def deleteLastRow(self) -> None:
+        """
+        Removes the last row written, in constant time, by cutting the file off where the row starts.
+
+        CSV logs need `undo`, binary logs can always drop their last row:
+        >>> log = Logging("DATA/mdm_in.csv", undo=True)
+        >>> log.createLogGUI()
+        >>> log.writeLog([0.0, 1.0, 12.3])
+        >>> log.deleteLastRow()
+
+        :raises ValueError: If there is no row left to delete, or no row was kept track of.
+        """
+        if self.binaryLog is not None:
+            self.binaryLog.pop()
+            return
+        if len(self.rowOffsets) == 0:
+            raise ValueError("no row to delete, rows are only kept track of with `undo`")
+        offset: int = self.rowOffsets.pop()
+        if self.NeverCloseFile and not self.HAND.closed:
+            self.HAND.truncate(offset)
+        else:
+            os.truncate(self.full_filename, offset)
+
     ### ===READ LOG===###
-    def readLog(self, *, filename: str | None = None) -> list[list[float]]:
+    def readLog(
+        self,
+        *,
+        filename: str | None = None,
+        chunkRows: int = 65536,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> Iterator[list[np.ndarray]]:
+        """
+        Reads a CSV or binary log in blocks of rows, so logs larger than memory can be processed:
+        >>> for times, positions, forces in log.readLog(start=10.0, end=20.0):
+        ...     print(forces.mean())
+
+        Binary logs are recognised by their header, whatever their extension, their columns keep the stored type
+        apart from the time. A torn or garbled line of a CSV, like the last one after a crash, is skipped.
+
+        :param filename: log to read, the log of this instance if `None`
+        :type filename: str | None
+        :param chunkRows: rows per block
+        :type chunkRows: int
+        :param start: first time to include [s], from the start if `None`
+        :type start: float | None
+        :param end: last time to include [s], up to the end if `None`
+        :type end: float | None
+
+        :returns: generator of the columns of every block, the first column being the time
+        :rtype: Iterator[list[np.ndarray]]
+        """
         if filename is None:
-            filename = self.filename
+            filename = getattr(self, "full_filename", self.filename)
+            self.flush()
 
-        if self.NeverCloseFile and filename is not None:
-            file = self.HAND
-        else:
-            file = open(filename, "r")
+        if isBinaryLog(filename):
+            return BinaryLogReader(filename).iterRows(chunkRows, start, end)
+        return readCSV(filename, chunkRows, start, end)
 
-        data = [[], [], []]
-        for line in file[1:]:
-            t, s, F = line.strip().split(",")
-            data[0].append(float(t))
-            data[1].append(float(s))
-            data[2].append(float(F))
+    def exportCSV(self, filename: str) -> None:
+        """
+        Writes the log as CSV with a header, converted from a binary log or copied as is.
 
-        file.close()
-        return data
+        :param filename: CSV file to write, overwritten if it exists
+        :type filename: str
+        """
+        self.flush()
+        if self.binary:
+            BinaryLogReader(self.full_filename).toCSV(filename)
+        else:
+            shutil.copyfile(self.full_filename, filename)
 
     ### ===MANUAL CLOSING FUNCTION===###
     # Closes file, irregardless of whether 'NeverCloseFile' is True.
     def closeFile(self) -> None:
+        if self.binaryLog is not None:
+            self.binaryLog.close()
+            return
+        if self.writer is not None:
+            writer, self.writer = self.writer, None
+            writer.stop()
         if self.NeverCloseFile:
             self.HAND.close()
         else:
@@ -0,0 +1,578 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator
+
+import numpy as np
+import serial
+
+from use_the_force.crParser import CRParser
+from use_the_force.framing import ERROR, REPLY, Framer, FramingError, ReplyTimeout
+from use_the_force.serialReader import parseSample
+
+__all__ = ["AsyncForceSensor", "AsyncCommands"]
+
+
+class AsyncForceSensor:
+    def __init__(self, PortName: str | None = None, **kwargs) -> None:
+        """
+        Asyncio variant of `ForceSensor`, so a single event loop can drive many sensors at once.
+
+        The port is opened with `open()` or by using the sensor as an async context manager:
+        >>> async with AsyncForceSensor("COM0") as sensor:
+        ...     await sensor.cmds.SR()
+        411023
+
+        :param PortName: Portname over which to establish the connection. If None, it has to be given to `open()`.
+        :type PortName: str | None
+        :param pollInterval: interval between checks for new data, only used if the port has no file descriptor [s]
+        :type pollInterval: float
+        :param onUnsolicited: called with every error line that arrived while no command was waiting for a reply, see `Framer`
+        :type onUnsolicited: Callable[[str], None] | None
+        """
+        self.tareValue: int = int(kwargs.pop("tareValue", 0))
+        self.tareRound: int = int(kwargs.pop("tareRound", 0))
+        self.loadPerCount: float = float(kwargs.pop("loadPerCount", 1.0))
+
+        self.PortName: str | None = PortName
+        # timeout=0 makes every read non-blocking
+        self.ser: serial.Serial = serial.Serial(
+            port=None, baudrate=115200, timeout=0, dsrdtr=False
+        )
+        self.cmds: AsyncCommands = AsyncCommands(
+            self.ser,
+            pollInterval=kwargs.pop("pollInterval", 0.001),
+            onUnsolicited=kwargs.pop("onUnsolicited", None),
+        )
+
+    async def __aenter__(self) -> "AsyncForceSensor":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def open(self, PortName: str | None = None) -> None:
+        """
+        Opens the serial connection and starts listening for data.
+
+        :param PortName: Portname over which to establish the connection, defaults to the one given before.
+        :type PortName: str | None
+        """
+        if PortName is not None:
+            self.PortName = PortName
+        if not self.ser.is_open:
+            self.ser.port = self.PortName
+            self.ser.open()
+            try:
+                self.ser.setRTS(False)
+                self.ser.setDTR(False)
+            except OSError:
+                # not every port has modem lines, e.g. pseudo-terminals
+                pass
+        self.cmds.attach()
+
+    async def close(self) -> None:
+        """
+        Always close after use.
+        """
+        self.cmds.detach()
+        self.ser.close()
+
+    async def tare(self, reads: int = 30, skips: int = 3) -> int:
+        """
+        Updates and returns the tare value by taking the average of `reads` reads.
+
+        All reads are sent at once and awaited together.
+
+        :param reads: amount of readings
+        :type reads: int
+        :param skips: initial reads to skip
+        :type skips: int
+
+        :returns: Tare value
+        :rtype: int
+        """
+        read_values: list[float] = await asyncio.gather(
+            *[self.cmds.SR() for _ in range(skips + reads)]
+        )
+        self.tareValue = round(sum(read_values[skips:]) / reads, self.tareRound)
+        return self.tareValue
+
+    def ForceFix(self, count: float) -> float:
+        """Corrects the units given based on tareValue and loadPerCount
+
+        Args:
+            count (float): sensor count
+
+        Returns:
+            float: calibrated units
+        """
+        return (count - self.tareValue) * self.loadPerCount
+
+    async def stream(
+        self, nReads: int = 1000, iReads: int = 0
+    ) -> AsyncIterator[tuple[int, float]]:
+        """
+        Continuously yields `(time, count)` pairs from the sensor, see `ForceSensor.stream()`.
+
+        >>> async for deviceTime, count in sensor.stream():
+        ...     if deviceTime > 10000:
+        ...         break
+
+        :param nReads: lines per `CR` chunk
+        :type nReads: int
+        :param iReads: interval inbetween lines [ms]
+        :type iReads: int
+
+        :returns: async generator of `(time, count)`
+        :rtype: AsyncIterator[tuple[int, float]]
+        """
+        while True:
+            samples = self.cmds.CRStream(nReads, iReads)
+            try:
+                async for sample in samples:
+                    yield sample
+            finally:
+                await samples.aclose()
+
+
+class AsyncCommands:
+    def __init__(self, serialConnection: serial.Serial, **kwargs) -> None:
+        """
+        Asyncio variant of `Commands`.
+
+        Every command is awaitable and commands can be in flight concurrently,
+        replies are matched back in the order the commands were sent.
+        There are no fixed delays, a command finishes as soon as its reply arrives.
+        Lines are recognised by `framer` and `CR` output is parsed by `CRParser`, the same as in `Commands`.
+
+        :param serialConnection: non-blocking serial connection to sensor, opened with `timeout=0`
+        :type serialConnection: Serial
+        :param timeout: maximum time to wait for a reply [s]
+        :type timeout: float
+        :param pollInterval: interval between checks for new data, only used if the port has no file descriptor [s]
+        :type pollInterval: float
+        :param onUnsolicited: called with every error line that arrived while no command was waiting for a reply, see `Framer`
+        :type onUnsolicited: Callable[[str], None] | None
+        """
+        self.serialConnection: serial.Serial = serialConnection
+        self.timeout: float = float(kwargs.pop("timeout", 5.0))
+        self.pollInterval: float = float(kwargs.pop("pollInterval", 0.001))
+        self.framer: Framer = Framer(kwargs.pop("onUnsolicited", None))
+
+        self.cmdStart: str = "#"
+        self.cmdArgSep: str = ","
+        self.cmdEnd: str = ";"
+
+        self.minPos: int = 1
+        self.maxPos: int = 46
+
+        self.verMajor: int = 0
+        self.verMinor: int = 0
+        self.verPatch: int = 0
+
+        self._pending: deque[tuple[str, asyncio.Future]] = deque()
+        self._partial: bytearray = bytearray()
+        # lines of the running `CR` still to come
+        self._crChunk: int = 0
+        self._crRemaining: int = 0
+        self._crParser: CRParser = CRParser()
+        # parsed blocks of the running `CR`: times, forces and the error that ended it
+        self._samples: asyncio.Queue[tuple[np.ndarray, np.ndarray, str | None]] = asyncio.Queue()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pollTask: asyncio.Task | None = None
+
+    def attach(self) -> None:
+        """
+        Starts listening for data on the running event loop.
+
+        Uses the file descriptor of the port if available, otherwise polls every `pollInterval`.
+        """
+        self._loop = asyncio.get_running_loop()
+        try:
+            self._loop.add_reader(self.serialConnection.fileno(), self._onReadable)
+        except (AttributeError, NotImplementedError):
+            self._pollTask = self._loop.create_task(self._poll())
+
+    def detach(self) -> None:
+        """
+        Stops listening for data, commands in flight are cancelled.
+        """
+        if self._pollTask is not None:
+            self._pollTask.cancel()
+            self._pollTask = None
+        elif self._loop is not None:
+            self._loop.remove_reader(self.serialConnection.fileno())
+        self._loop = None
+        while len(self._pending) > 0:
+            self._pending.popleft()[1].cancel()
+
+    def _onReadable(self) -> None:
+        try:
+            data: bytes = self.serialConnection.read(
+                max(1, self.serialConnection.in_waiting)
+            )
+        except (serial.SerialException, OSError):
+            self.detach()
+            return
+        self._feed(data)
+
+    async def _poll(self) -> None:
+        while True:
+            waiting: int = self.serialConnection.in_waiting
+            if waiting > 0:
+                self._feed(self.serialConnection.read(waiting))
+            else:
+                await asyncio.sleep(self.pollInterval)
+
+    def _feed(self, data: bytes) -> None:
+        """
+        Splits received bytes into lines and hands them to the running `CR` and the commands waiting for them.
+
+        While a `CR` runs and no other command waits, all complete lines go to `CRParser` at once.
+        """
+        self._partial += data
+        end: int = self._partial.rfind(b"\n") + 1
+        if end == 0:
+            return
+        block: bytes = bytes(self._partial[:end])
+        del self._partial[:end]
+        start: int = 0
+        while start < len(block):
+            if self._crRemaining > 0 and len(self._pending) == 0:
+                # the bytes after the end of the chunk are handled line by line
+                block, start = self._feedCR(block[start:]), 0
+                continue
+            index: int = block.index(b"\n", start) + 1
+            self._feedLine(block[start:index])
+            start = index
+
+    def _feedCR(self, data: bytes) -> bytes:
+        """
+        Parses complete lines of the running `CR` and queues the new samples for `CRStream()`.
+
+        Garbled lines count as a line, but are skipped and counted in `framer.dropped`.
+
+        :returns: bytes after the end of the chunk or after an error
+        :rtype: bytes
+        """
+        parser: CRParser = self._crParser
+        first: int = parser.length
+        skipped: int = parser.skipped
+        leftover: bytes = parser.feed(data, self._crChunk)
+        self.framer.dropped += parser.skipped - skipped
+        self._crRemaining = 0 if parser.error is not None else self._crChunk - parser.lines
+        if parser.length > first or self._crRemaining == 0:
+            self._samples.put_nowait(
+                (
+                    parser.times[first : parser.length].copy(),
+                    parser.forces[first : parser.length].copy(),
+                    parser.error,
+                )
+            )
+        return leftover
+
+    def _feedLine(self, rawLine: bytes) -> None:
+        """
+        Hands a single complete line to the running `CR` or to the oldest command waiting for a reply.
+        """
+        kind, _, line = self.framer.classify(rawLine.decode(errors="replace").strip())
+        if self._crRemaining > 0 and kind != REPLY:
+            # an error ends the running `CR`, but can also be the reply to a command in flight
+            self._feedCR(rawLine)
+            if kind != ERROR or len(self._pending) == 0:
+                return
+        if len(self._pending) == 0:
+            self.framer.unsolicitedLine(line)
+            return
+        cmd, future = self._pending[0]
+        try:
+            frame: str | None = self.framer.reply(line, cmd)
+        except FramingError as e:
+            if cmd == "AB":
+                # a garbled sample in the tail of the aborted `CR`
+                return
+            self._pending.popleft()
+            if not future.done():
+                future.set_exception(e)
+            if cmd == "CR":
+                # only the first line is lost, the rest of the chunk still follows
+                self._startCR()
+            return
+        if frame is None:
+            # stale, e.g. the tail of an aborted `CR`
+            return
+        self._pending.popleft()
+        if future.done():
+            # timed out, the late reply is dropped
+            return
+        if kind == ERROR:
+            future.set_exception(RuntimeError(frame))
+            return
+        if cmd == "CR":
+            self._startCR()
+        future.set_result(frame)
+
+    def _startCR(self) -> None:
+        """
+        Expects the lines of a `CR` chunk, after its first line.
+        """
+        self._crParser.clear()
+        self._crRemaining = self._crChunk
+
+    async def _query(self, cmd: str, args: str = "") -> str:
+        """
+        Sends a single command and waits for its reply.
+
+        :param cmd: command to send
+        :type cmd: str
+        :param args: formatted arguments of the command
+        :type args: str
+
+        :returns: return line
+        :rtype: str
+
+        :raises RunTimeError: If sensor encounters an error.
+        :raises FramingError: If the reply was garbled.
+        :raises ReplyTimeout: If no reply arrived within `timeout`.
+        """
+        if self._loop is None:
+            self.attach()
+        future: asyncio.Future = self._loop.create_future()
+        self._pending.append((cmd, future))
+        self.serialConnection.write(
+            f"{self.cmdStart}{cmd}{args}{self.cmdEnd}".encode()
+        )
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise ReplyTimeout(f"no reply on {cmd} within {self.timeout} s") from None
+
+    ########################
+    # 0 Arguments Commands #
+    ########################
+    async def AB(self) -> None:
+        """
+        ### Abort CR
+
+        Aborts the continous reading.
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        # the tail of the chunk that is still in flight is stale
+        self._crRemaining = 0
+        await self._query("AB")
+        while not self._samples.empty():
+            self._samples.get_nowait()
+
+    async def GP(self) -> int:
+        """
+        ### Get Position
+        Current position set in memory.
+
+        :return: End position if moving, else current position in [mm]
+        :rtype: int
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        return int((await self._query("GP")).split(": ")[-1])
+
+    async def GV(self) -> int:
+        """
+        ### Get Velocity
+        Returns the current velocity of the steppermotor stage in milimeters per second.
+
+        :return: End velocity if moving, else current velocity [mm/s]
+        :rtype: int
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        return int((await self._query("GV")).split(": ")[-1])
+
+    async def HM(self) -> None:
+        """
+        ### Home
+        Homes the steppermotor stage to the endstop.
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        await self._query("HM")
+
+    async def ID(self) -> str:
+        """
+        ### Motor ID
+
+        :returns: Motor ID
+        :rtype: str
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        return await self._query("ID")
+
+    async def SR(self) -> float:
+        """
+        ### Single Read
+        Reads the force a single time.
+
+        :return: read force
+        :rtype: float
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        return float((await self._query("SR")).split(": ")[-1])
+
+    async def ST(self) -> None:
+        """
+        ### Force Stop
+
+        Forces the motor to stop during movement.
+        Will need to home afterwards.
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        await self._query("ST")
+
+    async def TR(self) -> None:
+        """
+        ### Tare
+
+        Tares the display values by setting current reading as offset.
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        await self._query("TR")
+
+    async def VR(self) -> str:
+        """
+        ### Version
+
+        :returns: Firmware Version
+        :rtype: str
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        returnLine: str = await self._query("VR")
+        self.verMajor, self.verMinor, self.verPatch = map(
+            int, returnLine.split(": ")[-1].split(".")
+        )
+        return returnLine
+
+    #######################
+    # 1 Argument Commands #
+    #######################
+    async def DC(self, enable: bool = True) -> None:
+        """
+        ### Display Commands
+
+        :param enable: If commands should be displayed on sensor. Default: True
+        :type enable: bool
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        await self._query("DC", "" if enable else " false")
+
+    async def SP(self, position: int) -> None:
+        """
+        ### Set Position
+        Sets the position of the steppermotor stage in milimeters.
+
+        :param position: position to set from bottom [mm]
+        :type position: int
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        if position <= self.maxPos and position >= self.minPos:
+            await self._query("SP", f"{position}")
+        else:
+            raise ValueError(
+                f"Position {position} is out of range ({self.minPos}, {self.maxPos})"
+            )
+
+    async def SV(self, velocity: int) -> None:
+        """
+        ### Set Velocity
+
+        :param velocity: velocity to set [mm/s]
+        :type velocity: int
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        await self._query("SV", f"{velocity}")
+
+    ########################
+    # 2 Arguments Commands #
+    ########################
+    async def CR(self, nReads: int, iReads: int) -> list[list]:
+        """
+        ### Continuous Reading
+        Reads nReads times the force with an iReads interval inbetween.
+
+        :param nReads: number of lines to read
+        :type nReads: int
+        :param iReads: interval inbetween lines [ms]
+        :type iReads: int
+
+        :return: [[time], [force]]
+        :rtype: list[list[int], list[float]]
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        currentReads: list[list] = [[], []]
+        async for time, force in self.CRStream(nReads, iReads):
+            currentReads[0].append(time)
+            currentReads[1].append(force)
+        return currentReads
+
+    async def CRStream(
+        self, nReads: int, iReads: int
+    ) -> AsyncIterator[tuple[int, float]]:
+        """
+        ### Continuous Reading, streamed
+        Yields every line as soon as it arrives, closing it early aborts the reading with `AB`.
+
+        Garbled lines are skipped and counted in `framer.dropped`, see `Commands.CRStream()`.
+
+        :param nReads: number of lines to read
+        :type nReads: int
+        :param iReads: interval inbetween lines [ms]
+        :type iReads: int
+
+        :return: async generator of `(time, force)`
+        :rtype: AsyncIterator[tuple[int, float]]
+
+        :raises RunTimeError: If sensor encounters an error, or no lines arrived within `timeout`.
+        """
+        self._crChunk = nReads
+        try:
+            returnLine: str = await self._query(
+                "CR", f" {nReads}{self.cmdArgSep}{iReads}"
+            )
+        except FramingError:
+            # the rest of the chunk still follows
+            returnLine = str()
+        # all lines of the chunk have been yielded
+        ended: bool = False
+        try:
+            sample: tuple[int, float] | None = parseSample(returnLine)
+            if sample is not None:
+                yield sample
+            while not ended:
+                try:
+                    times, forces, error = await asyncio.wait_for(
+                        self._samples.get(), self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    raise RuntimeError(
+                        f"CR timed out after {self._crParser.lines} of {nReads} lines"
+                    ) from None
+                # the firmware stops on an error
+                ended = error is not None or (
+                    self._crRemaining == 0 and self._samples.empty()
+                )
+                for sample in zip(times.tolist(), forces.tolist()):
+                    yield sample
+                if error is not None:
+                    raise RuntimeError(error)
+        finally:
+            if not ended:
+                await self.AB()
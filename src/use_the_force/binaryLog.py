@@ -0,0 +1,413 @@
+import json
+import os
+import struct
+from threading import Lock
+from typing import Iterator
+
+import numpy as np
+
+__all__ = ["BinaryLogWriter", "BinaryLogReader", "BINARY_EXTENSION", "isBinaryLog"]
+
+BINARY_EXTENSION: str = ".utflog"
+
+# File layout: header, JSON schema, padding up to a multiple of 64 bytes, then chunks of equal size
+#   header: magic, format version, rows per chunk, length of the schema
+#   chunk: rows used (uint32), padding, then every column as `chunkRows` values of its type
+_MAGIC: bytes = b"UTFLOG\x00\x00"
+_VERSION: int = 1
+_HEADER: struct.Struct = struct.Struct("<8sB3xII")
+_ALIGNMENT: int = 64
+
+
+def isBinaryLog(filename: str) -> bool:
+    """
+    Checks if `filename` starts like a binary log, whatever its extension.
+    """
+    with open(filename, "rb") as file:
+        return file.read(len(_MAGIC)) == _MAGIC
+
+
+def chunkType(columns: list[dict], chunkRows: int) -> np.dtype:
+    """
+    Structured type of a single chunk.
+
+    :param columns: schema of every column, with `name` and `dtype`
+    :type columns: list[dict]
+    :param chunkRows: rows per chunk
+    :type chunkRows: int
+    """
+    return np.dtype(
+        [("rows", "<u4"), ("reserved", "<u4")]
+        + [(column["name"], column["dtype"], (chunkRows,)) for column in columns]
+    )
+
+
+class BinaryLogWriter:
+    def __init__(self, filename: str, columns: list[str], **kwargs) -> None:
+        """
+        Appends rows to a binary log of typed columns, written in chunks of `chunkRows` rows.
+
+        By default the first column is the time, stored as int64 nanoseconds, and all others as float32:
+        >>> log = BinaryLogWriter("DATA/measurement.utflog", ["Time", "Displacement", "Force"])
+        >>> log.append([0.001, 0.0, 12.345678912])
+        >>> log.close()
+
+        Values are stored multiplied by the `scale` of their column, so the time in seconds ends up in
+        nanoseconds. Only full chunks are written while appending, `flush()` also writes the one being filled.
+        Read it back with `BinaryLogReader`.
+
+        :param filename: file to write, overwritten if it exists
+        :type filename: str
+        :param columns: column names
+        :type columns: list[str]
+        :param dtypes: NumPy type of every column
+        :type dtypes: list[str]
+        :param scales: factor every value of a column is multiplied with before it is stored
+        :type scales: list[float]
+        :param chunkRows: rows per chunk, a multiple of 8
+        :type chunkRows: int
+        :param metadata: anything that can be stored as JSON, like the sensor and its calibration
+        :type metadata: dict
+        """
+        names: list[str] = list(columns)
+        dtypes: list[str] = list(kwargs.pop("dtypes", ["<i8"] + ["<f4"] * (len(names) - 1)))
+        scales: list[float] = list(kwargs.pop("scales", [1e9] + [1.0] * (len(names) - 1)))
+        self.chunkRows: int = int(kwargs.pop("chunkRows", 4096))
+        self.metadata: dict = dict(kwargs.pop("metadata", {}))
+        if not len(names) == len(dtypes) == len(scales):
+            raise ValueError("columns, dtypes and scales differ in length")
+        if self.chunkRows <= 0 or self.chunkRows % 8 != 0:
+            raise ValueError(f"chunkRows has to be a positive multiple of 8, got {self.chunkRows}")
+
+        self.filename: str = filename
+        self.columns: list[dict] = [
+            {"name": name, "dtype": np.dtype(dtype).str, "scale": float(scale)}
+            for name, dtype, scale in zip(names, dtypes, scales)
+        ]
+        self.names: list[str] = names
+        self._integer: list[bool] = [np.dtype(dtype).kind in "iu" for dtype in dtypes]
+        self._scales: list[float] = [float(scale) for scale in scales]
+
+        # rows appended in total
+        self.rows: int = 0
+        self._chunk: np.ndarray = np.zeros(1, dtype=chunkType(self.columns, self.chunkRows))
+        # every column of the chunk being filled
+        self._views: list[np.ndarray] = [self._chunk[name][0] for name in names]
+        self._fill: int = 0
+        # `flush()` may come from another thread than the rows, like a `SessionJournal`
+        self._lock: Lock = Lock()
+
+        schema: bytes = json.dumps(
+            {"columns": self.columns, "metadata": self.metadata}
+        ).encode()
+        header: bytes = _HEADER.pack(_MAGIC, _VERSION, self.chunkRows, len(schema)) + schema
+        header += b"\x00" * (-len(header) % _ALIGNMENT)
+        self._file = open(filename, "w+b")
+        self._file.write(header)
+        # position of the chunk being filled
+        self._offset: int = len(header)
+
+    def __enter__(self) -> "BinaryLogWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def append(self, row: list[float | int]) -> None:
+        """
+        Appends a single row, with a value for every column.
+        """
+        with self._lock:
+            for i, value in enumerate(row):
+                value = value * self._scales[i]
+                self._views[i][self._fill] = round(value) if self._integer[i] else value
+            self._fill += 1
+            self.rows += 1
+            if self._fill == self.chunkRows:
+                self._writeChunk()
+
+    def appendColumns(self, columns: list[list[float | int]]) -> None:
+        """
+        Appends columns of equal length at once.
+        """
+        values: list[np.ndarray] = [
+            np.asarray(column, dtype=np.float64) * scale
+            for column, scale in zip(columns, self._scales)
+        ]
+        values = [np.rint(v) if integer else v for v, integer in zip(values, self._integer)]
+        length: int = min((len(v) for v in values), default=0)
+        start: int = 0
+        with self._lock:
+            while start < length:
+                n: int = min(length - start, self.chunkRows - self._fill)
+                for view, v in zip(self._views, values):
+                    view[self._fill : self._fill + n] = v[start : start + n]
+                self._fill += n
+                self.rows += n
+                start += n
+                if self._fill == self.chunkRows:
+                    self._writeChunk()
+
+    def _writeChunk(self) -> None:
+        """
+        Writes the chunk being filled at its place in the file, moves on to the next one once it is full.
+        """
+        self._chunk["rows"] = self._fill
+        self._file.seek(self._offset)
+        self._file.write(self._chunk.tobytes())
+        if self._fill == self.chunkRows:
+            self._offset += self._chunk.nbytes
+            self._chunk[0] = 0
+            self._fill = 0
+
+    def pop(self) -> None:
+        """
+        Removes the last row, reading the previous chunk back if the current one is empty.
+
+        :raises ValueError: If there are no rows.
+        """
+        with self._lock:
+            if self.rows == 0:
+                raise ValueError("no row to remove")
+            if self._fill == 0:
+                self._offset -= self._chunk.nbytes
+                self._file.seek(self._offset)
+                self._chunk[:] = np.frombuffer(
+                    self._file.read(self._chunk.nbytes), dtype=self._chunk.dtype
+                )
+                self._fill = self.chunkRows
+            self._fill -= 1
+            self.rows -= 1
+            for view in self._views:
+                view[self._fill] = 0
+            if self._fill == 0:
+                # nothing left of this chunk, `flush()` only writes chunks with rows
+                self._file.truncate(self._offset)
+
+    def flush(self, sync: bool = False) -> None:
+        """
+        Writes all rows appended so far, including those of the chunk that is not full yet.
+
+        :param sync: also wait until they are on the disk
+        :type sync: bool
+        """
+        with self._lock:
+            self._flush(sync)
+
+    def _flush(self, sync: bool) -> None:
+        if self._file.closed:
+            return
+        if self._fill > 0:
+            self._writeChunk()
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._flush(False)
+                self._file.close()
+
+
+class BinaryLogReader:
+    def __init__(self, filename: str) -> None:
+        """
+        Reads a log written by `BinaryLogWriter` through a memory map, nothing is copied until it is used.
+
+        >>> log = BinaryLogReader("DATA/measurement.utflog")
+        >>> forces = log.column("Force")
+        >>> log.toCSV("DATA/measurement.csv")
+
+        `chunks` is the memory map itself, with a field per column of shape `(chunks, chunkRows)`.
+        Chunks that are not full yet, or were cut off by a crash, are left out or cut short by their row count.
+
+        :param filename: binary log
+        :type filename: str
+
+        :raises ValueError: If the file is not a binary log.
+        """
+        self.filename: str = filename
+        with open(filename, "rb") as file:
+            head: bytes = file.read(_HEADER.size)
+            if len(head) < _HEADER.size:
+                raise ValueError(f"{filename} is not a binary log")
+            magic, version, self.chunkRows, schemaLength = _HEADER.unpack(head)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{filename} is not a binary log of version {_VERSION}")
+            schema: dict = json.loads(file.read(schemaLength))
+        self.columns: list[dict] = schema["columns"]
+        self.metadata: dict = schema["metadata"]
+        self.names: list[str] = [column["name"] for column in self.columns]
+
+        # start of the first chunk
+        self.dataOffset: int = _HEADER.size + schemaLength
+        self.dataOffset += -self.dataOffset % _ALIGNMENT
+        dtype: np.dtype = chunkType(self.columns, self.chunkRows)
+        nChunks: int = max(0, os.path.getsize(filename) - self.dataOffset) // dtype.itemsize
+        self.chunks: np.ndarray
+        if nChunks > 0:
+            self.chunks = np.memmap(
+                filename, dtype=dtype, mode="r", offset=self.dataOffset, shape=(nChunks,)
+            )
+        else:
+            self.chunks = np.zeros(0, dtype=dtype)
+        # rows of every chunk, only the last one can be partially filled
+        self.counts: np.ndarray = np.minimum(self.chunks["rows"], self.chunkRows).astype(np.int64)
+        self.length: int = int(self.counts.sum())
+        # first row of every chunk, and the end of the last
+        self.starts: np.ndarray = np.concatenate([[0], np.cumsum(self.counts)])
+        # end of the last complete chunk
+        self.dataEnd: int = self.dataOffset + nChunks * dtype.itemsize
+
+    def __len__(self) -> int:
+        return self.length
+
+    def column(self, name: str, scaled: bool = True) -> np.ndarray:
+        """
+        All values of a column.
+
+        :param name: column name
+        :type name: str
+        :param scaled: divide by the scale of the column, turning the time back into seconds
+        :type scaled: bool
+
+        :returns: the values, as float64 if scaled and the stored type otherwise
+        :rtype: np.ndarray
+        """
+        index: int = self.names.index(name)
+        values: np.ndarray = self.chunks[name]
+        if np.all(self.counts[:-1] == self.chunkRows):
+            # all chunks but the last are full, so a slice of the flattened chunks is enough
+            values = values.reshape(-1)[: self.length]
+        else:
+            values = np.concatenate([v[:n] for v, n in zip(values, self.counts)])
+        scale: float = self.columns[index]["scale"]
+        if scaled and scale != 1.0:
+            return values / scale
+        return np.array(values)
+
+    def rows(self, name: str, first: int, last: int, scaled: bool = True) -> np.ndarray:
+        """
+        Rows `first` up to `last` of a column, only the chunks they are in are read.
+
+        :param name: column name
+        :type name: str
+        :param first: first row
+        :type first: int
+        :param last: row after the last one
+        :type last: int
+        :param scaled: divide by the scale of the column, turning the time back into seconds
+        :type scaled: bool
+
+        :returns: copy of the values, as float64 if scaled and the stored type otherwise
+        :rtype: np.ndarray
+        """
+        first, last = max(first, 0), min(last, self.length)
+        values: np.ndarray = self.chunks[name]
+        pieces: list[np.ndarray] = []
+        i: int = int(np.searchsorted(self.starts, first, side="right")) - 1
+        while first < last:
+            offset: int = first - int(self.starts[i])
+            n: int = min(last, int(self.starts[i + 1])) - first
+            pieces.append(values[i][offset : offset + n])
+            first += n
+            i += 1
+        result: np.ndarray = (
+            np.concatenate(pieces) if len(pieces) > 0 else np.zeros(0, dtype=values.dtype.base)
+        )
+        scale: float = self.columns[self.names.index(name)]["scale"]
+        if scaled and scale != 1.0:
+            return result / scale
+        return result
+
+    def search(self, value: float, name: str | None = None, side: str = "left") -> int:
+        """
+        First row at which an ascending column, the time by default, reaches `value`, like `numpy.searchsorted()`.
+
+        Only the first value of every chunk and a single chunk are read.
+
+        :param value: value to find, in the unit after scaling
+        :type value: float
+        :param name: column name, the first column if `None`
+        :type name: str | None
+        :param side: `"left"` for the first row not below `value`, `"right"` for the first row above it
+        :type side: str
+
+        :returns: row index, `len(self)` if no row qualifies
+        :rtype: int
+        """
+        name = name or self.names[0]
+        target: float = value * self.columns[self.names.index(name)]["scale"]
+        used: int = int(np.count_nonzero(self.counts))
+        if used == 0:
+            return 0
+        values: np.ndarray = self.chunks[name]
+        i: int = max(0, int(np.searchsorted(values[:used, 0], target, side=side)) - 1)
+        j: int = int(np.searchsorted(values[i][: self.counts[i]], target, side=side))
+        return int(self.starts[i]) + j
+
+    def iterRows(
+        self, chunkRows: int = 65536, start: float | None = None, end: float | None = None
+    ) -> Iterator[list[np.ndarray]]:
+        """
+        All columns in blocks of `chunkRows` rows, memory use does not grow with the size of the log.
+
+        :param chunkRows: rows per block
+        :type chunkRows: int
+        :param start: first time to include [s], `None` from the start
+        :type start: float | None
+        :param end: last time to include [s], `None` up to the end
+        :type end: float | None
+
+        :returns: generator of every column in a block, scaled back like `column()`
+        :rtype: Iterator[list[np.ndarray]]
+        """
+        first: int = 0 if start is None else self.search(start)
+        last: int = self.length
+        if end is not None:
+            last = self.search(end, side="right")
+        for row in range(first, last, chunkRows):
+            yield [self.rows(name, row, min(row + chunkRows, last)) for name in self.names]
+
+    def iterChunks(self) -> Iterator[dict[str, np.ndarray]]:
+        """
+        Every chunk as views on the memory map, without copying.
+
+        :returns: generator of `{name: values}` of every chunk
+        :rtype: Iterator[dict[str, np.ndarray]]
+        """
+        for chunk, count in zip(self.chunks, self.counts):
+            if count > 0:
+                yield {name: chunk[name][:count] for name in self.names}
+
+    def toCSV(self, filename: str) -> None:
+        """
+        Exports the log as CSV with a header, in the units of `Logging.writeLog()`.
+
+        :param filename: CSV file to write, overwritten if it exists
+        :type filename: str
+        """
+        formats: list[str] = []
+        for column in self.columns:
+            dtype: np.dtype = np.dtype(column["dtype"])
+            if dtype.kind in "iu":
+                decimals: int = int(np.ceil(np.log10(column["scale"]))) if column["scale"] > 1 else 0
+                formats.append(f"%.{decimals}f" if decimals > 0 else "%d")
+            else:
+                # enough digits to read back the same value
+                formats.append("%.9g" if dtype.itemsize <= 4 else "%.17g")
+        with open(filename, "w") as file:
+            file.write(",".join(self.names) + "\n")
+            for chunk in self.iterChunks():
+                values: list[np.ndarray] = [
+                    chunk[column["name"]] / column["scale"]
+                    if column["scale"] != 1.0
+                    else chunk[column["name"]]
+                    for column in self.columns
+                ]
+                np.savetxt(file, np.column_stack(values), fmt=formats, delimiter=",")
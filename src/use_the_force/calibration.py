@@ -0,0 +1,318 @@
+import json
+import os
+import re
+from threading import Lock
+from typing import Callable, Hashable, Iterator
+
+import numpy as np
+from numpy.polynomial import polynomial
+
+__all__ = ["Calibration", "CalibratedColumn"]
+
+
+class Calibration:
+    # Default location of saved calibrations, next to "DATA/" of the logs
+    directory: str = "CALIBRATION"
+
+    def __init__(self, coefficients: list[float] | None = None, **kwargs) -> None:
+        """
+        Polynomial from net counts (count - tareValue) to load, applied to whole arrays at once.
+
+        Fitted from a set of known loads, and saved per sensor ID so it only has to be done once:
+        >>> calibration = Calibration.fit(netCounts, loads, degree=2, sensorID="M5-01")
+        >>> calibration.save()
+        >>> calibration = Calibration.load("M5-01")
+        >>> forces = calibration.apply(counts, tareValue)
+
+        :param coefficients: polynomial coefficients, lowest order first
+        :type coefficients: list[float] | None
+        :param sensorID: ID of the calibrated sensor, see `Commands.ID()`
+        :type sensorID: str
+        :param unit: unit of the load
+        :type unit: str
+        :param points: `(net count, load)` pairs the polynomial was fitted on
+        :type points: list[tuple[float, float]]
+        """
+        if coefficients is None:
+            coefficients = [0.0, 1.0]
+        self.coefficients: np.ndarray = np.asarray(coefficients, dtype=np.float64)
+        self.sensorID: str = str(kwargs.pop("sensorID", ""))
+        self.unit: str = str(kwargs.pop("unit", ""))
+        self.points: list[tuple[float, float]] = [
+            (float(count), float(load)) for count, load in kwargs.pop("points", [])
+        ]
+
+    def __repr__(self) -> str:
+        return f"Calibration({self.coefficients.tolist()}, sensorID={self.sensorID!r})"
+
+    @property
+    def degree(self) -> int:
+        return len(self.coefficients) - 1
+
+    @classmethod
+    def fit(
+        cls, netCounts: np.ndarray, loads: np.ndarray, degree: int = 1, **kwargs
+    ) -> "Calibration":
+        """
+        Least squares fit of a polynomial through known loads.
+
+        :param netCounts: counts with the tare value subtracted, one per load
+        :type netCounts: np.ndarray
+        :param loads: known loads
+        :type loads: np.ndarray
+        :param degree: degree of the polynomial, 1 for linear
+        :type degree: int
+        :param kwargs: passed on to `Calibration()`
+
+        :returns: fitted calibration
+        :rtype: Calibration
+
+        :raises ValueError: If there are not more points than the degree.
+        """
+        netCounts = np.asarray(netCounts, dtype=np.float64)
+        loads = np.asarray(loads, dtype=np.float64)
+        if len(netCounts) != len(loads):
+            raise ValueError(f"got {len(netCounts)} counts for {len(loads)} loads")
+        if len(netCounts) <= degree:
+            raise ValueError(
+                f"a polynomial of degree {degree} needs at least {degree + 1} points, got {len(netCounts)}"
+            )
+        coefficients: np.ndarray = polynomial.polyfit(netCounts, loads, degree)
+        kwargs.setdefault("points", list(zip(netCounts.tolist(), loads.tolist())))
+        return cls(coefficients, **kwargs)
+
+    @property
+    def residuals(self) -> np.ndarray:
+        """
+        Load minus fitted load of every calibration point.
+        """
+        if len(self.points) == 0:
+            return np.empty(0)
+        netCounts, loads = np.asarray(self.points, dtype=np.float64).T
+        return loads - polynomial.polyval(netCounts, self.coefficients)
+
+    def apply(
+        self, counts: float | np.ndarray, tareValue: float = 0.0
+    ) -> float | np.ndarray:
+        """
+        Converts counts into loads.
+
+        :param counts: raw count or array of counts
+        :type counts: float | np.ndarray
+        :param tareValue: count without load
+        :type tareValue: float
+
+        :returns: load, or array of loads with the same shape
+        :rtype: float | np.ndarray
+        """
+        # Horner's method in place, so a long recording only needs a single extra array
+        net: np.ndarray = np.subtract(counts, tareValue, dtype=np.float64)
+        if self.degree == 0:
+            loads: np.ndarray = np.full_like(net, self.coefficients[0])
+        else:
+            loads = net * self.coefficients[-1]
+            for coefficient in self.coefficients[-2:0:-1]:
+                loads += coefficient
+                loads *= net
+            loads += self.coefficients[0]
+        return float(loads) if np.ndim(loads) == 0 else loads
+
+    def toDict(self) -> dict:
+        return {
+            "sensorID": self.sensorID,
+            "unit": self.unit,
+            "coefficients": self.coefficients.tolist(),
+            "points": self.points,
+        }
+
+    @classmethod
+    def fromDict(cls, data: dict) -> "Calibration":
+        return cls(
+            data["coefficients"],
+            sensorID=data.get("sensorID", ""),
+            unit=data.get("unit", ""),
+            points=data.get("points", []),
+        )
+
+    @classmethod
+    def path(cls, sensorID: str, directory: str | None = None) -> str:
+        """
+        File a calibration of `sensorID` is saved to by default.
+        """
+        if directory is None:
+            directory = cls.directory
+        name: str = re.sub(r"[^A-Za-z0-9_.-]", "_", sensorID) or "default"
+        return os.path.join(directory, name + ".json")
+
+    def save(self, filename: str | None = None) -> str:
+        """
+        Saves the calibration as JSON.
+
+        :param filename: file to write, by default `path(sensorID)`
+        :type filename: str | None
+
+        :returns: file written
+        :rtype: str
+        """
+        if filename is None:
+            filename = self.path(self.sensorID)
+        if os.path.dirname(filename) != "":
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, "w") as file:
+            json.dump(self.toDict(), file, indent=2)
+        return filename
+
+    @classmethod
+    def load(cls, sensorID: str, directory: str | None = None) -> "Calibration":
+        """
+        Loads the calibration saved for `sensorID`.
+
+        :param sensorID: ID of the sensor, see `Commands.ID()`
+        :type sensorID: str
+        :param directory: directory the calibration was saved in
+        :type directory: str | None
+
+        :returns: saved calibration
+        :rtype: Calibration
+
+        :raises FileNotFoundError: If the sensor was never calibrated.
+        """
+        return cls.loadFile(cls.path(sensorID, directory))
+
+    @classmethod
+    def loadFile(cls, filename: str) -> "Calibration":
+        """
+        Loads a calibration from a JSON file.
+        """
+        with open(filename, "r") as file:
+            return cls.fromDict(json.load(file))
+
+
+class CalibratedColumn:
+    def __init__(
+        self,
+        calibrate: Callable[[np.ndarray], np.ndarray],
+        version: Callable[[], Hashable],
+        counts: list[float] | None = None,
+        dtype: type = np.float32,
+    ) -> None:
+        """
+        Column of raw counts that reads as calibrated loads.
+
+        Only the raw counts are stored, the calibrated values are computed when read and cached.
+        Whenever `version()` changes, for example because the tare value changed, the cache is recomputed
+        from the raw counts, so a wrong calibration never spoils a measurement:
+        >>> column = CalibratedColumn(sensor.ForceFix, lambda: sensor.calibrationVersion)
+        >>> column.append(count)
+        >>> column[-1], column.values, column.raw
+
+        Supports the list operations used on data columns: `append`, `extend`, `pop`, `len`, indexing and iterating.
+        It can be appended to by one thread while others read it.
+
+        :param calibrate: converts an array of counts into loads
+        :type calibrate: Callable[[np.ndarray], np.ndarray]
+        :param version: value that changes whenever the result of `calibrate` changes
+        :type version: Callable[[], Hashable]
+        :param counts: initial raw counts
+        :type counts: list[float] | None
+        :param dtype: type the raw counts are stored as
+        :type dtype: type
+        """
+        self.calibrate: Callable[[np.ndarray], np.ndarray] = calibrate
+        self.version: Callable[[], Hashable] = version
+        self._raw: np.ndarray = np.empty(1024, dtype=dtype)
+        self._length: int = 0
+        # calibrated values of the first `_cached` counts
+        self._cache: np.ndarray = np.empty(len(self._raw), dtype=np.float64)
+        self._cached: int = 0
+        self._cacheVersion: Hashable = None
+        # guards the counts and the cache
+        self._lock: Lock = Lock()
+        if counts is not None:
+            self.extend(counts)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int | slice) -> float | np.ndarray:
+        return self.values[index]
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self.values)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return self.values if dtype is None else self.values.astype(dtype)
+
+    @property
+    def raw(self) -> np.ndarray:
+        """
+        Raw counts, without copying.
+        """
+        with self._lock:
+            return self._raw[: self._length]
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        Calibrated values, only the counts added since the last read are calibrated unless the version changed.
+        """
+        with self._lock:
+            return self._values()
+
+    def _values(self) -> np.ndarray:
+        length: int = self._length
+        if length == 0:
+            # nothing to calibrate, so the calibration does not have to exist yet
+            return self._cache[:0]
+        raw: np.ndarray = self._raw
+        version: Hashable = self.version()
+        if version != self._cacheVersion:
+            self._cached = 0
+            self._cacheVersion = version
+        if self._cached < length:
+            if len(self._cache) < len(raw):
+                self._cache = np.resize(self._cache, len(raw))
+            self._cache[self._cached : length] = self.calibrate(
+                raw[self._cached : length].astype(np.float64)
+            )
+            self._cached = length
+        return self._cache[:length]
+
+    def append(self, count: float) -> None:
+        """
+        Adds a single raw count.
+        """
+        with self._lock:
+            if self._length == len(self._raw):
+                self._raw = np.resize(self._raw, 2 * len(self._raw))
+            self._raw[self._length] = count
+            self._length += 1
+
+    def extend(self, counts: list[float] | np.ndarray) -> None:
+        """
+        Adds raw counts.
+        """
+        counts = np.asarray(counts, dtype=self._raw.dtype)
+        with self._lock:
+            needed: int = self._length + len(counts)
+            if needed > len(self._raw):
+                self._raw = np.resize(self._raw, max(needed, 2 * len(self._raw)))
+            self._raw[self._length : needed] = counts
+            self._length = needed
+
+    def pop(self) -> float:
+        """
+        Removes the last count, returns its calibrated value.
+        """
+        with self._lock:
+            if self._length == 0:
+                raise IndexError("pop from empty CalibratedColumn")
+            value: float = float(self._values()[-1])
+            self._length -= 1
+            self._cached = min(self._cached, self._length)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._length = 0
+            self._cached = 0
@@ -0,0 +1,132 @@
+from collections import deque
+from math import ceil
+from threading import Lock
+
+import numpy as np
+
+__all__ = ["ClockSync"]
+
+
+class ClockSync:
+    def __init__(self, **kwargs) -> None:
+        """
+        Estimates offset and drift of the firmware clock against the host `perf_counter_ns` clock.
+
+        Every request/response pair gives the host time before sending, the device time in the reply
+        and the host time after receiving. The device time is assumed to be halfway the round trip,
+        and a line is fitted through the pairs with the shortest round trips, as those have the least delay.
+        >>> sync = ClockSync()
+        >>> sync.add(hostSend, deviceTime, hostReceive)
+        >>> hostTime = sync.toHost(deviceTime)
+
+        :param window: amount of most recent pairs kept
+        :type window: int
+        :param quantile: fraction of the pairs with the shortest round trip used for the fit
+        :type quantile: float
+        :param minSpan: device time the pairs need to span before drift is estimated [s]
+        :type minSpan: float
+        :param deviceUnit: duration of a single device time unit [ns]
+        :type deviceUnit: int
+        """
+        self.window: int = int(kwargs.pop("window", 256))
+        self.quantile: float = float(kwargs.pop("quantile", 0.25))
+        self.minSpan: float = float(kwargs.pop("minSpan", 1.0))
+        self.deviceUnit: int = int(kwargs.pop("deviceUnit", 1_000_000))
+
+        # host time = offset + (1 + drift) * device time [ns]
+        self.offset: float = 0.0
+        self.drift: float = 0.0
+
+        self._pairs: deque[tuple[int, int, int]] = deque(maxlen=self.window)
+        self._stale: bool = False
+        self._lock: Lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+    def add(self, hostSend: int, deviceTime: int, hostReceive: int) -> None:
+        """
+        Adds a single request/response pair.
+
+        :param hostSend: host time just before the request was sent [ns]
+        :type hostSend: int
+        :param deviceTime: device time in the response
+        :type deviceTime: int
+        :param hostReceive: host time just after the response was received [ns]
+        :type hostReceive: int
+        """
+        with self._lock:
+            self._pairs.append((int(hostSend), int(deviceTime), int(hostReceive)))
+            self._stale = True
+
+    def clear(self) -> None:
+        """
+        Removes all pairs, for example after the device restarted.
+        """
+        with self._lock:
+            self._pairs.clear()
+            self.offset = 0.0
+            self.drift = 0.0
+            self._stale = False
+
+    @property
+    def roundTrip(self) -> int | None:
+        """
+        Shortest round trip of all pairs [ns], the uncertainty of the offset is half of it.
+        """
+        with self._lock:
+            if len(self._pairs) == 0:
+                return None
+            return min(receive - send for send, _, receive in self._pairs)
+
+    def fit(self) -> tuple[float, float]:
+        """
+        Fits offset and drift through the pairs with the shortest round trips.
+
+        :returns: offset [ns] and drift
+        :rtype: tuple[float, float]
+
+        :raises ValueError: If no pairs were added yet.
+        """
+        with self._lock:
+            if not self._stale:
+                return self.offset, self.drift
+            if len(self._pairs) == 0:
+                raise ValueError("ClockSync has no request/response pairs")
+            pairs: np.ndarray = np.array(self._pairs, dtype=np.float64)
+            self._stale = False
+
+        roundTrips: np.ndarray = pairs[:, 2] - pairs[:, 0]
+        keep: int = max(ceil(len(pairs) * self.quantile), min(len(pairs), 2))
+        best: np.ndarray = pairs[np.argsort(roundTrips, kind="stable")[:keep]]
+        device: np.ndarray = best[:, 1] * self.deviceUnit
+        host: np.ndarray = (best[:, 0] + best[:, 2]) / 2
+
+        # centred, so the fit is not dominated by the size of the timestamps
+        deviceMean: float = float(device.mean())
+        hostMean: float = float(host.mean())
+        slope: float = 1.0
+        if device.max() - device.min() >= self.minSpan * 1e9:
+            slope = float(
+                np.sum((device - deviceMean) * (host - hostMean))
+                / np.sum((device - deviceMean) ** 2)
+            )
+        with self._lock:
+            self.offset = hostMean - slope * deviceMean
+            self.drift = slope - 1.0
+            return self.offset, self.drift
+
+    def toHost(self, deviceTime: int | float | np.ndarray) -> float | np.ndarray:
+        """
+        Maps device timestamps onto the host `perf_counter_ns` clock.
+
+        :param deviceTime: device timestamp(s)
+        :type deviceTime: int | float | np.ndarray
+
+        :returns: host time(s) [ns]
+        :rtype: float | np.ndarray
+
+        :raises ValueError: If no pairs were added yet.
+        """
+        offset, drift = self.fit()
+        return offset + (1.0 + drift) * np.multiply(deviceTime, self.deviceUnit, dtype=np.float64)
@@ -0,0 +1,184 @@
+import re
+import warnings
+
+import numpy as np
+
+from use_the_force.serialReader import parseSample
+
+__all__ = ["CRParser"]
+
+# separators and line endings of `CR` output, all turned into spaces before parsing the numbers
+_SEPARATORS: bytes = bytes.maketrans(b";,\r\n", b"    ")
+_PREFIX: bytes = b"[CR]:"
+# a whole line with a single sample
+_SAMPLE: re.Pattern = re.compile(rb"\[CR\]: ?([-+]?\d+)[,;]([^\s,;]+)\r?\n")
+# blocks with fewer lines are converted without NumPy, which has a fixed cost per call
+_BULK_LINES: int = 32
+
+
+class CRParser:
+    def __init__(self, size: int = 1024) -> None:
+        """
+        Parses `CR` output in blocks of bytes straight into NumPy arrays.
+
+        Whole reads are fed at once into a buffer that is reused for every read, complete lines are parsed
+        together straight from that buffer and a trailing partial line stays in it for the next read:
+        >>> parser = CRParser()
+        >>> parser.feed(serialConnection.read(serialConnection.in_waiting))
+        >>> times, forces = parser.samples
+
+        A large block in which every line is a sample is converted with a single NumPy call, a small one with
+        a single regular expression, other blocks line by line, skipping garbled lines and stopping at an error.
+
+        :param size: initial capacity of the sample arrays, they grow when needed
+        :type size: int
+        """
+        self.times: np.ndarray = np.empty(size, dtype=np.int64)
+        self.forces: np.ndarray = np.empty(size, dtype=np.float64)
+        # samples in `times` and `forces`
+        self.length: int = 0
+        # complete lines consumed, including skipped lines and the error
+        self.lines: int = 0
+        # garbled lines
+        self.skipped: int = 0
+        # first error line, nothing after it is parsed
+        self.error: str | None = None
+        # received bytes that were not parsed yet
+        self._buffer: bytearray = bytearray()
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def samples(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Times and forces parsed so far, as views on the internal arrays.
+        """
+        return self.times[: self.length], self.forces[: self.length]
+
+    def clear(self) -> None:
+        """
+        Forgets all samples and the partial line, the arrays are reused.
+        """
+        self.length = 0
+        self.lines = 0
+        self.skipped = 0
+        self.error = None
+        self._buffer.clear()
+
+    def _reserve(self, size: int) -> None:
+        if size > len(self.times):
+            size = max(size, 2 * len(self.times))
+            self.times = np.resize(self.times, size)
+            self.forces = np.resize(self.forces, size)
+
+    def _take(self, start: int) -> bytes:
+        """
+        Empties the buffer, returns what is left of it from `start` on.
+        """
+        rest: bytes = bytes(self._buffer[start:])
+        self._buffer.clear()
+        return rest
+
+    def feed(self, data: bytes, maxLines: int | None = None) -> bytes:
+        """
+        Parses all complete lines in `data` and whatever was left over from the previous feed.
+
+        :param data: received bytes
+        :type data: bytes
+        :param maxLines: total amount of lines to consume, bytes after them are returned
+        :type maxLines: int | None
+
+        :returns: bytes that were not consumed, after `maxLines` lines or after an error
+        :rtype: bytes
+        """
+        buffer: bytearray = self._buffer
+        buffer += data
+        if self.error is not None or (maxLines is not None and self.lines >= maxLines):
+            return self._take(0)
+
+        available: int = buffer.count(b"\n")
+        count: int = available if maxLines is None else min(available, maxLines - self.lines)
+        if count == 0:
+            return b""
+        if count == available:
+            end: int = buffer.rfind(b"\n") + 1
+        else:
+            ends: np.ndarray = np.flatnonzero(np.frombuffer(buffer, dtype=np.uint8) == 0x0A)
+            end = int(ends[count - 1]) + 1
+
+        consumed: int = self._parse(end, count)
+        if consumed < end:
+            # stopped at an error, the rest is not part of the `CR` output
+            return self._take(consumed)
+        if maxLines is None or self.lines < maxLines:
+            del buffer[:end]
+            return b""
+        return self._take(end)
+
+    def _parse(self, end: int, count: int) -> int:
+        """
+        Parses the first `count` lines of the buffer, which end at `end`.
+
+        :returns: bytes consumed, less than `end` if an error line was found
+        :rtype: int
+        """
+        buffer: bytearray = self._buffer
+        if self.length + count > len(self.times):
+            self._reserve(self.length + count)
+        if count < _BULK_LINES:
+            # every line a sample: one match per line
+            samples: list[tuple[bytes, bytes]] = _SAMPLE.findall(buffer, 0, end)
+            if len(samples) == count:
+                times: np.ndarray = self.times
+                forces: np.ndarray = self.forces
+                length: int = self.length
+                try:
+                    for time, force in samples:
+                        times[length] = int(time)
+                        forces[length] = float(force)
+                        length += 1
+                except ValueError:
+                    # garbled numbers, like a force of only dots
+                    pass
+                else:
+                    self.length = length
+                    self.lines += count
+                    return end
+        # every line a sample: starts with the prefix and has a single separator
+        elif (
+            buffer.startswith(_PREFIX)
+            and buffer.count(b"\n" + _PREFIX, 0, end) == count - 1
+            and buffer.count(b",", 0, end) + buffer.count(b";", 0, end) == count
+        ):
+            text: bytes = bytes(buffer[:end].replace(_PREFIX, b"").translate(_SEPARATORS))
+            try:
+                with warnings.catch_warnings():
+                    # garbled numbers, NumPy warns about those and stops or raises, depending on its version
+                    warnings.simplefilter("ignore", DeprecationWarning)
+                    values: np.ndarray = np.fromstring(text, sep=" ")
+            except ValueError:
+                values = np.empty(0)
+            if len(values) == 2 * count:
+                self.times[self.length : self.length + count] = values[0::2]
+                self.forces[self.length : self.length + count] = values[1::2]
+                self.length += count
+                self.lines += count
+                return end
+
+        start: int = 0
+        for rawLine in buffer[:end].split(b"\n")[:count]:
+            start += len(rawLine) + 1
+            line: str = rawLine.decode(errors="replace").strip()
+            self.lines += 1
+            if line.split(":")[0] == "[ERROR]":
+                self.error = line
+                return start
+            sample: tuple[int, float] | None = parseSample(line)
+            if sample is None:
+                self.skipped += 1
+                continue
+            self._reserve(self.length + 1)
+            self.times[self.length], self.forces[self.length] = sample
+            self.length += 1
+        return end
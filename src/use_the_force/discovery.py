@@ -0,0 +1,164 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import serial
+from serial.tools import list_ports  # type: ignore
+
+from use_the_force.forceSensor import ForceSensor
+
+__all__ = ["DiscoveredSensor", "USB_IDS", "handshake", "probe", "candidates", "discover"]
+
+# USB vendor and product IDs of the serial adapters sensors come with:
+# the USB serial of the ESP32-S3 and the CH9102, CH340 and CP210x bridges
+USB_IDS: set[tuple[int, int]] = {
+    (0x303A, 0x1001),
+    (0x1A86, 0x55D4),
+    (0x1A86, 0x7523),
+    (0x10C4, 0xEA60),
+}
+# descriptions of the same adapters, for drivers that do not report USB IDs
+_DESCRIPTION: re.Pattern = re.compile(
+    r"CH9102|CH340|CP210|USB JTAG|USB Single Serial", re.IGNORECASE
+)
+
+
+class DiscoveredSensor(NamedTuple):
+    port: str
+    version: str
+    sensorID: str
+    description: str = ""
+
+
+def handshake(sensor: ForceSensor, retries: int = 5, timeout: float = 0.05) -> tuple[str, str]:
+    """
+    Checks that a sensor answers on its open port with `VR` and `ID`.
+
+    Every retry waits twice as long as the previous one, so a sensor that answers right away is done
+    in a single round trip, while one that is still booting after the port was opened gets
+    `timeout * (2 ** retries - 1)` seconds in total.
+
+    :param sensor: sensor with an open port
+    :type sensor: ForceSensor
+    :param retries: amount of attempts
+    :type retries: int
+    :param timeout: time to wait for the first attempt [s]
+    :type timeout: float
+
+    :returns: firmware version and sensor ID, the ID is empty if the firmware does not support it
+    :rtype: tuple[str, str]
+
+    :raises RuntimeError: If the sensor did not answer.
+    """
+    deadlines: dict[str, float | None] = dict(sensor.cmds.deadlines)
+    error: Exception | None = None
+    try:
+        for attempt in range(retries):
+            deadline: float = timeout * 2**attempt
+            sensor.cmds.deadlines.update(VR=deadline, ID=deadline)
+            try:
+                returnLine: str = sensor.cmds.VR()
+                if not returnLine.startswith("[VR]"):
+                    raise ValueError(f"unexpected answer: {returnLine}")
+                break
+            except (RuntimeError, ValueError) as e:
+                error = e
+        else:
+            raise RuntimeError(f"no answer on {sensor.ser.port}: {error}")
+
+        try:
+            sensorID: str = sensor.sensorID()
+        except (RuntimeError, ValueError):
+            sensorID = ""
+    finally:
+        sensor.cmds.deadlines.clear()
+        sensor.cmds.deadlines.update(deadlines)
+    return returnLine.split(": ")[-1], sensorID
+
+
+def probe(port: str, retries: int = 5, timeout: float = 0.05) -> DiscoveredSensor | None:
+    """
+    Opens `port` and checks if a sensor answers, see `handshake()`.
+
+    :param port: port to probe
+    :type port: str
+    :param retries: amount of attempts
+    :type retries: int
+    :param timeout: time to wait for the first attempt [s]
+    :type timeout: float
+
+    :returns: the sensor, or `None` if nothing answered
+    :rtype: DiscoveredSensor | None
+    """
+    try:
+        sensor: ForceSensor = ForceSensor(port)
+    except (serial.SerialException, OSError, ValueError):
+        return None
+    try:
+        version, sensorID = handshake(sensor, retries, timeout)
+    except (RuntimeError, serial.SerialException, OSError):
+        return None
+    finally:
+        sensor.ClosePort()
+    return DiscoveredSensor(port, version, sensorID)
+
+
+def candidates(scanAll: bool = False) -> list[str]:
+    """
+    Serial ports that look like a sensor, by the USB vendor and product ID in `USB_IDS` or by their description.
+
+    :param scanAll: every serial port of this computer instead
+    :type scanAll: bool
+
+    :returns: ports
+    :rtype: list[str]
+    """
+    return [
+        info.device
+        for info in list_ports.comports()
+        if scanAll
+        or (info.vid, info.pid) in USB_IDS
+        or _DESCRIPTION.search(info.description or "") is not None
+    ]
+
+
+def discover(
+    ports: list[str] | None = None,
+    retries: int = 5,
+    timeout: float = 0.05,
+    scanAll: bool = False,
+) -> list[DiscoveredSensor]:
+    """
+    Probes ports at the same time and returns the ones with a sensor.
+
+    Probing opens the port and sends `VR`, so only ports that look like a sensor are probed by default, see `candidates()`:
+    >>> for sensor in discover():
+    ...     print(sensor.port, sensor.version, sensor.sensorID)
+
+    :param ports: ports to probe, by default `candidates()`
+    :type ports: list[str] | None
+    :param retries: amount of attempts per port
+    :type retries: int
+    :param timeout: time to wait for the first attempt [s]
+    :type timeout: float
+    :param scanAll: probe every serial port of this computer, when `ports` is not given
+    :type scanAll: bool
+
+    :returns: sensors found, in the order of `ports`
+    :rtype: list[DiscoveredSensor]
+    """
+    descriptions: dict[str, str] = {
+        info.device: info.description for info in list_ports.comports()
+    }
+    if ports is None:
+        ports = candidates(scanAll)
+    if len(ports) == 0:
+        return []
+
+    with ThreadPoolExecutor(max_workers=len(ports)) as executor:
+        results = executor.map(lambda port: probe(port, retries, timeout), ports)
+        return [
+            result._replace(description=descriptions.get(result.port, ""))
+            for result in results
+            if result is not None
+        ]
@@ -0,0 +1,213 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+__all__ = ["Decimator", "Boxcar", "CIC", "FIR", "FILTERS", "decimationFactor"]
+
+
+def decimationFactor(inputRate: float, outputRate: float) -> int:
+    """
+    Decimation factor closest to going from `inputRate` to `outputRate`.
+
+    :param inputRate: sample rate of the raw stream [Hz]
+    :type inputRate: float
+    :param outputRate: wanted sample rate [Hz]
+    :type outputRate: float
+
+    :returns: decimation factor, at least 1
+    :rtype: int
+    """
+    return max(1, round(inputRate / outputRate))
+
+
+class Decimator:
+    def __init__(self, factor: int) -> None:
+        """
+        Base class of the decimation filters, turns a stream of samples into one output every `factor` samples.
+
+        Samples are processed in blocks of any length, the state needed to continue with the next block is kept,
+        so memory use does not depend on the length of the stream:
+        >>> decimator = Boxcar(10)
+        >>> decimator.process(np.array([[time, count], ...]))
+
+        Blocks are either 1D, or 2D with a column per channel. Filtering a time column along with the data
+        gives every output the time matching the delay of the filter.
+        Before the first sample, the stream is assumed to have been at the value of the first sample.
+
+        :param factor: amount of input samples per output sample
+        :type factor: int
+        """
+        if int(factor) < 1:
+            raise ValueError(f"decimation factor must be at least 1, got {factor}")
+        self.factor: int = int(factor)
+        # samples since the last output
+        self._phase: int = 0
+        # first sample, subtracted from the stream to keep the values small
+        self._reference: np.ndarray | None = None
+
+    @property
+    def delay(self) -> float:
+        """
+        Delay of the filter [input samples].
+        """
+        return (self.factor - 1) / 2
+
+    def reset(self) -> None:
+        """
+        Forgets the stream so far.
+        """
+        self._phase = 0
+        self._reference = None
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Filters a block of samples.
+
+        :param block: samples, 1D or with a column per channel
+        :type block: np.ndarray
+
+        :returns: filtered samples, one per `factor` input samples
+        :rtype: np.ndarray
+        """
+        block = np.asarray(block, dtype=np.float64)
+        flat: bool = block.ndim == 1
+        if flat:
+            block = block[:, np.newaxis]
+        if len(block) == 0:
+            output: np.ndarray = np.empty((0, block.shape[1]))
+        else:
+            if self._reference is None:
+                self._reference = block[0].copy()
+            elif len(self._reference) != block.shape[1]:
+                raise ValueError(
+                    f"block has {block.shape[1]} channels, expected {len(self._reference)}"
+                )
+            output = self._process(block - self._reference) + self._reference
+        return output[:, 0] if flat else output
+
+    def _process(self, block: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _outputIndices(self, length: int) -> np.ndarray:
+        """
+        Positions in the next block of `length` samples at which an output is due.
+        """
+        indices: np.ndarray = np.arange(self.factor - 1 - self._phase, length, self.factor)
+        self._phase = (self._phase + length) % self.factor
+        return indices
+
+
+class Boxcar(Decimator):
+    def __init__(self, factor: int) -> None:
+        """
+        Averages every `factor` samples, the same as averaging `singleReadForces` reads.
+
+        :param factor: amount of input samples per output sample
+        :type factor: int
+        """
+        super().__init__(factor)
+        self._partial: np.ndarray | None = None
+
+    def reset(self) -> None:
+        super().reset()
+        self._partial = None
+
+    def _process(self, block: np.ndarray) -> np.ndarray:
+        if self._partial is not None:
+            block = np.concatenate((self._partial, block))
+        full: int = len(block) - len(block) % self.factor
+        self._partial = block[full:]
+        return block[:full].reshape(-1, self.factor, block.shape[1]).mean(axis=1)
+
+
+class CIC(Decimator):
+    def __init__(self, factor: int, order: int = 3) -> None:
+        """
+        Cascaded integrator-comb filter, `order` boxcars in series at the cost of a few integer additions per sample.
+
+        Works on integers, so input is rounded, as are counts and device times.
+        `factor ** order` has to stay below 2 ** 32.
+
+        :param factor: amount of input samples per output sample
+        :type factor: int
+        :param order: amount of integrator and comb stages
+        :type order: int
+        """
+        super().__init__(factor)
+        if self.factor**order >= 2**32:
+            raise ValueError(f"factor ** order too large for a CIC: {self.factor}**{order}")
+        self.order: int = int(order)
+        self._integrators: np.ndarray | None = None
+        self._combs: np.ndarray | None = None
+
+    @property
+    def delay(self) -> float:
+        return self.order * (self.factor - 1) / 2
+
+    def reset(self) -> None:
+        super().reset()
+        self._integrators = None
+        self._combs = None
+
+    def _process(self, block: np.ndarray) -> np.ndarray:
+        if self._integrators is None:
+            self._integrators = np.zeros((self.order, block.shape[1]), dtype=np.int64)
+            self._combs = np.zeros((self.order, block.shape[1]), dtype=np.int64)
+
+        # the integrators wrap around, which cancels out in the combs
+        values: np.ndarray = np.rint(block).astype(np.int64)
+        for stage in range(self.order):
+            values = np.cumsum(values, axis=0) + self._integrators[stage]
+            self._integrators[stage] = values[-1]
+
+        values = values[self._outputIndices(len(block))]
+        for stage in range(self.order):
+            previous: np.ndarray = np.concatenate((self._combs[stage][np.newaxis], values))
+            if len(values) > 0:
+                self._combs[stage] = values[-1]
+            values = np.diff(previous, axis=0)
+        return values / self.factor**self.order
+
+
+class FIR(Decimator):
+    def __init__(self, factor: int, taps: np.ndarray | None = None, **kwargs) -> None:
+        """
+        Finite impulse response filter, only evaluated at the samples that are kept.
+
+        Without `taps`, a Hamming windowed sinc low-pass at the new Nyquist frequency is used.
+
+        :param factor: amount of input samples per output sample
+        :type factor: int
+        :param taps: filter coefficients
+        :type taps: np.ndarray | None
+        :param numTaps: amount of coefficients of the default low-pass
+        :type numTaps: int
+        """
+        super().__init__(factor)
+        if taps is None:
+            numTaps: int = int(kwargs.pop("numTaps", 8 * self.factor + 1))
+            n: np.ndarray = np.arange(numTaps) - (numTaps - 1) / 2
+            taps = np.sinc(n / self.factor) * np.hamming(numTaps)
+            taps /= taps.sum()
+        self.taps: np.ndarray = np.asarray(taps, dtype=np.float64)
+        self._history: np.ndarray | None = None
+
+    @property
+    def delay(self) -> float:
+        return (len(self.taps) - 1) / 2
+
+    def reset(self) -> None:
+        super().reset()
+        self._history = None
+
+    def _process(self, block: np.ndarray) -> np.ndarray:
+        if self._history is None:
+            self._history = np.zeros((len(self.taps) - 1, block.shape[1]))
+        values: np.ndarray = np.concatenate((self._history, block))
+        self._history = values[len(values) - len(self.taps) + 1 :]
+
+        # window `i` ends at sample `i` of the block
+        windows: np.ndarray = sliding_window_view(values, len(self.taps), axis=0)
+        return windows[self._outputIndices(len(block))] @ self.taps[::-1]
+
+
+FILTERS: dict[str, type[Decimator]] = {"boxcar": Boxcar, "cic": CIC, "fir": FIR}
@@ -1,7 +1,23 @@
-from time import perf_counter_ns, sleep
+from collections import deque
+from math import inf
+from concurrent.futures import Future
+from threading import RLock
+from select import select
+from time import perf_counter, perf_counter_ns
+from typing import Iterator
+import numpy as np
 import serial
 
-__all__ = ["ForceSensor", "Commands"]
+from use_the_force.calibration import Calibration
+from use_the_force.clockSync import ClockSync
+from use_the_force.crParser import CRParser
+from use_the_force.framing import ERROR, GARBAGE, SAMPLE, Framer, FramingError, ReplyTimeout
+from use_the_force.metrics import Metrics
+from use_the_force.runningStats import RunningStats
+from use_the_force.serialReader import SerialReader
+from use_the_force.serialTrace import RecordingSerial, ReplaySerial
+
+__all__ = ["ForceSensor", "Commands", "Reply"]
 
 
 class ForceSensor:
@@ -17,33 +33,79 @@ class ForceSensor:
 
         :param PortName: Portname over which to establish the connection. If None, the this class has to be called again with the port name.
         :type PortName: str | None
+        :param serialConnection: connection to use instead of a new `Serial`, for example a `ReplaySerial`
+        :type serialConnection: Serial
+        :param onUnsolicited: called with error lines that arrive while no command waits for a reply, see `Framer`
+        :type onUnsolicited: Callable[[str], None] | None
+        :param baudrate: baud rate of a new `Serial`
+        :type baudrate: int
+        :param timeout: read timeout of a new `Serial` [s], `None` waits forever
+        :type timeout: float | None
+        :param writeTimeout: write timeout of a new `Serial` [s], `None` waits forever
+        :type writeTimeout: float | None
+        :param interByteTimeout: maximum time between two bytes of a read [s], sets VMIN/VTIME on POSIX.
+            `None` keeps VMIN=0 and VTIME=0, so reads return as soon as bytes arrive.
+        :type interByteTimeout: float | None
+        :param exclusive: lock the port on POSIX, so no other program can open it at the same time
+        :type exclusive: bool | None
+        :param lowLatency: turn on the low latency mode of the driver (ASYNC_LOW_LATENCY, Linux only) when opening,
+            see `lowLatencyActive`
+        :type lowLatency: bool
         """
+        # Increased on every change of tareValue, loadPerCount or calibration, see `CalibratedColumn`
+        self.calibrationVersion: int = 0
         # The 'zero' volt value. Determined automatically each time.
         self.tareValue: int = int(kwargs.pop("tareValue", 0))
         self.tareRound: int = int(kwargs.pop("tareRound", 0))
-        self.loadPerCount: float = int(kwargs.pop("loadPerCount", 1.0))
+        # Spread of the counts during the last `tare()`
+        self.tareStd: float = 0.0
+        self.tareStats: RunningStats = RunningStats()
+        self.loadPerCount: float = float(kwargs.pop("loadPerCount", 1.0))
+        # Replaces the linear loadPerCount if set, see `fitCalibration()`
+        self.calibration: Calibration | None = kwargs.pop("calibration", None)
+        # (net count, load) pairs measured with `measureLoad()`
+        self.calibrationPoints: list[tuple[float, float]] = []
 
         self.minPos: int = int(kwargs.pop("minPos", 1))  # [mm]
         self.maxPos: int = int(kwargs.pop("maxPos", 46))  # [mm]
 
         self.T0: int = perf_counter_ns()
 
+        # USB-serial adapters like the FTDI ones hold back received bytes for up to 16 ms on Linux,
+        # unless the driver is put in low latency mode.
+        self.lowLatency: bool = bool(kwargs.pop("lowLatency", False))
+        # If the driver accepted the low latency mode, it does not for pseudo-terminals or on Windows
+        self.lowLatencyActive: bool = False
+
         ####### PORT INIT ######
         # The 'COM'-port depends on which plug is used at the back of the computer.
         # To find the correct port: go to Windows Settings, Search for Device Manager,
         # and click the tab "Ports (COM&LPT)".s
-        self.ser: serial.Serial = serial.Serial(
-            port=PortName, baudrate=115200, timeout=5, dsrdtr=False
-        )
-        self.ser.setRTS(False)
-        self.ser.setDTR(False)
+        # Opened below, so RTS and DTR are already low when the port opens.
+        self.ser: serial.Serial = kwargs.pop("serialConnection", None)
+        if self.ser is None:
+            self.ser = serial.Serial(
+                port=None,
+                baudrate=int(kwargs.pop("baudrate", 115200)),
+                timeout=kwargs.pop("timeout", 5),
+                write_timeout=kwargs.pop("writeTimeout", None),
+                inter_byte_timeout=kwargs.pop("interByteTimeout", None),
+                exclusive=kwargs.pop("exclusive", None),
+                dsrdtr=False,
+            )
+            self.ser.setRTS(False)
+            self.ser.setDTR(False)
 
-        self.cmds = Commands(self.ser)
+        self.cmds = Commands(self.ser, onUnsolicited=kwargs.pop("onUnsolicited", None))
+        # Per command counters and latencies, shared with `cmds`
+        self.metrics: Metrics = self.cmds.metrics
+        self.reader: SerialReader | None = None
+        # Device to host clock, updated by every `CR`
+        self.clockSync: ClockSync = ClockSync()
+        self.cmds.clockSync = self.clockSync
 
         if PortName is not None:
-            self.PortName = PortName.upper()
-            self.ser.setPort(self.PortName)
-            self.ser.open()
+            self(PortName)
 
     def __call__(self, PortName: str):
         """
@@ -56,27 +118,216 @@ class ForceSensor:
         :type PortName: str
         """
         if not self.ser.is_open:
-            self.PortName = PortName.upper()
+            # Windows port names are case insensitive, device paths are not
+            if PortName.upper().startswith("COM"):
+                PortName = PortName.upper()
+            self.PortName = PortName
             self.ser.setPort(self.PortName)
             self.ser.open()
+            if self.lowLatency:
+                self.setLowLatency(True)
+            self.cmds.invalidate()
 
-    def tare(self, reads: int = 30, skips: int = 3) -> int:
+    def setLowLatency(self, enable: bool = True) -> bool:
         """
-        Updates and returns the tare value by taking the average of `reads` reads.
+        Turns the low latency mode of the serial driver on or off (ASYNC_LOW_LATENCY, Linux only).
 
-        :param reads: amount of readings
+        Not every driver supports it, pseudo-terminals and most CDC-ACM devices do not:
+        >>> sensor = ForceSensor("/dev/ttyUSB0", lowLatency=True)
+        >>> sensor.lowLatencyActive
+        True
+
+        :param enable: turn the mode on or off
+        :type enable: bool
+
+        :returns: if the mode is on now
+        :rtype: bool
+        """
+        try:
+            self.ser.set_low_latency_mode(enable)
+        except (AttributeError, NotImplementedError, ValueError, OSError):
+            # not a Linux serial port, or the driver refused
+            self.lowLatencyActive = False
+        else:
+            self.lowLatencyActive = enable
+        return self.lowLatencyActive
+
+    def startReader(self, size: int = 65536) -> SerialReader:
+        """
+        Starts a background thread that drains the serial port, so no bytes wait on the port.
+
+        From then on `cmds` takes its bytes from the reader instead of the port,
+        and samples from `CR` can be read from `reader.samples` by any thread:
+        >>> reader = sensor.startReader()
+        >>> hostTime, deviceTime, force, index = reader.samples.since(0)
+
+        :param size: amount of samples kept in the ring buffer
+        :type size: int
+
+        :returns: the running reader
+        :rtype: SerialReader
+        """
+        if self.reader is None or not self.reader.is_alive():
+            self.reader = SerialReader(self.ser, size=size)
+            self.reader.start()
+            self.cmds.reader = self.reader
+        return self.reader
+
+    @classmethod
+    def replay(cls, filename: str, **kwargs) -> "ForceSensor":
+        """
+        Sensor that replays a trace written by `record()` instead of talking to hardware, see `ReplaySerial`.
+
+        The same commands as in the recording have to be sent, in the same order:
+        >>> sensor = ForceSensor.replay("session.trace", realtime=False)
+        >>> sensor.cmds.CR(1000, 0)
+
+        :param filename: trace file
+        :type filename: str
+        :param realtime: keep the timing of the recording, otherwise replay as fast as possible
+        :type realtime: bool
+        :param speed: replay speed relative to the recording, with `realtime`
+        :type speed: float
+        :param kwargs: passed on to `ForceSensor()`
+
+        :returns: sensor with the replay opened
+        :rtype: ForceSensor
+        """
+        connection: ReplaySerial = ReplaySerial(
+            filename,
+            realtime=kwargs.pop("realtime", True),
+            speed=kwargs.pop("speed", 1.0),
+        )
+        return cls(filename, serialConnection=connection, **kwargs)
+
+    def record(self, filename: str) -> RecordingSerial:
+        """
+        Writes every byte sent and received from now on to a binary trace file, see `replay()`.
+
+        :param filename: trace file, overwritten if it exists
+        :type filename: str
+
+        :returns: the recording connection, now `ser`
+        :rtype: RecordingSerial
+        """
+        self.stopRecording()
+        reader: bool = self.reader is not None
+        self.stopReader()
+        self.ser = RecordingSerial(self.ser, filename)
+        # also clears the cache, so cached queries end up in the trace as well
+        self.cmds(self.ser)
+        if reader:
+            self.startReader()
+        return self.ser
+
+    def stopRecording(self) -> None:
+        """
+        Stops `record()` and closes the trace file.
+        """
+        if not isinstance(self.ser, RecordingSerial):
+            return
+        reader: bool = self.reader is not None
+        self.stopReader()
+        self.ser = self.ser.stop()
+        self.cmds(self.ser)
+        if reader:
+            self.startReader()
+
+    def stopReader(self) -> None:
+        """
+        Stops the background reader, `cmds` reads from the port directly again.
+        """
+        if self.reader is not None:
+            self.reader.stop()
+            # bytes the reader took but `cmds` did not read yet stay in order
+            self.cmds._fill(perf_counter())
+            self.reader = None
+            self.cmds.reader = None
+
+    @property
+    def tareValue(self) -> float:
+        return self._tareValue
+
+    @tareValue.setter
+    def tareValue(self, value: float) -> None:
+        self._tareValue = value
+        self.calibrationVersion += 1
+
+    @property
+    def loadPerCount(self) -> float:
+        return self._loadPerCount
+
+    @loadPerCount.setter
+    def loadPerCount(self, value: float) -> None:
+        self._loadPerCount = value
+        self.calibrationVersion += 1
+
+    @property
+    def calibration(self) -> Calibration | None:
+        return self._calibration
+
+    @calibration.setter
+    def calibration(self, value: Calibration | None) -> None:
+        self._calibration = value
+        self.calibrationVersion += 1
+
+    def syncClock(self, pings: int = 16) -> ClockSync:
+        """
+        Estimates the device clock against the host clock with `pings` single line `CR` readings.
+
+        Streaming keeps the estimate up to date, as the first line of every chunk is used as well.
+        >>> sensor.syncClock()
+        >>> hostTime = sensor.clockSync.toHost(deviceTime)
+
+        :param pings: amount of request/response pairs
+        :type pings: int
+
+        :returns: clock sync of this sensor
+        :rtype: ClockSync
+        """
+        for _ in range(pings):
+            self.cmds.CR(0, 0)
+        return self.clockSync
+
+    def tare(
+        self, reads: int = 30, skips: int = 3, targetError: float | None = None
+    ) -> float:
+        """
+        Updates and returns the tare value, the mean of at most `reads` samples from `stream()`.
+
+        Stops as soon as the standard error of the mean drops below `targetError`, spikes are rejected.
+        The spread of the accepted samples is kept in `tareStd`, all statistics in `tareStats`.
+
+        :param reads: maximum amount of readings
         :type reads: int
         :param skips: initial lines to skip (and clear old values)
         :type skips: int
+        :param targetError: standard error to stop at [counts], by default half of the last digit kept by `tareRound`
+        :type targetError: float | None
 
         :returns: Tare value
-        :rtype: int
+        :rtype: float
         """
-        self.ser.reset_input_buffer()
-        self.ser.reset_output_buffer()
-        skips: list[float] = [self.cmds.SR() for _ in range(skips)]
-        read_values: list[float] = [self.cmds.SR() for _ in range(reads)]
-        self.tareValue = round(sum(read_values) / reads, self.tareRound)
+        if targetError is None:
+            targetError = 0.5 * 10 ** (-self.tareRound)
+        stats: RunningStats = RunningStats()
+        samples: Iterator[tuple[int, float]] = self.stream(reads + skips, 0)
+        with self.metrics.timed("tare"):
+            try:
+                for i, (_, count) in enumerate(samples):
+                    if i < skips:
+                        continue
+                    stats.add(count)
+                    if stats.count + stats.rejected >= reads or stats.stdError < targetError:
+                        break
+            finally:
+                samples.close()
+        if stats.count == 0:
+            raise RuntimeError("no valid samples to tare with")
+
+        self.tareStats = stats
+        self.tareStd = stats.std
+        self.tareValue = round(stats.mean, self.tareRound)
         return self.tareValue
 
     def updateLpC(self, load: float, reads: int = 10) -> float:
@@ -90,27 +341,125 @@ class ForceSensor:
         :returns: Load per Count
         :rtype: float
         """
-        read_values: list[float] = [self.cmd.SR() for i in range(reads)]
-        self.loadPerCount = load / int(sum(read_values) / reads)
+        read_values: list[float] = self.cmds.SRBatch(reads)
+        self.loadPerCount = load / (sum(read_values) / reads - self.tareValue)
         return self.loadPerCount
 
-    def ForceFix(self, count: float) -> float:
-        """Corrects the units given based on tareValue and loadPerCount
+    def sensorID(self) -> str:
+        """
+        ID of the sensor, used to save and load its calibration.
+        """
+        return self.cmds.ID().split(": ")[-1]
+
+    def measureLoad(self, load: float, reads: int = 10) -> float:
+        """
+        Adds a calibration point for a known load, see `fitCalibration()`.
+
+        :param load: Applied known load (Newton, gram, ...)
+        :type load: float
+        :param reads: Times to read load cell and take average
+        :type reads: int
+
+        :returns: net count (count - tareValue) for this load
+        :rtype: float
+        """
+        read_values: list[float] = self.cmds.SRBatch(reads)
+        netCount: float = sum(read_values) / reads - self.tareValue
+        self.calibrationPoints.append((netCount, float(load)))
+        return netCount
+
+    def fitCalibration(self, degree: int = 1, save: bool = True, **kwargs) -> Calibration:
+        """
+        Fits a calibration through all points of `measureLoad()` and uses it from then on.
+
+        >>> sensor.tare()
+        >>> for load in (0.0, 0.5, 1.0, 2.0):
+        ...     input(f"place {load} N")
+        ...     sensor.measureLoad(load)
+        >>> sensor.fitCalibration(degree=2)
+
+        :param degree: degree of the polynomial, 1 for linear
+        :type degree: int
+        :param save: save the calibration for this sensor ID
+        :type save: bool
+        :param kwargs: passed on to `Calibration()`
+
+        :returns: fitted calibration
+        :rtype: Calibration
+        """
+        netCounts, loads = zip(*self.calibrationPoints) if self.calibrationPoints else ((), ())
+        kwargs.setdefault("sensorID", self.sensorID())
+        self.calibration = Calibration.fit(netCounts, loads, degree, **kwargs)
+        if save:
+            self.calibration.save()
+        return self.calibration
+
+    def loadCalibration(self, directory: str | None = None) -> Calibration:
+        """
+        Loads and uses the calibration saved for this sensor ID.
+
+        :param directory: directory the calibration was saved in
+        :type directory: str | None
+
+        :returns: saved calibration
+        :rtype: Calibration
+
+        :raises FileNotFoundError: If the sensor was never calibrated.
+        """
+        self.calibration = Calibration.load(self.sensorID(), directory)
+        return self.calibration
+
+    def ForceFix(self, count: float | np.ndarray) -> float | np.ndarray:
+        """Corrects the units given based on tareValue and the calibration
+
+        Uses `calibration` if set, otherwise loadPerCount. Works on single counts and whole arrays.
 
         Args:
-            count (float): sensor count
+            count (float | np.ndarray): sensor count(s)
 
         Returns:
-            float: calibrated units
+            float | np.ndarray: calibrated units
         """
+        if self.calibration is not None:
+            return self.calibration.apply(count, self.tareValue)
         # The output, with gauge, in calibrated units.
         return (count - self.tareValue) * self.loadPerCount
 
+    def stream(self, nReads: int = 1000, iReads: int = 0) -> Iterator[tuple[int, float]]:
+        """
+        Continuously yields `(time, count)` pairs from the sensor.
+
+        Uses `CR` in chunks of `nReads` lines and starts the next chunk as soon as the previous one has ended,
+        so the stream only stops when the generator is closed. Closing it aborts the running chunk with `AB`.
+
+        >>> samples = sensor.stream()
+        >>> for deviceTime, count in samples:
+        ...     if deviceTime > 10000:
+        ...         break
+        >>> samples.close()
+
+        :param nReads: lines per `CR` chunk
+        :type nReads: int
+        :param iReads: interval inbetween lines [ms]
+        :type iReads: int
+
+        :returns: generator of `(time, count)`, with time as the device timestamp
+        :rtype: Iterator[tuple[int, float]]
+        """
+        while True:
+            yield from self.cmds.CRStream(nReads, iReads)
+
     def ClosePort(self) -> None:
         """
         Always close after use.
         """
+        self.stopRecording()
+        self.stopReader()
+        if self.lowLatencyActive and self.ser.is_open:
+            # the flag stays set on the device after closing
+            self.setLowLatency(False)
         self.ser.close()
+        self.cmds.invalidate()
 
 
 class Commands:
@@ -119,13 +468,28 @@ class Commands:
 
         For more explanation, see the firmware [GitHub](https://github.com/NatuurkundePracticumAmsterdam/use-the-force-firmware).
 
+        Replies are read as soon as they arrive, every command waits at most its deadline for a line,
+        see `deadline()`. A reply that misses its deadline raises `ReplyTimeout`, so a command that waits
+        on a movement needs a deadline longer than the movement.
+
         :param serialConnection: serial connection to sensor
         :type serialConnection: Serial
-        :param stdDelay: standard delay between sending a message and reading
+        :param stdDelay: deadline of every reply [s], 0 uses the timeout of the serial connection
         :type stdDelay: float
+        :param deadlines: deadline of the reply per command [s], overrides `stdDelay`, `None` waits forever.
+            `HM` and `SP` wait forever by default, the firmware replies once the stage has moved
+        :type deadlines: dict[str, float | None]
+        :param cacheTTL: time the reply on a query stays cached per command [s], see `invalidate()`
+        :type cacheTTL: dict[str, float]
+        :param metrics: collects per command counters and latencies, a new one by default
+        :type metrics: Metrics
+        :param onUnsolicited: called with error lines that arrive while no command waits for a reply, see `Framer`
+        :type onUnsolicited: Callable[[str], None] | None
         """
         self.serialConnection: serial.Serial = serialConnection
         self.stdDelay: float = float(kwargs.pop("stdDelay", 0.0))
+        self.deadlines: dict[str, float | None] = {"HM": None, "SP": None}
+        self.deadlines.update(kwargs.pop("deadlines", {}))
 
         self.cmdStart: str = "#"
         self.cmdArgSep: str = ","
@@ -137,6 +501,41 @@ class Commands:
         self.verMajor: int = 0
         self.verMinor: int = 0
         self.verPatch: int = 0
+        # Minimum firmware version per command, see `supports()`
+        self.minimumVersions: dict[str, tuple[int, int, int]] = {}
+
+        # Cached replies of queries without arguments: (time [s], return line)
+        # Commands that change the answer of a query invalidate it, as do errors, lines the sensor sent
+        # on its own and reconnecting. Only the answers that never change are cached by default.
+        self.cacheTTL: dict[str, float] = dict(
+            kwargs.pop("cacheTTL", {"VR": inf, "ID": inf})
+        )
+        self.invalidates: dict[str, tuple[str, ...]] = {
+            "SV": ("GV",),
+            "SP": ("GP",),
+            "HM": ("GP",),
+            "ST": ("GP",),
+        }
+        self._cache: dict[str, tuple[float, str]] = {}
+
+        # Background reader, see `ForceSensor.startReader()`
+        self.reader: SerialReader | None = None
+        # Gets a request/response pair from the first line of every `CR`
+        self.clockSync: ClockSync | None = None
+        self.metrics: Metrics = kwargs.pop("metrics", None) or Metrics()
+        # Matches lines to replies by their prefix and drops stale lines
+        self.framer: Framer = Framer(kwargs.pop("onUnsolicited", None))
+
+        # Pipelined commands, see `queue()`
+        self._lock: RLock = RLock()
+        self._pending: deque[Reply] = deque()
+        self._txBuffer: bytearray = bytearray()
+        # received bytes that do not form a complete line yet
+        self._rxBuffer: bytearray = bytearray()
+        # bytes of all lines read so far, see `metrics`
+        self._rxBytes: int = 0
+        # reused by every `CR`
+        self._crParser: CRParser = CRParser()
 
     def __call__(self, serialConnection: serial.Serial) -> None:
         """Change serial connection
@@ -145,14 +544,394 @@ class Commands:
         :type serialConnection: Serial
         """
         self.serialConnection = serialConnection
+        self.invalidate()
+
+    def _parseCRLine(self, returnLine: str) -> tuple[int, float]:
+        """
+        Parses a single line of `CR` output into `(time, force)`.
+
+        The first line of a chunk separates the values with `;`, all following lines with `,`.
+        """
+        time, force = returnLine.split(": ")[-1].replace(";", ",").split(",")
+        return int(time), float(force)
+
+    def _abortCR(self, remaining: int) -> None:
+        """
+        Aborts a running `CR` and skips the samples that were still in flight, up to the reply on `AB`.
+
+        :param remaining: lines of the chunk that were not read yet
+        :type remaining: int
+        """
+        with self._lock:
+            data: bytes = f"{self.cmdStart}AB{self.cmdEnd}".encode()
+            self.serialConnection.write(data)
+            self.metrics.sent("AB", len(data))
+            rxBytes: int = self._rxBytes
+            kind: str = GARBAGE
+            for _ in range(remaining + 1):
+                returnLine: str = self._readLine(self.deadline("AB"))
+                if returnLine == "":
+                    break
+                kind, _, returnLine = self.framer.classify(returnLine)
+                if kind == GARBAGE:
+                    self.framer.dropped += 1
+                elif kind != SAMPLE:
+                    break
+        error: bool = kind == ERROR
+        self.metrics.received("AB", self._rxBytes - rxBytes, error=error)
+        if error:
+            self.invalidate()
+            raise RuntimeError(returnLine)
+
+    def _syncClock(self, reply: "Reply", deviceTime: int) -> None:
+        """
+        Adds the first line of a `CR` as request/response pair to `clockSync`.
+        """
+        if self.clockSync is None or reply.sent is None or reply.received is None:
+            return
+        self.clockSync.add(reply.sent, deviceTime, reply.received)
+
+    def _poll(self) -> None:
+        """
+        Handles all complete lines that arrived while no command was in flight, without waiting for more.
+
+        Errors go to `framer.onUnsolicited`, anything else is stale and dropped, see `Framer.unsolicitedLine()`.
+        Either way the cache is cleared, as the sensor may have changed on its own, like after an aborted movement.
+        """
+        self._fill(perf_counter())
+        index: int = self._rxBuffer.find(b"\n")
+        if index >= 0:
+            self.invalidate()
+        while index >= 0:
+            rawLine: bytes = bytes(self._rxBuffer[: index + 1])
+            del self._rxBuffer[: index + 1]
+            self._rxBytes += len(rawLine)
+            self.framer.unsolicitedLine(rawLine.decode(errors="replace").strip())
+            index = self._rxBuffer.find(b"\n")
+
+    def deadline(self, cmd: str) -> float | None:
+        """
+        Maximum time to wait for a line of the reply on `cmd`, after which it raises `ReplyTimeout`.
+
+        :param cmd: command that was sent
+        :type cmd: str
+
+        :returns: deadline [s], `None` waits forever
+        :rtype: float | None
+        """
+        if cmd in self.deadlines:
+            return self.deadlines[cmd]
+        if self.stdDelay > 0:
+            return self.stdDelay
+        return self.serialConnection.timeout
+
+    def _readLine(self, timeout: float | None) -> str:
+        """
+        Reads a single line from the sensor.
+
+        Returns as soon as the line is complete, without waiting for more bytes than needed.
+
+        :param timeout: maximum time to wait [s], `None` waits forever
+        :type timeout: float | None
 
-    def _clearBuffer(self) -> None:
+        :returns: stripped line, empty if no complete line arrived in time
+        :rtype: str
+        """
+        end: float | None = None if timeout is None else perf_counter() + timeout
+        while True:
+            index: int = self._rxBuffer.find(b"\n")
+            if index >= 0:
+                rawLine: bytes = bytes(self._rxBuffer[: index + 1])
+                del self._rxBuffer[: index + 1]
+                self._rxBytes += len(rawLine)
+                return rawLine.decode(errors="replace").strip()
+            if not self._fill(end):
+                # a partial line stays, its end completes it into a stale line
+                return str()
+
+    def _fill(self, end: float | None) -> bool:
+        """
+        Moves everything that is waiting on the port, or in the background reader if running,
+        into the receive buffer, waits for it if nothing is.
+
+        :param end: `perf_counter()` time to wait until, `None` waits forever
+        :type end: float | None
+
+        :returns: if any bytes arrived in time
+        :rtype: bool
+        """
+        if self.reader is not None:
+            data, dropped = self.reader.read(None if end is None else max(end - perf_counter(), 0))
+            self.framer.dropped += dropped
+            self._rxBuffer += data
+            return len(data) > 0
+
+        try:
+            fileno: int | None = self.serialConnection.fileno()
+        except AttributeError:
+            # no file descriptor to wait on (Windows), block in `read()` instead
+            fileno = None
+        while True:
+            waiting: int = self.serialConnection.in_waiting
+            if waiting > 0:
+                self._rxBuffer += self.serialConnection.read(waiting)
+                return True
+            remaining: float | None = None if end is None else end - perf_counter()
+            if remaining is not None and remaining <= 0:
+                return False
+            if fileno is None:
+                data: bytes = self.serialConnection.read(1)
+                self._rxBuffer += data
+                return len(data) > 0
+            if len(select([fileno], [], [], remaining)[0]) == 0:
+                return False
+
+    def _readSamples(
+        self, nLines: int, timeout: float | None
+    ) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """
+        Reads `nLines` lines of `CR` output in blocks, parsed by `CRParser`.
+
+        Takes everything that arrived at once instead of a line at a time.
+        Garbled lines count as a line, but are skipped.
+
+        :param nLines: lines to read
+        :type nLines: int
+        :param timeout: maximum time to wait for the next bytes [s], `None` waits forever
+        :type timeout: float | None
+
+        :returns: generator of the times and forces parsed from every block, views on the arrays of `_crParser`
+        :rtype: Iterator[tuple[np.ndarray, np.ndarray]]
+
+        :raises RunTimeError: If sensor encounters an error, or no bytes arrived in time.
+        """
+        parser: CRParser = self._crParser
+        parser.clear()
+        while parser.lines < nLines:
+            if len(self._rxBuffer) == 0 and not self._fill(
+                None if timeout is None else perf_counter() + timeout
+            ):
+                break
+            data: bytes = bytes(self._rxBuffer)
+            self._rxBuffer.clear()
+
+            start: int = perf_counter_ns()
+            first: int = parser.length
+            lines: int = parser.lines
+            skipped: int = parser.skipped
+            leftover: bytes = parser.feed(data, nLines)
+            self.framer.dropped += parser.skipped - skipped
+            if len(leftover) > 0:
+                self._rxBuffer[:0] = leftover
+            self._rxBytes += len(data) - len(leftover)
+            if parser.lines > lines:
+                self.metrics.parsed("CR", (perf_counter_ns() - start) // (parser.lines - lines))
+            if parser.error is not None:
+                self.metrics.received("CR", 0, error=True)
+                self.invalidate()
+                raise RuntimeError(parser.error)
+            if parser.length > first:
+                times: np.ndarray = parser.times[first : parser.length]
+                forces: np.ndarray = parser.forces[first : parser.length]
+                if self.reader is not None:
+                    self.reader.samples.extend(self.reader.received, times, forces)
+                yield times, forces
+        if parser.lines < nLines:
+            raise RuntimeError(f"CR timed out after {parser.lines} of {nLines} lines")
+
+    def _resolveNext(self) -> None:
+        """
+        Reads the next line from the sensor and resolves the oldest reply in flight with it.
+        """
+        with self._lock:
+            if len(self._pending) == 0:
+                return
+            self.send()
+            reply: Reply = self._pending[0]
+            rxBytes: int = self._rxBytes
+            timeout: float | None = self.deadline(reply.cmd)
+            end: float | None = None if timeout is None else perf_counter() + timeout
+            framingError: FramingError | None = None
+            while True:
+                returnLine: str = self._readLine(None if end is None else max(end - perf_counter(), 0))
+                if returnLine == "":
+                    framingError = ReplyTimeout(f"no reply on {reply.cmd} within {timeout} s")
+                    break
+                try:
+                    frame: str | None = self.framer.reply(returnLine, reply.cmd)
+                except FramingError as e:
+                    framingError = e
+                    break
+                if frame is not None:
+                    returnLine = frame
+                    break
+            self._pending.popleft()
+            reply.received = perf_counter_ns()
+            rxBytes = self._rxBytes - rxBytes
+        error: bool = framingError is not None or returnLine.startswith("[ERROR]")
+        self.metrics.received(
+            reply.cmd,
+            rxBytes,
+            None if reply.sent is None else reply.received - reply.sent,
+            error,
+        )
+        if framingError is not None:
+            reply.set_exception(framingError)
+        elif error:
+            # errors like an aborted movement can change any cached answer
+            self.invalidate()
+            reply.set_exception(RuntimeError(returnLine))
+        else:
+            reply.set_result(returnLine)
+
+    def _query(self, cmd: str, args: str = "") -> str:
         """
-        Clears the serial buffer.
+        Sends a single command and waits for its reply.
+
+        Lines that arrived while no other commands were in flight are handled first, see `_poll()`.
+
+        :param cmd: command to send
+        :type cmd: str
+        :param args: formatted arguments of the command
+        :type args: str
+
+        :returns: return line
+        :rtype: str
+
+        :raises RunTimeError: If sensor encounters an error.
         """
-        self.serialConnection.flush()
-        self.serialConnection.reset_input_buffer()
-        self.serialConnection.reset_output_buffer()
+        cacheable: bool = args == "" and cmd in self.cacheTTL
+        if cacheable:
+            with self._lock:
+                if len(self._pending) == 0:
+                    # lines the sensor sent on its own clear the cache
+                    self._poll()
+            entry: tuple[float, str] | None = self._cache.get(cmd)
+            if entry is not None and perf_counter() - entry[0] < self.cacheTTL[cmd]:
+                return entry[1]
+        returnLine: str = self._queryReply(cmd, args).result()
+        if cacheable and returnLine.startswith(f"[{cmd}]"):
+            self._cache[cmd] = (perf_counter(), returnLine)
+        return returnLine
+
+    def _parseValue(self, returnLine: str, valueType: type) -> int | float:
+        """
+        Parses the value of a reply.
+
+        :raises FramingError: If the value is garbled.
+        """
+        try:
+            return valueType(returnLine.split(": ")[-1])
+        except ValueError:
+            self.framer.dropped += 1
+            raise FramingError(f"garbled value in reply: {returnLine!r}") from None
+
+    def invalidate(self, *cmds: str) -> None:
+        """
+        Removes cached replies, so the next query goes to the sensor again.
+
+        :param cmds: queries to invalidate, all if none are given
+        :type cmds: str
+        """
+        if len(cmds) == 0:
+            self._cache.clear()
+        for cmd in cmds:
+            self._cache.pop(cmd, None)
+
+    @property
+    def version(self) -> tuple[int, int, int]:
+        """
+        Firmware version, queried once with `VR`.
+        """
+        if (self.verMajor, self.verMinor, self.verPatch) == (0, 0, 0):
+            self.VR()
+        return self.verMajor, self.verMinor, self.verPatch
+
+    def supports(self, cmd: str) -> bool:
+        """
+        If the firmware is recent enough for `cmd`, according to `minimumVersions`.
+
+        :param cmd: command to check
+        :type cmd: str
+
+        :returns: `False` if the firmware is older than required for the command
+        :rtype: bool
+        """
+        if cmd not in self.minimumVersions:
+            return True
+        return self.version >= self.minimumVersions[cmd]
+
+    def _queryReply(self, cmd: str, args: str = "") -> "Reply":
+        """
+        Same as `_query()`, but returns the reply itself, with its send and receive times.
+        """
+        with self._lock:
+            if len(self._pending) == 0:
+                self._poll()
+            return self.submit(cmd, args)
+
+    def queue(self, cmd: str, args: str = "") -> "Reply":
+        """
+        Queues a command without sending it, `send()` writes all queued commands at once.
+
+        Replies are matched to the commands in the order they were queued and can be awaited at any later moment:
+        >>> replies = [commands.queue("SR") for _ in range(10)]
+        >>> commands.send()
+        >>> [reply.result() for reply in replies]
+
+        :param cmd: command to send
+        :type cmd: str
+        :param args: formatted arguments of the command
+        :type args: str
+
+        :returns: future for the return line
+        :rtype: Reply
+        """
+        reply: Reply = Reply(self, cmd)
+        self.invalidate(*self.invalidates.get(cmd, ()))
+        data: bytes = f"{self.cmdStart}{cmd}{args}{self.cmdEnd}".encode()
+        with self._lock:
+            self._txBuffer += data
+            self._pending.append(reply)
+        self.metrics.sent(cmd, len(data))
+        return reply
+
+    def send(self) -> None:
+        """
+        Sends all queued commands in a single write.
+        """
+        with self._lock:
+            if len(self._txBuffer) > 0:
+                sent: int = perf_counter_ns()
+                self.serialConnection.write(bytes(self._txBuffer))
+                self._txBuffer.clear()
+                for reply in reversed(self._pending):
+                    if reply.sent is not None:
+                        break
+                    reply.sent = sent
+
+    def submit(self, cmd: str, args: str = "") -> "Reply":
+        """
+        Queues and directly sends a single command, without waiting for the reply.
+
+        :param cmd: command to send
+        :type cmd: str
+        :param args: formatted arguments of the command
+        :type args: str
+
+        :returns: future for the return line
+        :rtype: Reply
+        """
+        reply: Reply = self.queue(cmd, args)
+        self.send()
+        return reply
+
+    def drain(self) -> None:
+        """
+        Waits until all replies in flight are received.
+        """
+        while len(self._pending) > 0:
+            self._resolveNext()
 
     def customCmd(self, cmd: str, *args) -> str:
         """Custom command
@@ -168,21 +947,13 @@ class Commands:
         :returns: return line
         :rtype: str
         """
-        self.serialConnection.flush()
-        cmdStr = f"{self.cmdStart}{cmd}"
+        argStr: str = str()
         if len(args) != 0:
-            cmdStr += f"{args[0]}"
+            argStr += f"{args[0]}"
             if len(args) - 1 != 0:
                 for argument in args[1:]:
-                    cmdStr += f"{self.cmdArgSep}{argument}"
-        cmdStr += f"{self.cmdEnd}"
-        self.serialConnection.write(cmdStr.encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
-        return returnLine
+                    argStr += f"{self.cmdArgSep}{argument}"
+        return self.submit(cmd, argStr).result()
 
     ########################
     # 0 Arguments Commands #
@@ -195,13 +966,7 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}AB{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
+        self._query("AB")
 
     def CM(self) -> str:
         """
@@ -217,14 +982,7 @@ class Commands:
         :returns: Returnline from sensor
         :rtype: str
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}CM{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
-        return returnLine
+        return self._query("CM")
 
     def CZ(self) -> str:
         """
@@ -240,14 +998,7 @@ class Commands:
         :returns: Returnline from sensor
         :rtype: str
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}CZ{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
-        return returnLine
+        return self._query("CZ")
 
     def GP(self) -> int:
         """
@@ -258,19 +1009,9 @@ class Commands:
         :rtype: int
 
         :raises RunTimeError: If sensor encounters an error.
+        :raises FramingError: If the reply is garbled, `ReplyTimeout` if it is missing.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}GP{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
-        else:
-            try:
-                return int(returnLine.split(": ")[-1])
-            except ValueError as e:
-                return e
+        return self._parseValue(self._query("GP"), int)
 
     def GV(self) -> int:
         """
@@ -281,16 +1022,9 @@ class Commands:
         :rtype: int
 
         :raises RunTimeError: If sensor encounters an error.
+        :raises FramingError: If the reply is garbled, `ReplyTimeout` if it is missing.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}GV{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
-        else:
-            return int(returnLine.split(": ")[-1])
+        return self._parseValue(self._query("GV"), int)
 
     def HE(self) -> ...:
         """
@@ -311,13 +1045,7 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}HM{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
+        self._query("HM")
 
     def ID(self) -> str:
         """
@@ -330,15 +1058,7 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}ID{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
-        else:
-            return returnLine
+        return self._query("ID")
 
     def SR(self) -> float:
         """
@@ -349,16 +1069,30 @@ class Commands:
         :rtype: float
 
         :raises RunTimeError: If sensor encounters an error.
+        :raises FramingError: If the reply is garbled, `ReplyTimeout` if it is missing.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}SR{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
-        else:
-            return float(returnLine.split(": ")[-1])
+        return self._parseValue(self._query("SR"), float)
+
+    def SRBatch(self, reads: int) -> list[float]:
+        """
+        ### Single Read, batched
+        Reads the force `reads` times, sending all `SR` commands in a single write.
+
+        :param reads: amount of readings
+        :type reads: int
+
+        :return: read forces
+        :rtype: list[float]
+
+        :raises RunTimeError: If sensor encounters an error.
+        :raises FramingError: If the reply is garbled, `ReplyTimeout` if it is missing.
+        """
+        with self._lock:
+            if len(self._pending) == 0:
+                self._poll()
+            replies: list[Reply] = [self.queue("SR") for _ in range(reads)]
+            self.send()
+        return [self._parseValue(reply.result(), float) for reply in replies]
 
     def ST(self) -> None:
         """
@@ -370,13 +1104,7 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}ST{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
+        self._query("ST")
 
     def TR(self) -> None:
         """
@@ -387,13 +1115,7 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}TR{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
+        self._query("TR")
 
     def VR(self) -> str:
         """
@@ -406,18 +1128,11 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}VR{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
-        else:
-            self.verMajor, self.verMinor, self.verPatch = map(
-                int, returnLine.split(": ")[-1].split(".")
-            )
-            return returnLine
+        returnLine: str = self._query("VR")
+        self.verMajor, self.verMinor, self.verPatch = map(
+            int, returnLine.split(": ")[-1].split(".")
+        )
+        return returnLine
 
     #######################
     # 1 Argument Commands #
@@ -433,17 +1148,10 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
         if not enable:
-            self.serialConnection.write(
-                f"{self.cmdStart}DC false{self.cmdEnd}".encode()
-            )
+            self._query("DC", " false")
         else:
-            self.serialConnection.write(f"{self.cmdStart}DC{self.cmdEnd}".encode())
-
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
+            self._query("DC")
 
     def SF(self, calibrationForce: float) -> None:
         """
@@ -457,15 +1165,7 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(
-            f"{self.cmdStart}SF {calibrationForce}{self.cmdEnd}".encode()
-        )
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
+        self._query("SF", f" {calibrationForce}")
 
     def SP(self, position: int) -> None:
         """
@@ -477,17 +1177,8 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
         if position <= self.maxPos and position >= self.minPos:
-            self.serialConnection.flush()
-            self.serialConnection.write(
-                f"{self.cmdStart}SP{position}{self.cmdEnd}".encode()
-            )
-            if self.stdDelay > 0:
-                sleep(self.stdDelay)
-            returnLine: str = self.serialConnection.read_until().decode().strip()
-            if returnLine.split(":")[0] == "[ERROR]":
-                raise RuntimeError(returnLine)
+            self._query("SP", f"{position}")
         else:
             raise ValueError(
                 f"Position {position} is out of range ({self.minPos}, {self.maxPos})"
@@ -503,15 +1194,7 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(
-            f"{self.cmdStart}SV{velocity}{self.cmdEnd}".encode()
-        )
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
+        self._query("SV", f"{velocity}")
 
     def UL(self, lineHeight: int) -> None:
         """
@@ -524,15 +1207,7 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(
-            f"{self.cmdStart}UL{lineHeight}{self.cmdEnd}".encode()
-        )
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
+        self._query("UL", f"{lineHeight}")
 
     def UU(self, unit: str) -> None:
         """
@@ -545,13 +1220,7 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}UU{unit}{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
+        self._query("UU", f"{unit}")
 
     def UX(self, xOffset: int) -> None:
         """
@@ -564,13 +1233,7 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}UX{xOffset}{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
+        self._query("UX", f"{xOffset}")
 
     def UY(self, yOffset: int) -> None:
         """
@@ -583,13 +1246,7 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(f"{self.cmdStart}UY{yOffset}{self.cmdEnd}".encode())
-        if self.stdDelay > 0:
-            sleep(self.stdDelay)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
+        self._query("UY", f"{yOffset}")
 
     ########################
     # 2 Arguments Commands #
@@ -599,6 +1256,8 @@ class Commands:
         ### Continuous Reading
         Reads nReads times the force with an iReads interval inbetween.
 
+        Garbled lines are skipped, see `CRArrays`.
+
         :param nReads: number of lines to read
         :type nReads: int
         :param iReads: interval inbetween lines [ms]
@@ -609,28 +1268,140 @@ class Commands:
 
         :raises RunTimeError: If sensor encounters an error.
         """
-        self._clearBuffer()
-        self.serialConnection.write(
-            f"{self.cmdStart}CR {nReads}{self.cmdArgSep}{iReads}{self.cmdEnd}".encode()
-        )
-        sleep(self.stdDelay + iReads / 1000)
-        returnLine: str = self.serialConnection.read_until().decode().strip()
-        if returnLine.split(":")[0] == "[ERROR]":
-            raise RuntimeError(returnLine)
-        else:
-            time, force = returnLine.split(": ")[-1].split(";")
-            time = int(time)
-            force = float(force)
-            currentReads = [[time], [force]]
-
-            for i in range(nReads):
-                returnLine = self.serialConnection.read_until().decode().strip()
-                if returnLine.split(":")[0] == "[ERROR]":
-                    raise RuntimeError(returnLine)
-                else:
-                    time, force = returnLine.split(": ")[-1].split(",")
-                    time = int(time)
-                    force = float(force)
-                    currentReads[0].append(time)
-                    currentReads[1].append(force)
-            return currentReads
+        times, forces = self.CRArrays(nReads, iReads)
+        return [times.tolist(), forces.tolist()]
+
+    def CRArrays(self, nReads: int, iReads: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        ### Continuous Reading, as arrays
+        Same as `CR`, but returns NumPy arrays.
+
+        All lines that arrived are read and parsed at once, a line that is not complete yet waits for the next read.
+
+        :param nReads: number of lines to read
+        :type nReads: int
+        :param iReads: interval inbetween lines [ms]
+        :type iReads: int
+
+        :return: times [ms] and forces
+        :rtype: tuple[np.ndarray, np.ndarray]
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        reply: Reply = self._queryReply("CR", f" {nReads}{self.cmdArgSep}{iReads}")
+        times: np.ndarray = np.empty(nReads + 1, dtype=np.int64)
+        forces: np.ndarray = np.empty(nReads + 1, dtype=np.float64)
+        length: int = 0
+        try:
+            times[0], forces[0] = self._parseCRLine(reply.result())
+            self._syncClock(reply, int(times[0]))
+            length = 1
+        except ValueError:
+            # garbled first line, the rest of the chunk still follows
+            pass
+
+        timeout: float | None = self.deadline("CR")
+        if timeout is not None:
+            timeout += iReads / 1000
+        rxBytes: int = self._rxBytes
+        try:
+            for blockTimes, blockForces in self._readSamples(nReads, timeout):
+                times[length : length + len(blockTimes)] = blockTimes
+                forces[length : length + len(blockForces)] = blockForces
+                length += len(blockTimes)
+        finally:
+            self.metrics.received("CR", self._rxBytes - rxBytes)
+        return times[:length], forces[:length]
+
+    def CRStream(self, nReads: int, iReads: int) -> Iterator[tuple[int, float]]:
+        """
+        ### Continuous Reading, streamed
+        Same as `CR`, but yields the lines as soon as they arrive instead of collecting the whole chunk first.
+
+        Garbled lines are skipped. Closing the generator before the chunk has ended aborts the reading with `AB`.
+
+        :param nReads: number of lines to read
+        :type nReads: int
+        :param iReads: interval inbetween lines [ms]
+        :type iReads: int
+
+        :return: generator of `(time, force)`
+        :rtype: Iterator[tuple[int, float]]
+
+        :raises RunTimeError: If sensor encounters an error.
+        """
+        reply: Reply = self._queryReply("CR", f" {nReads}{self.cmdArgSep}{iReads}")
+        try:
+            returnLine: str = reply.result()
+        except FramingError:
+            # the rest of the chunk still follows
+            returnLine = str()
+        try:
+            self._syncClock(reply, self._parseCRLine(returnLine)[0])
+        except ValueError:
+            pass
+
+        # the first line is part of the chunk as well, see `CR`
+        timeout: float | None = self.deadline("CR")
+        if timeout is not None:
+            timeout += iReads / 1000
+        parser: CRParser = self._crParser
+        samples: Iterator[tuple[np.ndarray, np.ndarray]] = self._readSamples(nReads, timeout)
+        # lines read so far, exact at every yield
+        lines: int = 0
+        rxBytes: int = self._rxBytes
+        try:
+            try:
+                yield self._parseCRLine(returnLine)
+            except ValueError:
+                pass
+            for times, forces in samples:
+                lines = parser.lines
+                yield from zip(times.tolist(), forces.tolist())
+            lines = nReads
+        except RuntimeError:
+            if parser.error is not None:
+                # the firmware stops on an error
+                lines = nReads
+            raise
+        finally:
+            samples.close()
+            self.metrics.received("CR", self._rxBytes - rxBytes)
+            if lines < nReads:
+                self._abortCR(nReads - lines)
+
+
+class Reply(Future):
+    def __init__(self, commands: Commands, cmd: str) -> None:
+        """
+        Future for the return line of a pipelined command, see `Commands.queue()`.
+
+        Return lines arrive in the order the commands were sent,
+        so waiting on a reply also resolves all replies queued before it.
+
+        :param commands: commands instance that sent the command
+        :type commands: Commands
+        :param cmd: command that was sent
+        :type cmd: str
+        """
+        super().__init__()
+        self.commands: Commands = commands
+        self.cmd: str = cmd
+        # host times the command was written and the return line was read [ns]
+        self.sent: int | None = None
+        self.received: int | None = None
+
+    def result(self, timeout: float | None = None) -> str:
+        """
+        Waits for the return line.
+
+        :returns: return line
+        :rtype: str
+
+        :raises RunTimeError: If sensor encounters an error.
+        :raises FramingError: If the reply is garbled.
+        :raises ReplyTimeout: If there was no reply before the deadline, see `Commands.deadline()`.
+        """
+        while not self.done():
+            self.commands._resolveNext()
+        return super().result(timeout)
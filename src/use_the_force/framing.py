@@ -0,0 +1,113 @@
+import re
+from typing import Callable
+
+__all__ = ["Framer", "FramingError", "ReplyTimeout", "SAMPLE", "REPLY", "ERROR", "GARBAGE"]
+
+SAMPLE: str = "sample"
+REPLY: str = "reply"
+ERROR: str = "error"
+GARBAGE: str = "garbage"
+
+# start of every line the firmware sends: `[XX]: ` with a command code, or `[ERROR]: `
+_FRAME: re.Pattern = re.compile(r"\[([A-Z]{2}|ERROR)\]: ")
+
+
+class FramingError(ValueError):
+    """
+    Return line that is not a valid reply, for example because bytes were lost on the way.
+    """
+
+
+class ReplyTimeout(FramingError):
+    """
+    No reply arrived before the deadline of the command, see `Commands.deadline()`.
+    """
+
+
+class Framer:
+    def __init__(self, onUnsolicited: Callable[[str], None] | None = None) -> None:
+        """
+        Recognises the lines of the sensor by their prefix, so the protocol gets back in step without flushing buffers.
+
+        Every line is one of:
+        - `SAMPLE`: `[CR]: time,force`, output of a running `CR`
+        - `REPLY`: `[XX]: value`, the answer on command `XX`, including the first line of a `CR`
+        - `ERROR`: `[ERROR]: message`
+        - `GARBAGE`: anything else
+
+        Bytes in front of a prefix are dropped, so a frame is found again right after garbage.
+        Lines that nobody waits for are counted in `dropped`, errors among them are passed to `onUnsolicited`:
+        >>> sensor.cmds.framer.onUnsolicited = print
+        >>> sensor.cmds.framer.dropped
+
+        :param onUnsolicited: called with every error line that arrived while no command was waiting for a reply
+        :type onUnsolicited: Callable[[str], None] | None
+        """
+        self.onUnsolicited: Callable[[str], None] | None = onUnsolicited
+        # garbage and stale lines that were thrown away
+        self.dropped: int = 0
+        # lines with garbage in front of a valid frame
+        self.resynced: int = 0
+        # error lines nobody waited for
+        self.unsolicited: int = 0
+
+    def __repr__(self) -> str:
+        return f"Framer(dropped={self.dropped}, resynced={self.resynced}, unsolicited={self.unsolicited})"
+
+    def classify(self, line: str) -> tuple[str, str | None, str]:
+        """
+        Finds the frame in a single line.
+
+        :param line: stripped line from the sensor
+        :type line: str
+
+        :returns: kind of line, command code (`None` for garbage) and the line from its prefix on
+        :rtype: tuple[str, str | None, str]
+        """
+        match: re.Match | None = _FRAME.search(line)
+        if match is None:
+            return GARBAGE, None, line
+        if match.start() > 0:
+            self.resynced += 1
+            line = line[match.start() :]
+        code: str = match.group(1)
+        if code == "ERROR":
+            return ERROR, code, line
+        # the first line of a chunk is separated with `;`, all others with `,`
+        if code == "CR" and ";" not in line:
+            return SAMPLE, code, line
+        return REPLY, code, line
+
+    def reply(self, line: str, cmd: str) -> str | None:
+        """
+        Checks if `line` answers `cmd`.
+
+        :param line: stripped line from the sensor
+        :type line: str
+        :param cmd: command waiting for its reply
+        :type cmd: str
+
+        :returns: the reply or error, `None` if the line is stale and was dropped
+        :rtype: str | None
+
+        :raises FramingError: If the line is garbage, most likely the reply itself got garbled.
+        """
+        kind, code, line = self.classify(line)
+        if kind == ERROR or (kind == REPLY and code == cmd):
+            return line
+        self.dropped += 1
+        if kind == GARBAGE:
+            raise FramingError(f"garbled reply on {cmd}: {line!r}")
+        return None
+
+    def unsolicitedLine(self, line: str) -> None:
+        """
+        Handles a line that arrived while no command was waiting for a reply.
+        """
+        kind, _, line = self.classify(line)
+        if kind != ERROR:
+            self.dropped += 1
+            return
+        self.unsolicited += 1
+        if self.onUnsolicited is not None:
+            self.onUnsolicited(line)
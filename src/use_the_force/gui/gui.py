@@ -1,9 +1,13 @@
-import bisect
+import os
 import re
 import sys
 import threading
-from time import perf_counter_ns, sleep
+from collections import deque
+from itertools import chain, islice
+from time import perf_counter_ns, sleep, strftime
+from typing import Iterator
 
+import numpy as np
 import pyqtgraph as pg
 from PySide6 import QtWidgets
 from PySide6.QtCore import QObject, QRunnable, Qt, QThreadPool, QTimer, Signal, Slot
@@ -11,9 +15,15 @@ from PySide6.QtGui import QCloseEvent
 from serial.tools import list_ports  # type: ignore
 
 from use_the_force._logging import Logging
+from use_the_force.binaryLog import BINARY_EXTENSION
+from use_the_force.calibration import CalibratedColumn
+from use_the_force.discovery import discover, handshake
+from use_the_force.filters import FILTERS, Decimator
 from use_the_force.forceSensor import ForceSensor
+from use_the_force.framing import FramingError, ReplyTimeout
 from use_the_force.gui.error_ui import Ui_errorWindow
 from use_the_force.gui.main_ui import Ui_MainWindow
+from use_the_force.journal import SessionJournal, recoverSession
 
 __all__ = [
     "UserInterface",
@@ -26,7 +36,17 @@ __all__ = [
 
 
 class UserInterface(QtWidgets.QMainWindow):
-    def __init__(self) -> None:
+    def __init__(self, **kwargs) -> None:
+        """
+        :param streamMode: acquire with `CR` chunks instead of a `SR` per sample, defaults to False
+        :type streamMode: bool
+        :param streamChunk: lines per `CR` chunk in stream mode, defaults to 1000
+        :type streamChunk: int
+        :param streamInterval: [ms] inbetween `CR` lines in stream mode, defaults to 0
+        :type streamInterval: int
+        :param decimationFilter: filter for `singleReadForces` samples, any of `filters.FILTERS`, defaults to "boxcar"
+        :type decimationFilter: str
+        """
         super().__init__()
 
         self.ui = Ui_MainWindow()
@@ -68,6 +88,7 @@ class UserInterface(QtWidgets.QMainWindow):
 
         # Text boxes and value boxes
         self.ui.setNewtonPerCount.valueChanged.connect(self.setLoadPerCount)
+        self.ui.setGaugeValue.valueChanged.connect(self.setTareValue)
         self.ui.setPlotTimerInterval.valueChanged.connect(self.updatePlotTimerInterval)
         self.ui.setLineReads.valueChanged.connect(self.singleReadLinesForcesUpdate)
         self.ui.setLineSkips.valueChanged.connect(self.singleReadSkipsUpdate)
@@ -80,6 +101,7 @@ class UserInterface(QtWidgets.QMainWindow):
         ###############
         ports: list[str] = [port.device for port in list_ports.comports()]
         if len(ports) > 0:
+            # replaced by the first port that answers like a sensor, see `discoverWorker`
             self.ui.setPortName.setText(ports[0])
         else:
             self.ui.setPortName.setText("No ports found")
@@ -100,16 +122,35 @@ class UserInterface(QtWidgets.QMainWindow):
         self.singleReadToggle: bool = False
         self.homed: bool = False
         self.singleReadForce: float = float()
+        self.singleReadCount: float = float()
         self.singleReadForces: int = self.ui.setLineReads.value()
         self.singleReadSkips: int = self.ui.setLineSkips.value()
         self.stepSizeMDM: float = self.ui.setStepSizeMDM.value()
         self.plotIndexX: int = 1
         self.plotIndexY: int = 2
         self.velocity: int = self.ui.setVelocity.value()
+        # Streaming acquisition with `CR` instead of a `SR` per sample
+        self.streamMode: bool = kwargs.pop("streamMode", False)
+        self.streamChunk: int = kwargs.pop("streamChunk", 1000)  # lines per CR chunk
+        self.streamInterval: int = kwargs.pop("streamInterval", 0)  # [ms] inbetween CR lines
+        # Decimation of `singleReadForces` samples, any of `filters.FILTERS`
+        self.decimationFilter: str = kwargs.pop("decimationFilter", "boxcar")
+        if self.decimationFilter not in FILTERS:
+            raise ValueError(
+                f"unknown decimationFilter {self.decimationFilter!r}, expected one of {list(FILTERS)}"
+            )
         self.txtLogMDM: str = str()
         self.reMDMMatch: re.Pattern[str] = re.compile(r"\[[A-Za-z0-9]+\]")
-        self.data: list[list[float]] = [[], [], []]
+        # time, displacement and raw counts that read as force
+        self.data: list[list[float] | CalibratedColumn] = [[], [], self.newForceColumn()]
         setattr(self.ui, "errorMessage", [])
+        # Write-ahead log of the running recording, see `startJournal()`
+        self.journal: SessionJournal | None = None
+
+        # the force column calibrates with the sensor, so it has to exist before the first plot
+        self.sensor = ForceSensorGUI(caller=self)
+        # self.cmds = Commands(self.sensor.ser)
+        self.sensor.errorSignal.connect(self.error)
 
         ###################
         # INITIALIZE PLOT #
@@ -123,10 +164,6 @@ class UserInterface(QtWidgets.QMainWindow):
         ##################
         # MULTITHREADING #
         ##################
-        self.sensor = ForceSensorGUI(caller=self)
-        # self.cmds = Commands(self.sensor.ser)
-        self.sensor.errorSignal.connect(self.error)
-
         self.plotTimer = QTimer()
         self.plotTimer.timeout.connect(self.updatePlot)
 
@@ -134,6 +171,7 @@ class UserInterface(QtWidgets.QMainWindow):
         self.mainLogWorker.startSignal.connect(self.startPlotTimer)
         self.mainLogWorker.endSignal.connect(self.stopPlotTimer)
         self.mainLogWorker.switchXAxisSignal.connect(self.switchToTime)
+        self.mainLogWorker.errorSignal.connect(self.error)
         # self.mainLogWorker.singleReadStartSignal.connect()
         self.mainLogWorker.singleReadEndSignal.connect(self.singleReadEnd)
 
@@ -143,6 +181,17 @@ class UserInterface(QtWidgets.QMainWindow):
 
         self.thread_pool = QThreadPool.globalInstance()
 
+        # ports with a sensor are probed once at startup, connecting waits until that is done
+        self.discovering: bool = True
+        self.connectPending: bool = False
+        self.discoverWorker = discoverWorker()
+        self.discoverWorker.foundSignal.connect(self.sensorDiscovered)
+        self.discoverWorker.finishedSignal.connect(self.discoveryFinished)
+        self.thread_pool.start(self.discoverWorker.run)
+
+        # once the window is shown
+        QTimer.singleShot(0, self.recoverSession)
+
         ############################
         # CHANGE IN NEXT UI UPDATE #
         ############################
@@ -224,6 +273,9 @@ class UserInterface(QtWidgets.QMainWindow):
             self.recording = False
         if self.sensorConnected:
             self.butConnect()
+        if self.fileOpen:
+            # writes the rows still queued in the background
+            self.measurementLog.closeFile()
         if not (self.fileOpen or self.MDMActive) and len(self.data[0]) > 0:
             self.ui.errorMessage = [
                 "Unsaved Data",
@@ -233,6 +285,8 @@ class UserInterface(QtWidgets.QMainWindow):
             if not self.error():  # Cancel
                 event.ignore()
                 self.butSave()
+        if event.isAccepted():
+            self.stopJournal()
 
     def plot(self, **kwargs) -> None:
         """
@@ -265,7 +319,7 @@ class UserInterface(QtWidgets.QMainWindow):
         pg.setConfigOption("background", kwargs.pop("clrBg", "w"))
         # self.ui.graphMDM.setBackground(background=kwargs.pop("clrBg", "w"))
         self.ui.graph1.plot(
-            *self.data[-2:],
+            *self.plotData(1, 2),
             symbol=kwargs.pop("symbol", None),
             pen={
                 "color": kwargs.pop("color", "r"),
@@ -294,36 +348,46 @@ class UserInterface(QtWidgets.QMainWindow):
         """
         Updates the plot
         """
-        self.ui.graph1.plot(self.data[self.plotIndexX], self.data[self.plotIndexY])
+        x, y = self.plotData(self.plotIndexX, self.plotIndexY)
+        self.ui.graph1.plot(x, y)
 
-        if len(self.data[self.plotIndexX]) > 0:
+        if len(x) > 0:
             try:
                 self.xLim = int(self.ui.xLimSet.value())
-                if abs(self.xLim) < self.data[self.plotIndexX][-1] and (self.xLim != 0):
-                    self.ui.graph1.setXRange(
-                        self.data[self.plotIndexX][-1] + self.xLim,
-                        self.data[self.plotIndexX][-1],
-                    )
-                    i = bisect.bisect_left(
-                        self.data[self.plotIndexX],
-                        self.data[self.plotIndexX][-1] + self.xLim,
-                    )
-                    self.ui.graph1.setYRange(
-                        min(self.data[self.plotIndexY][i:]),
-                        max(self.data[self.plotIndexY][i:]),
-                    )
+                if abs(self.xLim) < x[-1] and (self.xLim != 0):
+                    self.ui.graph1.setXRange(x[-1] + self.xLim, x[-1])
+                    i = int(np.searchsorted(x, x[-1] + self.xLim))
+                    self.ui.graph1.setYRange(y[i:].min(), y[i:].max())
 
                 elif self.xLim == 0:
-                    self.ui.graph1.setXRange(0, self.data[self.plotIndexX][-1])
-                    self.ui.graph1.setYRange(
-                        min(self.data[self.plotIndexY]), max(self.data[self.plotIndexY])
-                    )
+                    self.ui.graph1.setXRange(0, x[-1])
+                    self.ui.graph1.setYRange(y.min(), y.max())
 
             except:
-                self.ui.graph1.setXRange(0, self.data[self.plotIndexX][-1])
-                self.ui.graph1.setYRange(
-                    min(self.data[self.plotIndexY]), max(self.data[self.plotIndexY])
-                )
+                self.ui.graph1.setXRange(0, x[-1])
+                self.ui.graph1.setYRange(y.min(), y.max())
+
+    def newForceColumn(self, counts: list[float] | None = None) -> CalibratedColumn:
+        """
+        Column of raw counts that reads as force, calibrated with the current settings of the sensor.
+
+        :param counts: initial raw counts
+        :type counts: list[float] | None
+        """
+        return CalibratedColumn(
+            lambda counts: self.sensor.ForceFix(counts),
+            lambda: (id(self.sensor), self.sensor.calibrationVersion),
+            counts,
+        )
+
+    def plotData(self, *indices: int) -> list[np.ndarray]:
+        """
+        Columns of `self.data` as arrays, force calibrated.
+        """
+        # the recording thread may have appended to one column but not yet to the others
+        columns: list[np.ndarray] = [np.asarray(self.data[i], dtype=np.float64) for i in indices]
+        length: int = min(len(column) for column in columns)
+        return [column[:length] for column in columns]
 
     def switchPlotIndexX(self, index: int) -> None:
         self.plotIndexX = index
@@ -420,10 +484,12 @@ class UserInterface(QtWidgets.QMainWindow):
             if self.ui.setPortName.text() in devices:
                 self.sensorConnected = True
                 self.ui.butFile.setEnabled(False)
-                self.startsensorConnect = threading.Thread(
-                    target=self.sensorConnect, name="sensorConnect"
-                )
-                self.startsensorConnect.start()
+                if self.discovering:
+                    # a probe of the same port would answer the handshake of this connection
+                    self.ui.butConnect.setText("Connecting...")
+                    self.connectPending = True
+                else:
+                    self.startSensorConnect()
             else:
                 if len(devices) > 0:
                     self.ui.errorMessage = [
@@ -444,6 +510,34 @@ class UserInterface(QtWidgets.QMainWindow):
                 self.ui.butConnect.setEnabled(True)
             del devices
 
+    def startSensorConnect(self) -> None:
+        """
+        Connects to the sensor from a separate thread, see `sensorConnect()`.
+        """
+        self.startsensorConnect = threading.Thread(
+            target=self.sensorConnect, name="sensorConnect"
+        )
+        self.startsensorConnect.start()
+
+    def discoveryFinished(self) -> None:
+        """
+        Starts the connection that waited for the ports to be probed, see `butConnect()`.
+        """
+        self.discovering = False
+        if self.connectPending:
+            self.connectPending = False
+            self.startSensorConnect()
+
+    def sensorDiscovered(self, port: str) -> None:
+        """
+        Fills in the first port with a sensor, unless a connection was started in the meantime.
+
+        :param port: port of the sensor
+        :type port: str
+        """
+        if not self.sensorConnected:
+            self.ui.setPortName.setText(port)
+
     def sensorConnect(self) -> None:
         """
         Script to connect to the M5Din Meter.
@@ -457,17 +551,13 @@ class UserInterface(QtWidgets.QMainWindow):
             self.resetConnectUI()
             return
 
-        # needs time or it will break
-        sleep(0.5)
         try:
-            vr = self.sensor.cmds.VR()
-            if vr == "":
-                raise RuntimeError("[ERROR]: Returned empty string.")
-            else:
-                self.ui.toolBox.setItemText(
-                    self.ui.toolBox.indexOf(self.ui.sensorOptions),
-                    "Sensor v:" + vr.split(":")[1][1:],
-                )
+            # retries with increasing timeouts while the M5Din Meter starts up
+            version, _ = handshake(self.sensor)
+            self.ui.toolBox.setItemText(
+                self.ui.toolBox.indexOf(self.ui.sensorOptions),
+                "Sensor v:" + version,
+            )
         except RuntimeError:
             self.sensor.ClosePort()
             self.resetConnectUI()
@@ -499,7 +589,6 @@ class UserInterface(QtWidgets.QMainWindow):
         if self.recording:
             self.butRecord()
         self.sensor.ClosePort()
-        sleep(0.5)  # Give some time to Windows/M5Din Meter to fully disconnect
         self.resetConnectUI()
 
     @Slot(str, str, str)
@@ -554,11 +643,16 @@ class UserInterface(QtWidgets.QMainWindow):
             self.fileOpen = True
             self.ui.butFile.setChecked(True)
             self.filePath, _ = QtWidgets.QFileDialog.getSaveFileName(
-                filter="CSV files (*.csv)"
+                filter=f"CSV files (*.csv);;Binary logs (*{BINARY_EXTENSION})"
             )
             # Cancel gives a 0 length string
             if self.filePath != "":
-                self.measurementLog = Logging(self.filePath)
+                # written from a background thread, so acquisition never waits for the disk
+                self.measurementLog = Logging(
+                    self.filePath,
+                    background=True,
+                    binary=self.filePath.endswith(BINARY_EXTENSION),
+                )
                 self.measurementLog.createLogGUI()
                 self.ui.butFile.setText(*self.filePath.split("/")[-1].split(".")[:-1])
                 if len(self.data[1]) > 0:
@@ -620,8 +714,6 @@ class UserInterface(QtWidgets.QMainWindow):
                 self.ui.butHome,
             )
 
-            self.sensor.ser.reset_input_buffer()
-
             if (
                 self.ui.setStartPos.value() == self.ui.setEndPos.value()
                 and self.plotIndexX != 0
@@ -632,21 +724,21 @@ class UserInterface(QtWidgets.QMainWindow):
                 self.switchPlotIndexX(1)
 
             self.mainLogWorker.logLess = self.ui.butFile.text() == "-"
+            self.startJournal()
             self.thread_pool.start(self.mainLogWorker.run)
 
     def butClear(self) -> None:
         """
         button that clears data in `self.data` and resets graph
         """
+        self.stopJournal()
         del self.data
-        self.data = [[], [], []]
+        self.data = [[], [], self.newForceColumn()]
         if self.MDMActive:
             self.graphMDM1.clear()
             self.graphMDM2.clear()
         else:
             self.ui.graph1.clear()
-        if self.sensorConnected:
-            self.sensor.ser.reset_input_buffer()
         self.ui.butSave.setEnabled(False)
         if self.fileOpen:
             self.butFile()
@@ -675,6 +767,9 @@ class UserInterface(QtWidgets.QMainWindow):
         self.ui.butTare.setText("...")
         GaugeValue = self.sensor.tare()
         self.ui.setGaugeValue.setValue(GaugeValue)
+        self.ui.setGaugeValue.setToolTip(
+            f"spread: {self.sensor.tareStd:.1f} counts over {self.sensor.tareStats.count} reads"
+        )
         self.sensor.tareValue = GaugeValue
         self.ui.butTare.setText("Tare")
 
@@ -709,6 +804,70 @@ class UserInterface(QtWidgets.QMainWindow):
 
     def saveEnd(self) -> None:
         self.ui.butSave.setText("Save")
+        # the data is in the file now
+        self.stopJournal()
+
+    def startJournal(self) -> None:
+        """
+        Checkpoints a recording without a file every few seconds, so it can be recovered after a crash.
+
+        A recording to a file is flushed to disk at every checkpoint, and noted so a torn last row can be repaired.
+        """
+        self.stopJournal()
+        if self.mainLogWorker.logLess:
+            self.journal = SessionJournal(
+                lambda start: [
+                    self.data[0][start:],
+                    self.data[1][start:],
+                    self.sensor.ForceFix(self.data[2].raw[start:].astype(np.float64)),
+                ]
+            )
+        else:
+            self.journal = SessionJournal(
+                filename=self.measurementLog.full_filename,
+                flushLog=lambda: self.measurementLog.flush(sync=True),
+            )
+        self.journal.start()
+        if self.journal.movedAside is not None:
+            self.ui.errorMessage = [
+                "Unrecovered Data",
+                "Unrecovered Data!",
+                f"A previous recording could not be recovered, it was kept in {self.journal.movedAside}.",
+            ]
+            self.error()
+
+    def stopJournal(self) -> None:
+        """
+        Removes the journal, once the data is saved or deliberately thrown away.
+        """
+        if self.journal is not None:
+            self.journal.stop(discard=True)
+            self.journal = None
+
+    def recoverSession(self) -> None:
+        """
+        Saves the data of a recording that ended with a crash, and repairs its file, see `SessionJournal`.
+        """
+        filename: str = os.path.join("DATA", strftime("recovered_%Y%m%d_%H%M%S.csv"))
+        try:
+            recovered: tuple[dict, list[np.ndarray]] | None = recoverSession(
+                filename=filename
+            )
+        except (OSError, ValueError) as e:
+            self.ui.errorMessage = [e.__class__.__name__, "Recovery failed", str(e)]
+            self.error()
+            return
+        if recovered is None:
+            return
+        manifest, columns = recovered
+        if len(columns[0]) > 0:
+            text: str = f"{len(columns[0])} rows of the last recording were saved to {filename}."
+        elif manifest.get("filename") is not None:
+            text = f"The last recording ended unexpectedly, it is in {manifest['filename']} up to the crash."
+        else:
+            return
+        self.ui.errorMessage = ["Recovered Data", "Recovered Data!", text]
+        self.error()
 
     def butSingleRead(self) -> None:
         self.singleReadToggle = True
@@ -736,7 +895,7 @@ class UserInterface(QtWidgets.QMainWindow):
                             len(str(self.stepSizeMDM).split(".")[-1]),
                         )
                     )
-                    self.data[2].append(self.singleReadForce)
+                    self.data[2].append(self.singleReadCount)
 
                     if re.search(
                         self.reMDMMatch, self.ui.xLabel_2.text()
@@ -771,7 +930,7 @@ class UserInterface(QtWidgets.QMainWindow):
                 else:
                     self.data[0].append(0)
                     self.data[1].append(0.0)
-                    self.data[2].append(self.singleReadForce)
+                    self.data[2].append(self.singleReadCount)
                     self.readForceMDMToggle = True
                     if re.search(
                         self.reMDMMatch, self.ui.xLabel_2.text()
@@ -865,19 +1024,19 @@ class UserInterface(QtWidgets.QMainWindow):
             self.ui.butSwitchDirectionMDM.setText("Stop")
 
             self.measurementLog = Logging(
-                "".join(self.filePath.split(".")[:-1]) + "_out.csv"
+                "".join(self.filePath.split(".")[:-1]) + "_out.csv", undo=True
             )
             self.measurementLog.createLogGUI()
 
             self.stepSizeMDM = -self.stepSizeMDM
             if len(self.data[1]) > 0:
                 self.switchDistance: float = self.data[1][-1]
-                self.switchForce: float = self.data[2][-1]
+                self.switchCount: float = self.data[2].raw[-1]
             else:
-                self.switchDistance, self.switchForce = 0.0, 0.0
+                self.switchDistance, self.switchCount = 0.0, self.sensor.tareValue
             del self.data
 
-            self.data = [[0], [self.switchDistance], [self.switchForce]]
+            self.data = [[0], [self.switchDistance], self.newForceColumn([self.switchCount])]
 
             self.measurementLog.writeLog([self.data[1][-1], self.data[2][-1]])
 
@@ -941,7 +1100,7 @@ class UserInterface(QtWidgets.QMainWindow):
         pg.setConfigOption("background", kwargs.pop("clrBg", "w"))
         # self.ui.graphMDM.setBackground(background=kwargs.pop("clrBg", "w"))
         self.graphMDM1 = self.ui.graphMDM.plot(
-            *self.data[1:],
+            *self.plotData(1, 2),
             name=kwargs.pop("nameIn", "Approach"),
             symbol=kwargs.pop("symbolIn", None),
             pen=pg.mkPen(
@@ -952,7 +1111,7 @@ class UserInterface(QtWidgets.QMainWindow):
             ),
         )
         self.graphMDM2 = self.ui.graphMDM.plot(
-            *self.data[1:],
+            *self.plotData(1, 2),
             name=kwargs.pop("nameOut", "Retraction"),
             symbol=kwargs.pop("symbolOut", None),
             pen=pg.mkPen(
@@ -997,9 +1156,9 @@ class UserInterface(QtWidgets.QMainWindow):
 
     def updatePlotMDM(self) -> None:
         if self.switchDirectionMDMToggle:
-            self.graphMDM2.setData(*self.data[1:])
+            self.graphMDM2.setData(*self.plotData(1, 2))
         else:
-            self.graphMDM1.setData(*self.data[1:])
+            self.graphMDM1.setData(*self.plotData(1, 2))
 
     def butFileMDM(self) -> None:
         """
@@ -1036,7 +1195,7 @@ class UserInterface(QtWidgets.QMainWindow):
                 self.fileMDMOpen = True
                 self.ui.butFileMDM.setChecked(True)
                 self.measurementLog = Logging(
-                    "".join(self.filePath.split(".")[:-1]) + "_in.csv"
+                    "".join(self.filePath.split(".")[:-1]) + "_in.csv", undo=True
                 )
                 self.measurementLog.createLogGUI()
                 self.ui.butFileMDM.setText(
@@ -1055,8 +1214,12 @@ class UserInterface(QtWidgets.QMainWindow):
         main use for when MDM hits other side in capillary bridge experiment, or when the capillary bridge gets broken without being noticed
         """
         # data changes
-        for i in range(len(self.data)):
-            self.data[i] = self.data[i][:-1]
+        if len(self.data[1]) > 0:
+            # the log has a row for every value
+            self.measurementLog.deleteLastRow()
+        for column in self.data:
+            if len(column) > 0:
+                column.pop()
 
         # already switched and only 1 value left
         if len(self.data[1]) <= 1 and self.switchDirectionMDMToggle:
@@ -1069,10 +1232,6 @@ class UserInterface(QtWidgets.QMainWindow):
             self.disableElement(
                 self.ui.butDeletePreviousMDM, self.ui.butSwitchDirectionMDM
             )
-        # there should be a better way to just
-        # drop the last value, but this works for now
-        # and does not seem to cause much trouble
-        self.measurementLog.replaceFile(data=self.data)
 
         # text box changes
         self.txtLogMDM = str("\n").join(self.txtLogMDM.split("\n")[:-1])
@@ -1090,9 +1249,20 @@ class UserInterface(QtWidgets.QMainWindow):
         """
         self.sensor.loadPerCount = self.ui.setNewtonPerCount.value()
 
+    def setTareValue(self) -> None:
+        """
+        Changes the value of tareValue when textbox is changed
+
+        Recorded data is stored as raw counts, so it is shown with the new value as well
+        """
+        self.sensor.tareValue = self.ui.setGaugeValue.value()
+
     def butMove(self) -> None:
         """Handles move button press"""
-        self.sensor.cmds.SP(self.ui.setPosition.value())
+        try:
+            self.sensor.cmds.SP(self.ui.setPosition.value())
+        except ReplyTimeout as e:
+            self.movementError(e)
 
     def butUpdateVelocity(self) -> None:
         self.velocity = int(self.ui.setVelocity.value())
@@ -1106,10 +1276,25 @@ class UserInterface(QtWidgets.QMainWindow):
         ]
         if self.error():
             self.butUpdateVelocity()
-            self.sensor.cmds.HM()
+            try:
+                self.sensor.cmds.HM()
+            except ReplyTimeout as e:
+                self.movementError(e)
+                return
             self.homed = True
             self.enableElement(self.ui.butRecord, self.ui.butMove)
 
+    def movementError(self, e: ReplyTimeout) -> None:
+        """
+        Shows that the stage did not confirm a movement before the deadline of the command.
+        """
+        self.ui.errorMessage = [
+            e.__class__.__name__,
+            str(e),
+            "The stage did not confirm the movement in time, see `deadlines` of `Commands`.",
+        ]
+        self.error()
+
     def butForceStop(self) -> None:
         self.homed = False
         self.enableElement(self.ui.butHome)
@@ -1165,8 +1350,34 @@ class mainLogWorker(QObject, QRunnable):
         self.callerSelf: UserInterface = callerSelf
         self.logLess: bool = bool()
         self.singleReadForces: int = self.callerSelf.singleReadForces
+        self.decimator: Decimator | None = None
+        # filtered `(time, count)` not returned yet
+        self.decimated: deque[np.ndarray] = deque()
 
     def run(self) -> None:
+        try:
+            self.measure()
+        except ReplyTimeout as e:
+            # the recording ends as if it reached its end
+            self.callerSelf.ui.errorMessage = [
+                e.__class__.__name__,
+                str(e),
+                "The stage did not confirm the movement in time, see `deadlines` of `Commands`.",
+            ]
+            self.errorSignal.emit()
+
+        if self.callerSelf.recording:
+            self.callerSelf.threadReachedEnd = True
+            self.callerSelf.butRecord()
+
+        if self.logLess:
+            # self.callerSelf.unsavedData = self.callerSelf.data
+            self.callerSelf.enableElement(self.callerSelf.ui.butSave)
+
+    def measure(self) -> None:
+        """
+        Moves the stage from the start to the end position while reading forces, and keeps reading for the set time after.
+        """
         # mm/s speed of stage
         trueVelocity: float = (self.callerSelf.velocity) / 60
 
@@ -1183,72 +1394,155 @@ class mainLogWorker(QObject, QRunnable):
             # wait until the stage has reached the start position
             sleep(abs(startPos - currentPos) / trueVelocity + 1)
         self.singleReadForces = self.callerSelf.singleReadForces
+        self.decimator = None
 
-        _skip: list[float] = [
-            self.callerSelf.sensor.cmds.SR()
-            for i in range(self.callerSelf.singleReadSkips)
-        ]
+        _skip: list[float] = self.callerSelf.sensor.cmds.SRBatch(
+            self.callerSelf.singleReadSkips
+        )
+        if self.callerSelf.streamMode:
+            # maps the device timestamps onto the host clock
+            self.callerSelf.sensor.syncClock()
 
         self.startSignal.emit()
-        self.callerSelf.sensor.cmds.DC(False)
-        time = float(0.0)
-        self.callerSelf.sensor.T0 = perf_counter_ns()
-
-        # start movement
-        self.callerSelf.sensor.cmds.SP(endPos)
+        samples: Iterator[tuple[int, float]] | None = None
+        try:
+            self.callerSelf.sensor.cmds.DC(False)
+            time = float(0.0)
+            self.callerSelf.sensor.T0 = perf_counter_ns()
 
-        while (time < measurementTime) and self.callerSelf.recording:
-            try:
-                time = round((perf_counter_ns() - self.callerSelf.sensor.T0) / 1e9, 8)
-                if time < travelTime:
-                    Position = trueVelocity * time
-                elif self.callerSelf.plotIndexX != 0 and allowTimeSwitch:
-                    Position = float(abs(endPos - startPos))
-                    self.switchXAxisSignal.emit()
-                Force = self.read()
-                self.callerSelf.data[0].append(time)
-                self.callerSelf.data[1].append(Position)
-                self.callerSelf.data[2].append(Force)
-                if not self.logLess:
-                    # logs: t[s], s[mm], F[mN]
-                    self.callerSelf.measurementLog.writeLog([time, Position, Force])
-
-                self.singleReadForces = self.callerSelf.singleReadForces
-
-            except ValueError:
-                # I know this isn't the best way to deal with it, but it works fine (for now)
-                pass
-
-        self.callerSelf.sensor.cmds.DC()
-        self.endSignal.emit()
+            # start movement
+            self.callerSelf.sensor.cmds.SP(endPos)
 
-        if self.callerSelf.recording:
-            self.callerSelf.threadReachedEnd = True
-            self.callerSelf.butRecord()
+            if self.callerSelf.streamMode:
+                samples = self.callerSelf.sensor.stream(
+                    self.callerSelf.streamChunk, self.callerSelf.streamInterval
+                )
 
-        if self.logLess:
-            # self.callerSelf.unsavedData = self.callerSelf.data
-            self.callerSelf.enableElement(self.callerSelf.ui.butSave)
+            while (time < measurementTime) and self.callerSelf.recording:
+                try:
+                    if samples is None:
+                        time = round(
+                            (perf_counter_ns() - self.callerSelf.sensor.T0) / 1e9, 8
+                        )
+                        count: float = self.readCount()
+                    else:
+                        time, count = self.readStream(samples)
+                    if time < travelTime:
+                        Position = trueVelocity * time
+                    elif self.callerSelf.plotIndexX != 0 and allowTimeSwitch:
+                        Position = float(abs(endPos - startPos))
+                        self.switchXAxisSignal.emit()
+                    self.callerSelf.data[0].append(time)
+                    self.callerSelf.data[1].append(Position)
+                    self.callerSelf.data[2].append(count)
+                    if not self.logLess:
+                        # logs: t[s], s[mm], F[mN]
+                        Force = round(self.callerSelf.sensor.ForceFix(count), ndigits=8)
+                        self.callerSelf.measurementLog.writeLog([time, Position, Force])
+
+                    self.singleReadForces = self.callerSelf.singleReadForces
+
+                except FramingError:
+                    # garbled or missing reply, counted in `sensor.cmds.framer.dropped`
+                    continue
+        finally:
+            # also when the stream or the port fails, so the plot timer and the stream stop
+            try:
+                if samples is not None:
+                    # aborts the running CR chunk
+                    samples.close()
+                self.callerSelf.sensor.cmds.DC()
+            finally:
+                self.endSignal.emit()
+
+    def getDecimator(self) -> Decimator:
+        """
+        Decimator for the current `singleReadForces` and `decimationFilter`, restarted when either changes.
+        """
+        filterType: type[Decimator] = FILTERS[self.callerSelf.decimationFilter]
+        if (
+            self.decimator is None
+            or type(self.decimator) is not filterType
+            or self.decimator.factor != self.singleReadForces
+        ):
+            self.decimator = filterType(self.singleReadForces)
+            self.decimated.clear()
+        return self.decimator
+
+    def readCount(self) -> float:
+        """
+        Decimates `singleReadForces` reads into a single raw count.
+        """
+        decimator: Decimator = self.getDecimator()
+        counts: np.ndarray = np.asarray(
+            self.callerSelf.sensor.cmds.SRBatch(self.singleReadForces), dtype=np.float64
+        )
+        return float(decimator.process(counts)[-1])
 
     def read(self) -> float:
-        forces: list[float] = [
-            self.callerSelf.sensor.ForceFix(self.callerSelf.sensor.cmds.SR())
-            for i in range(self.singleReadForces)
-        ]
-        Force = round(sum(forces) / self.singleReadForces, ndigits=8)
+        Force = round(self.callerSelf.sensor.ForceFix(self.readCount()), ndigits=8)
         return Force
 
+    def readStream(self, samples: Iterator[tuple[int, float]]) -> tuple[float, float]:
+        """
+        Decimates the next `singleReadForces` samples of a `ForceSensor.stream()`.
+
+        Time is taken from the device timestamps, filtered along with the counts
+        and mapped onto the host clock by `ForceSensor.clockSync`.
+
+        :param samples: running stream of `(time, count)`
+        :type samples: Iterator[tuple[int, float]]
+
+        :returns: time [s] and raw count
+        :rtype: tuple[float, float]
+        """
+        decimator: Decimator = self.getDecimator()
+        while len(self.decimated) == 0:
+            block: np.ndarray = np.fromiter(
+                chain.from_iterable(islice(samples, self.singleReadForces)),
+                dtype=np.float64,
+                count=2 * self.singleReadForces,
+            ).reshape(-1, 2)
+            self.decimated.extend(decimator.process(block))
+        deviceTime, count = self.decimated.popleft()
+        hostTime: float = float(self.callerSelf.sensor.clockSync.toHost(deviceTime))
+        time = round((hostTime - self.callerSelf.sensor.T0) / 1e9, 8)
+        return time, float(count)
+
     def singleRead(self) -> None:
         self.singleReadStartSignal.emit()
         self.singleReadForces = self.callerSelf.singleReadForces
-        _skip: list[float] = [
-            self.callerSelf.sensor.ForceFix(self.callerSelf.sensor.cmds.SR())
-            for i in range(self.callerSelf.singleReadSkips)
-        ]
-        self.callerSelf.singleReadForce = self.read()
+        self.decimator = None
+        _skip: list[float] = self.callerSelf.sensor.cmds.SRBatch(
+            self.callerSelf.singleReadSkips
+        )
+        self.callerSelf.singleReadCount = self.readCount()
+        self.callerSelf.singleReadForce = round(
+            self.callerSelf.sensor.ForceFix(self.callerSelf.singleReadCount), ndigits=8
+        )
         self.singleReadEndSignal.emit()
 
 
+class discoverWorker(QObject, QRunnable):
+    foundSignal = Signal(str)
+    # once probing is over and every port is closed again
+    finishedSignal = Signal()
+
+    def __init__(self) -> None:
+        """
+        Probes the ports that look like a sensor, see `discover()`, and passes the first port found to the GUI thread.
+        """
+        super().__init__()
+
+    def run(self) -> None:
+        try:
+            sensors = discover()
+            if len(sensors) > 0:
+                self.foundSignal.emit(sensors[0].port)
+        finally:
+            self.finishedSignal.emit()
+
+
 class saveToLog(QObject, QRunnable):
     startSignal = Signal()
     endSignal = Signal()
@@ -1260,6 +1554,7 @@ class saveToLog(QObject, QRunnable):
     def run(self) -> None:
         self.startSignal.emit()
         self.callerSelf.measurementLog.writeLogFull(self.callerSelf.data)
+        self.callerSelf.measurementLog.flush()
         self.endSignal.emit()
 
 
@@ -1282,6 +1577,7 @@ class ForceSensorGUI(ForceSensor, QObject, QRunnable):
         self.caller: UserInterface = caller
         self.ui: Ui_MainWindow = caller.ui
         self.failed: bool = False
+        self.cmds.framer.onUnsolicited = self.unsolicited
 
         if PortName is not None:
             self.tareValue: float = float(self.ui.setGaugeValue.value())
@@ -1294,6 +1590,7 @@ class ForceSensorGUI(ForceSensor, QObject, QRunnable):
                 self.ser.open()
                 self.ser.setRTS(False)
                 self.ser.setDTR(False)
+                self.startReader()
             except Exception as e:
                 self.failed = True
                 self.ui.errorMessage = [
@@ -1303,6 +1600,20 @@ class ForceSensorGUI(ForceSensor, QObject, QRunnable):
                 ]
                 self.errorSignal.emit()
 
+    def unsolicited(self, line: str) -> None:
+        """
+        Shows errors the sensor sent on its own, like an aborted movement.
+
+        :param line: error line from the sensor
+        :type line: str
+        """
+        self.ui.errorMessage = [
+            "Sensor Error",
+            "The sensor reported an error.",
+            line,
+        ]
+        self.errorSignal.emit()
+
     def __call__(self, **kwargs) -> None:
         """
         Opens up the serial port, checks the gauge value and makes sure data is available.
@@ -1317,6 +1628,7 @@ class ForceSensorGUI(ForceSensor, QObject, QRunnable):
             self.ser.open()
             self.ser.setRTS(False)
             self.ser.setDTR(False)
+            self.startReader()
         except Exception as e:
             self.failed = True
             self.ui.errorMessage = [
@@ -1365,11 +1677,12 @@ class ErrorInterface(QtWidgets.QDialog):
         return self.exec()
 
 
-def start() -> None:
+def start(**kwargs) -> None:
     """
     Basic main function that starts the GUI
 
-    this function can be recreated to change values set in `UserInterface`
+    this function can be recreated to change values set in `UserInterface`,
+    keyword arguments are passed on to `UserInterface`, e.g. `start(streamMode=True)`
 
     Function:
     ```
@@ -1385,7 +1698,7 @@ def start() -> None:
     ```
     """
     app = QtWidgets.QApplication(sys.argv)
-    ui = UserInterface()
+    ui = UserInterface(**kwargs)
     ui.show()
     ret = app.exec_()
     sys.exit(ret)
@@ -0,0 +1,311 @@
+import json
+import os
+import shutil
+import struct
+import zlib
+from threading import Event, Lock, Thread
+from time import strftime, time
+from typing import BinaryIO, Callable, Sequence
+
+import numpy as np
+
+from use_the_force._logging import Logging, repairLog
+
+__all__ = ["SessionJournal", "recoverSession", "discardSession"]
+
+# A session is a directory with a manifest and numbered segments, every checkpoint appends a record:
+#   record: magic, rows, columns, CRC32 of the values, then the values as float64, column after column
+_MAGIC: bytes = b"UTFW"
+_RECORD: struct.Struct = struct.Struct("<4sIII")
+_MANIFEST: str = "session.json"
+
+
+def _syncDirectory(directory: str) -> None:
+    """
+    Makes files created or renamed in `directory` survive a crash, directories cannot be opened on Windows.
+    """
+    try:
+        fd: int = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _moveAside(directory: str) -> str:
+    """
+    Renames the session in `directory` to a free `<directory>_<date>_<time>` next to it.
+    """
+    base: str = f"{os.path.normpath(directory)}_{strftime('%Y%m%d_%H%M%S')}"
+    target: str = base
+    n: int = 1
+    while os.path.exists(target):
+        target = f"{base}_{n}"
+        n += 1
+    os.replace(directory, target)
+    _syncDirectory(os.path.dirname(os.path.abspath(directory)))
+    return target
+
+
+def _segments(directory: str) -> list[str]:
+    """
+    Segment files of the session in `directory`, in the order they were written.
+    """
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.startswith("segment_") and name.endswith(".wal")
+    )
+
+
+class SessionJournal(Thread):
+    # Default location of the journal, next to "DATA/" of the logs
+    directory: str = "RECOVERY"
+
+    def __init__(
+        self, source: Callable[[int], list[Sequence[float]]] | None = None, **kwargs
+    ) -> None:
+        """
+        Write-ahead log of a recording, so it survives a crash of the program or the computer.
+
+        Every `interval` seconds the rows added since the last checkpoint are appended to a segment file
+        and synced to disk, so the cost of a checkpoint only depends on the rows added in that interval.
+        After a crash `recoverSession()` rebuilds the recording, losing at most the last interval:
+        >>> journal = SessionJournal(lambda start: [column[start:] for column in data])
+        >>> journal.start()
+        >>> journal.stop(discard=True)  # once the data is saved
+
+        A recording to `filename` needs no `source`, every checkpoint calls `flushLog` instead to get its rows
+        onto the disk, and after a crash only a torn last row is repaired, see `repairLog()`:
+        >>> journal = SessionJournal(filename=log.full_filename, flushLog=lambda: log.flush(sync=True))
+
+        A session that is still in `directory` when the journal starts was never recovered. It is moved aside
+        to `movedAside` instead of being replaced, and can be recovered from there with `recoverSession()`.
+
+        :param source: returns all columns from row `start` on, called from the journal thread
+        :type source: Callable[[int], list[Sequence[float]]] | None
+        :param directory: directory of the session
+        :type directory: str
+        :param header: comma separated column names
+        :type header: str
+        :param filename: log file the recording is written to, if any
+        :type filename: str | None
+        :param flushLog: writes the rows still buffered for `filename` and syncs them, called from the journal thread
+        :type flushLog: Callable[[], None] | None
+        :param metadata: anything that can be stored as JSON
+        :type metadata: dict
+        :param interval: time between checkpoints [s]
+        :type interval: float
+        :param segmentBytes: size after which the next segment file is started [bytes]
+        :type segmentBytes: int
+        """
+        super().__init__(name="SessionJournal", daemon=True)
+        self.source: Callable[[int], list[Sequence[float]]] | None = source
+        self.directory = str(kwargs.pop("directory", SessionJournal.directory))
+        self.header: str = str(kwargs.pop("header", "Time,Displacement,Force"))
+        self.filename: str | None = kwargs.pop("filename", None)
+        self.flushLog: Callable[[], None] | None = kwargs.pop("flushLog", None)
+        self.metadata: dict = dict(kwargs.pop("metadata", {}))
+        self.interval: float = float(kwargs.pop("interval", 5.0))
+        self.segmentBytes: int = int(kwargs.pop("segmentBytes", 64 << 20))
+
+        # rows synced to disk
+        self.rows: int = 0
+        # exception that stopped the checkpoints
+        self.error: BaseException | None = None
+        # where an unrecovered session in `directory` was moved to by `start()`
+        self.movedAside: str | None = None
+
+        self._file: BinaryIO | None = None
+        self._segment: int = 0
+        self._finish: Event = Event()
+        self._lock: Lock = Lock()
+
+    def start(self) -> None:
+        """
+        Writes a new manifest and starts the checkpoints, after moving an unrecovered session aside.
+        """
+        if os.path.exists(os.path.join(self.directory, _MANIFEST)):
+            self.movedAside = _moveAside(self.directory)
+        else:
+            # segments of a session that never got its manifest hold nothing to recover
+            discardSession(self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+        manifest: dict = {
+            "header": self.header,
+            "filename": None if self.filename is None else os.path.abspath(self.filename),
+            "started": time(),
+            "metadata": self.metadata,
+        }
+        path: str = os.path.join(self.directory, _MANIFEST)
+        # written next to it and renamed, so the manifest is either complete or missing
+        with open(path + ".tmp", "w") as file:
+            json.dump(manifest, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+        _syncDirectory(self.directory)
+        super().start()
+
+    def run(self) -> None:
+        while not self._finish.wait(self.interval):
+            try:
+                self.checkpoint()
+            except BaseException as e:
+                self.error = e
+                return
+
+    def _nextSegment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._file = open(
+            os.path.join(self.directory, f"segment_{self._segment:06d}.wal"), "ab"
+        )
+        self._segment += 1
+        _syncDirectory(self.directory)
+
+    def checkpoint(self) -> int:
+        """
+        Appends the rows added since the last checkpoint and syncs them to disk, or flushes the log file.
+
+        :returns: amount of rows added to the journal
+        :rtype: int
+        """
+        with self._lock:
+            if self.source is None:
+                if self.flushLog is not None:
+                    self.flushLog()
+                return 0
+            columns: list[np.ndarray] = [
+                np.asarray(column, dtype=np.float64) for column in self.source(self.rows)
+            ]
+            # columns are appended one after the other, so the last row may not be complete yet
+            rows: int = min((len(column) for column in columns), default=0)
+            if rows == 0:
+                return 0
+            payload: bytes = np.concatenate([column[:rows] for column in columns]).tobytes()
+            if self._file is None or self._file.tell() >= self.segmentBytes:
+                self._nextSegment()
+            self._file.write(
+                _RECORD.pack(_MAGIC, rows, len(columns), zlib.crc32(payload)) + payload
+            )
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.rows += rows
+            return rows
+
+    def stop(self, discard: bool = False) -> None:
+        """
+        Stops the checkpoints, after a last one.
+
+        :param discard: remove the session, once the data is saved or deliberately thrown away
+        :type discard: bool
+
+        :raises OSError: If a checkpoint failed.
+        """
+        self._finish.set()
+        if self.is_alive():
+            self.join()
+        try:
+            if not discard and self.error is None:
+                self.checkpoint()
+        finally:
+            with self._lock:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+            if discard:
+                discardSession(self.directory)
+        if self.error is not None and not discard:
+            raise OSError(f"checkpoint to {self.directory} failed") from self.error
+
+
+def discardSession(directory: str | None = None) -> None:
+    """
+    Removes the session in `directory`, if any.
+    """
+    if directory is None:
+        directory = SessionJournal.directory
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def recoverSession(
+    directory: str | None = None, filename: str | None = None
+) -> tuple[dict, list[np.ndarray]] | None:
+    """
+    Rebuilds the session a `SessionJournal` left behind when the program did not stop it.
+
+    Every checkpoint up to the first incomplete one, as cut off by a crash, is read. The log file
+    of the session, if any, is repaired with `repairLog()`:
+    >>> recovered = recoverSession(filename="DATA/recovered.csv")
+    >>> if recovered is not None:
+    ...     manifest, (times, positions, forces) = recovered
+
+    :param directory: directory of the session
+    :type directory: str | None
+    :param filename: CSV file to save the recovered rows to, after which the session is discarded
+    :type filename: str | None
+
+    :returns: manifest and columns, `None` if there is no session
+    :rtype: tuple[dict, list[np.ndarray]] | None
+    """
+    if directory is None:
+        directory = SessionJournal.directory
+    try:
+        with open(os.path.join(directory, _MANIFEST)) as file:
+            manifest: dict = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("filename") is not None and os.path.exists(manifest["filename"]):
+        manifest["repaired"] = repairLog(manifest["filename"])
+
+    nColumns: int = len(manifest["header"].split(","))
+    blocks: list[np.ndarray] = []
+    torn: bool = False
+    for segment in _segments(directory):
+        with open(segment, "rb") as file:
+            data: bytes = file.read()
+        offset: int = 0
+        while offset < len(data):
+            if offset + _RECORD.size > len(data):
+                torn = True
+                break
+            magic, rows, columns, crc = _RECORD.unpack_from(data, offset)
+            start: int = offset + _RECORD.size
+            payload: bytes = data[start : start + 8 * rows * columns]
+            if (
+                magic != _MAGIC
+                or columns != nColumns
+                or len(payload) != 8 * rows * columns
+                or zlib.crc32(payload) != crc
+            ):
+                torn = True
+                break
+            blocks.append(np.frombuffer(payload, dtype=np.float64).reshape(columns, rows))
+            offset = start + len(payload)
+        if torn:
+            # nothing after an incomplete checkpoint was written completely
+            break
+
+    values: np.ndarray = (
+        np.concatenate(blocks, axis=1) if len(blocks) > 0 else np.zeros((nColumns, 0))
+    )
+    recovered: list[np.ndarray] = list(values)
+    if filename is not None:
+        if len(values[0]) > 0:
+            if os.path.dirname(filename) != "":
+                os.makedirs(os.path.dirname(filename), exist_ok=True)
+            log: Logging = Logging(filename)
+            log.createLogGUI(manifest["header"])
+            log.writeLogFull(recovered)
+            log.closeFile()
+            with open(filename, "ab") as file:
+                # on disk before the session is gone
+                os.fsync(file.fileno())
+        discardSession(directory)
+    return manifest, recovered
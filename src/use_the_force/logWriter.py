@@ -0,0 +1,199 @@
+import os
+from queue import Empty, SimpleQueue
+from threading import Event, Thread
+from time import perf_counter
+from typing import Callable
+
+__all__ = ["LogWriter"]
+
+
+def formatRow(row: tuple[float | int, ...]) -> str:
+    """
+    Formats a single row like `Logging.writeLog()`, the first value as is and the others rounded to 8 decimals.
+    """
+    return ",".join([str(row[0])] + [str(round(value, 8)) for value in row[1:]]) + "\n"
+
+
+def formatColumns(columns: list[list[float | int]]) -> str:
+    """
+    Formats columns of equal length like `Logging.writeLogFull()`.
+    """
+    return "".join(",".join(map(str, row)) + "\n" for row in zip(*columns))
+
+
+class _SyncEvent(Event):
+    """
+    Request to flush that also syncs the file to disk, regardless of `fsyncInterval`.
+    """
+
+
+class LogWriter(Thread):
+    def __init__(self, filename: str, **kwargs) -> None:
+        """
+        Thread that appends rows to a log file, so the thread taking the measurements never waits for the disk.
+
+        Rows go onto a queue that never blocks, the thread formats everything queued at once and writes it
+        with a single large write:
+        >>> writer = LogWriter("DATA/measurement.csv")
+        >>> writer.start()
+        >>> writer.put([0.001, 0.0, 12.345678912])
+        >>> writer.stop()
+
+        Written rows reach the OS at least every `flushInterval` and the disk every `fsyncInterval`.
+        `flush()` waits until everything queued before it is written, `stop()` also closes the file.
+
+        :param filename: file to append to, has to exist already
+        :type filename: str
+        :param flushInterval: maximum time written rows stay in the buffer of the file [s]
+        :type flushInterval: float
+        :param fsyncInterval: minimum time between two `os.fsync()` calls [s], 0 after every flush,
+            `None` leaves it to the OS
+        :type fsyncInterval: float | None
+        :param bufferSize: size of the buffer of the file [bytes]
+        :type bufferSize: int
+        :param maxBatch: maximum amount of queued items formatted at once
+        :type maxBatch: int
+        """
+        super().__init__(name="LogWriter", daemon=True)
+        self.filename: str = filename
+        self.flushInterval: float = float(kwargs.pop("flushInterval", 1.0))
+        self.fsyncInterval: float | None = kwargs.pop("fsyncInterval", None)
+        self.bufferSize: int = int(kwargs.pop("bufferSize", 1 << 20))
+        self.maxBatch: int = int(kwargs.pop("maxBatch", 10000))
+
+        # rows written to the file, including those still in its buffer
+        self.rows: int = 0
+        # exception that stopped the thread, raised again on the next `put()`
+        self.error: BaseException | None = None
+
+        self.running: bool = False
+        self._queue: SimpleQueue = SimpleQueue()
+
+    def start(self) -> None:
+        self.running = True
+        super().start()
+
+    def put(self, row: list[float | int]) -> None:
+        """
+        Queues a single row, see `Logging.writeLog()`.
+
+        :raises OSError: If the thread stopped on an error while writing.
+        """
+        self._check()
+        self._queue.put((formatRow, tuple(row), 1))
+
+    def putColumns(self, columns: list[list[float | int]]) -> None:
+        """
+        Queues columns of equal length, see `Logging.writeLogFull()`.
+
+        The columns are copied, so they can change while waiting in the queue.
+        """
+        self._check()
+        columns = [list(column) for column in columns]
+        self._queue.put((formatColumns, columns, min(map(len, columns), default=0)))
+
+    def _check(self) -> None:
+        if self.error is not None:
+            raise OSError(f"writing {self.filename} failed") from self.error
+        if not self.running:
+            raise RuntimeError("LogWriter is not running")
+
+    def run(self) -> None:
+        lastFlush: float = perf_counter()
+        lastSync: float = lastFlush
+        # written but not flushed, flushed but not synced
+        pending: bool = False
+        unsynced: bool = False
+        try:
+            with open(self.filename, "a", buffering=self.bufferSize) as file:
+                while True:
+                    timeout: float = max(0.0, lastFlush + self.flushInterval - perf_counter())
+                    try:
+                        batch: list = [self._queue.get(timeout=timeout if pending else None)]
+                    except Empty:
+                        batch = []
+                    while len(batch) < self.maxBatch:
+                        try:
+                            batch.append(self._queue.get_nowait())
+                        except Empty:
+                            break
+
+                    # `None` stops the thread, an `Event` is a request to flush
+                    markers: list[Event | None] = [
+                        item for item in batch if not isinstance(item, tuple)
+                    ]
+                    items: list[tuple[Callable, object, int]] = [
+                        item for item in batch if isinstance(item, tuple)
+                    ]
+                    if len(items) > 0:
+                        file.write("".join([formatter(payload) for formatter, payload, _ in items]))
+                        self.rows += sum(rows for _, _, rows in items)
+                        pending = True
+
+                    now: float = perf_counter()
+                    if pending and (len(markers) > 0 or now - lastFlush >= self.flushInterval):
+                        file.flush()
+                        lastFlush = now
+                        pending = False
+                        unsynced = True
+                    if unsynced and (
+                        any(isinstance(marker, _SyncEvent) for marker in markers)
+                        or (
+                            self.fsyncInterval is not None
+                            and (len(markers) > 0 or now - lastSync >= self.fsyncInterval)
+                        )
+                    ):
+                        os.fsync(file.fileno())
+                        lastSync = now
+                        unsynced = False
+                    for marker in markers:
+                        if marker is not None:
+                            marker.set()
+                    if None in markers:
+                        break
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.running = False
+            # release everybody waiting in `flush()`
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except Empty:
+                    break
+                if isinstance(item, Event):
+                    item.set()
+
+    def flush(self, timeout: float | None = None, sync: bool = False) -> bool:
+        """
+        Waits until every row queued so far is written to the OS, and to disk with an `fsyncInterval`.
+
+        :param timeout: maximum time to wait [s], `None` waits forever
+        :type timeout: float | None
+        :param sync: also wait until the rows are on the disk without an `fsyncInterval`
+        :type sync: bool
+
+        :returns: if everything was written in time
+        :rtype: bool
+        """
+        if not self.running:
+            return self.error is None
+        done: Event = _SyncEvent() if sync else Event()
+        self._queue.put(done)
+        if not self.running:
+            # stopped in the meantime, after which the queue is not emptied again
+            done.set()
+        return done.wait(timeout) and self.error is None
+
+    def stop(self) -> None:
+        """
+        Writes everything still queued, closes the file and stops the thread.
+
+        :raises OSError: If writing failed.
+        """
+        if self.running:
+            self._queue.put(None)
+        if self.is_alive():
+            self.join()
+        if self.error is not None:
+            raise OSError(f"writing {self.filename} failed") from self.error
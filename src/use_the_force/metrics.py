@@ -0,0 +1,355 @@
+import json
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+from time import perf_counter_ns, time
+from typing import Iterator
+
+import numpy as np
+
+__all__ = ["Histogram", "CommandMetrics", "Metrics"]
+
+
+class Histogram:
+    def __init__(self, **kwargs) -> None:
+        """
+        Histogram of durations with a fixed relative precision (HDR style), memory does not grow with the amount of values.
+
+        Values below `2 ** significantBits` are counted exactly, larger values in buckets
+        `2 ** -(significantBits - 1)` wide relative to their value:
+        >>> histogram = Histogram()
+        >>> histogram.record(1_250_000)
+        >>> histogram.percentile(99)
+
+        :param significantBits: bits of precision, 5 gives buckets of at most about 6% of their value
+        :type significantBits: int
+        :param maxValue: largest value that is counted separately, larger values count as `maxValue`
+        :type maxValue: int
+        """
+        self.significantBits: int = int(kwargs.pop("significantBits", 5))
+        # 60 s in [ns]
+        self.maxValue: int = int(kwargs.pop("maxValue", 60_000_000_000))
+        if self.significantBits < 1:
+            raise ValueError(f"significantBits must be at least 1, got {self.significantBits}")
+
+        self.counts: np.ndarray = np.zeros(self._index(self.maxValue) + 1, dtype=np.int64)
+        self.count: int = 0
+        self.total: int = 0
+        self.min: int = 0
+        self.max: int = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return f"Histogram(count={self.count}, mean={self.mean}, max={self.max})"
+
+    def _index(self, value: int) -> int:
+        """
+        Bucket of `value`.
+        """
+        exact: int = 1 << self.significantBits
+        if value < exact:
+            return max(value, 0)
+        shift: int = value.bit_length() - self.significantBits
+        half: int = exact >> 1
+        return exact + (shift - 1) * half + (value >> shift) - half
+
+    def _bounds(self, index: int) -> tuple[int, int]:
+        """
+        Lowest and highest value of bucket `index`.
+        """
+        exact: int = 1 << self.significantBits
+        if index < exact:
+            return index, index
+        half: int = exact >> 1
+        shift: int = (index - exact) // half + 1
+        top: int = (index - exact) % half + half
+        return top << shift, ((top + 1) << shift) - 1
+
+    @property
+    def mean(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def record(self, value: int) -> None:
+        """
+        Adds a single value.
+
+        :param value: duration [ns]
+        :type value: int
+        """
+        value = int(value)
+        self.counts[self._index(min(value, self.maxValue))] += 1
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q: float) -> float:
+        """
+        Value below which `q` percent of the values are, within the precision of the buckets.
+
+        :param q: percentile, 0 to 100
+        :type q: float
+
+        :returns: middle of the bucket the percentile is in, 0 without values
+        :rtype: float
+        """
+        if self.count == 0:
+            return 0.0
+        rank: int = max(1, int(np.ceil(q / 100 * self.count)))
+        index: int = int(np.searchsorted(np.cumsum(self.counts), rank))
+        low, high = self._bounds(index)
+        return min(max((low + high) / 2, self.min), self.max)
+
+    def merge(self, other: "Histogram") -> None:
+        """
+        Adds all values of a histogram with the same precision.
+        """
+        if len(other.counts) != len(self.counts):
+            raise ValueError("histograms have a different precision or maxValue")
+        if other.count == 0:
+            return
+        self.counts += other.counts
+        self.min = other.min if self.count == 0 else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def clear(self) -> None:
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def snapshot(self) -> dict[str, float]:
+        """
+        Summary of the histogram, all durations in [ns].
+        """
+        return {
+            "count": self.count,
+            "min": self.min,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class CommandMetrics:
+    def __init__(self, **kwargs) -> None:
+        """
+        Counters of a single command, see `Metrics`.
+
+        :param kwargs: passed on to the `Histogram`s
+        """
+        self.calls: int = 0
+        self.errors: int = 0
+        self.bytesSent: int = 0
+        self.bytesReceived: int = 0
+        # time from writing the command until its return line was read
+        self.latency: Histogram = Histogram(**kwargs)
+        # time spent on parsing return lines
+        self.parse: Histogram = Histogram(**kwargs)
+
+    def __repr__(self) -> str:
+        return f"CommandMetrics(calls={self.calls}, errors={self.errors}, latency={self.latency})"
+
+    def clear(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.bytesSent = 0
+        self.bytesReceived = 0
+        self.latency.clear()
+        self.parse.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "bytesSent": self.bytesSent,
+            "bytesReceived": self.bytesReceived,
+            "latency": self.latency.snapshot(),
+            "parse": self.parse.snapshot(),
+        }
+
+
+class Metrics:
+    def __init__(self, **kwargs) -> None:
+        """
+        Per command counters and latency histograms of a sensor, filled in by `Commands`.
+
+        Shows whether slow sampling comes from the serial connection, from parsing or from firmware errors:
+        >>> sensor = ForceSensor("COM0")
+        >>> sensor.cmds.SR()
+        >>> sensor.metrics.snapshot()["SR"]["latency"]["p99"]
+
+        Or written to a file every 10 seconds, a JSON object per line:
+        >>> sensor.metrics.startDump("metrics.jsonl", interval=10)
+
+        Operations spanning several commands, like a tare, are kept apart in `operations`, see `timed()`.
+
+        :param kwargs: passed on to the `Histogram`s
+        """
+        self.histogramOptions: dict = dict(kwargs)
+        self.commands: dict[str, CommandMetrics] = {}
+        self.operations: dict[str, CommandMetrics] = {}
+        self._lock: Lock = Lock()
+        self._dumpThread: Thread | None = None
+        self._dumpStop: Event = Event()
+
+    def __getitem__(self, cmd: str) -> CommandMetrics:
+        return self.command(cmd)
+
+    def command(self, cmd: str) -> CommandMetrics:
+        """
+        Counters of `cmd`, created when not seen before.
+        """
+        return self._counters(self.commands, cmd)
+
+    def operation(self, name: str) -> CommandMetrics:
+        """
+        Counters of the operation `name`, created when not seen before, see `timed()`.
+        """
+        return self._counters(self.operations, name)
+
+    def _counters(self, table: dict[str, CommandMetrics], name: str) -> CommandMetrics:
+        metrics: CommandMetrics | None = table.get(name)
+        if metrics is None:
+            with self._lock:
+                metrics = table.setdefault(name, CommandMetrics(**self.histogramOptions))
+        return metrics
+
+    def sent(self, cmd: str, nBytes: int) -> None:
+        """
+        Counts a call of `cmd` of `nBytes` bytes.
+        """
+        metrics: CommandMetrics = self.command(cmd)
+        with self._lock:
+            metrics.calls += 1
+            metrics.bytesSent += nBytes
+
+    def received(
+        self, cmd: str, nBytes: int, latency: int | None = None, error: bool = False
+    ) -> None:
+        """
+        Counts the reply on `cmd`.
+
+        :param cmd: command that was answered
+        :type cmd: str
+        :param nBytes: bytes received
+        :type nBytes: int
+        :param latency: time from sending until receiving [ns], `None` if unknown
+        :type latency: int | None
+        :param error: if the reply was an error
+        :type error: bool
+        """
+        metrics: CommandMetrics = self.command(cmd)
+        with self._lock:
+            metrics.bytesReceived += nBytes
+            if latency is not None:
+                metrics.latency.record(latency)
+            if error:
+                metrics.errors += 1
+
+    def parsed(self, cmd: str, duration: int) -> None:
+        """
+        Adds the time spent on parsing a return line of `cmd` [ns].
+        """
+        metrics: CommandMetrics = self.command(cmd)
+        with self._lock:
+            metrics.parse.record(duration)
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        """
+        Counts a call of `name` and records how long the block took, for operations spanning several commands:
+        >>> with metrics.timed("tare"):
+        ...     sensor.tare()
+
+        Kept in `operations`, apart from the commands the block sends. An exception in the block counts as an error.
+        """
+        metrics: CommandMetrics = self.operation(name)
+        start: int = perf_counter_ns()
+        error: bool = True
+        try:
+            yield
+            error = False
+        finally:
+            with self._lock:
+                metrics.calls += 1
+                metrics.latency.record(perf_counter_ns() - start)
+                if error:
+                    metrics.errors += 1
+
+    def snapshot(self, operations: bool = False) -> dict[str, dict]:
+        """
+        Copy of all counters per command, durations in [ns].
+
+        :param operations: copy the counters per operation instead, see `timed()`
+        :type operations: bool
+
+        :returns: `{cmd: {"calls", "errors", "bytesSent", "bytesReceived", "latency", "parse"}}`
+        :rtype: dict[str, dict]
+        """
+        table: dict[str, CommandMetrics] = self.operations if operations else self.commands
+        with self._lock:
+            return {name: metrics.snapshot() for name, metrics in table.items()}
+
+    def clear(self) -> None:
+        """
+        Resets all counters.
+        """
+        with self._lock:
+            for metrics in (*self.commands.values(), *self.operations.values()):
+                metrics.clear()
+
+    def dump(self, filename: str) -> None:
+        """
+        Appends a snapshot to `filename` as a single line of JSON, with the time it was taken.
+
+        :param filename: file to append to
+        :type filename: str
+        """
+        line: str = json.dumps(
+            {
+                "time": time(),
+                "commands": self.snapshot(),
+                "operations": self.snapshot(operations=True),
+            }
+        )
+        with open(filename, "a") as file:
+            file.write(line + "\n")
+
+    def startDump(self, filename: str, interval: float = 10.0) -> None:
+        """
+        Calls `dump()` every `interval` seconds from a background thread, until `stopDump()`.
+
+        :param filename: file to append to
+        :type filename: str
+        :param interval: time between snapshots [s]
+        :type interval: float
+        """
+        self.stopDump()
+        self._dumpStop.clear()
+
+        def run() -> None:
+            while not self._dumpStop.wait(interval):
+                self.dump(filename)
+
+        self._dumpThread = Thread(target=run, name="MetricsDump", daemon=True)
+        self._dumpThread.start()
+
+    def stopDump(self) -> None:
+        """
+        Stops the periodic dump, if running.
+        """
+        if self._dumpThread is not None:
+            self._dumpStop.set()
+            self._dumpThread.join()
+            self._dumpThread = None
@@ -3,7 +3,11 @@ import matplotlib
 
 # Use TkAgg backend for interactive plotting
 # TkAgg is way less laggy than the default Agg backend
-matplotlib.use("TkAgg")
+try:
+    matplotlib.use("TkAgg")
+except ImportError:
+    # No Tk on headless machines, e.g. when benchmarking against the simulator
+    pass
 # self.plt.ion()
 
 __all__ = ["Plotting"]
@@ -0,0 +1,105 @@
+from math import sqrt
+
+__all__ = ["RunningStats"]
+
+
+class RunningStats:
+    def __init__(self, **kwargs) -> None:
+        """
+        Running mean and variance (Welford), without keeping the samples.
+
+        Once `minSamples` are in, samples further than `rejectSigma` standard deviations from the mean are rejected as spikes:
+        >>> stats = RunningStats(rejectSigma=5)
+        >>> for count in counts:
+        ...     stats.add(count)
+        ...     if stats.stdError < 0.5:
+        ...         break
+        >>> stats.mean, stats.std, stats.rejected
+
+        :param rejectSigma: rejection threshold [standard deviations], 0 disables rejection
+        :type rejectSigma: float
+        :param minSamples: samples before rejection starts
+        :type minSamples: int
+        :param minSpread: lower bound of the standard deviation used for rejection, so quantised data is not rejected
+        :type minSpread: float
+        """
+        self.rejectSigma: float = float(kwargs.pop("rejectSigma", 5.0))
+        self.minSamples: int = int(kwargs.pop("minSamples", 5))
+        self.minSpread: float = float(kwargs.pop("minSpread", 1.0))
+
+        self.count: int = 0
+        self.rejected: int = 0
+        self.mean: float = 0.0
+        # sum of squared differences from the mean
+        self._m2: float = 0.0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return f"RunningStats(mean={self.mean}, std={self.std}, count={self.count}, rejected={self.rejected})"
+
+    @property
+    def variance(self) -> float:
+        """
+        Sample variance, 0 with less than 2 samples.
+        """
+        if self.count < 2:
+            return 0.0
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self) -> float:
+        """
+        Sample standard deviation.
+        """
+        return sqrt(self.variance)
+
+    @property
+    def stdError(self) -> float:
+        """
+        Standard error of the mean, infinite with less than `minSamples` samples.
+        """
+        if self.count < max(2, self.minSamples):
+            return float("inf")
+        return self.std / sqrt(self.count)
+
+    def isOutlier(self, value: float) -> bool:
+        """
+        If `value` would be rejected as a spike.
+        """
+        if self.rejectSigma <= 0 or self.count < self.minSamples:
+            return False
+        return abs(value - self.mean) > self.rejectSigma * max(self.std, self.minSpread)
+
+    def add(self, value: float) -> bool:
+        """
+        Adds a single sample.
+
+        :param value: sample
+        :type value: float
+
+        :returns: if the sample was accepted
+        :rtype: bool
+        """
+        if self.isOutlier(value):
+            self.rejected += 1
+            return False
+        self.count += 1
+        delta: float = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        return True
+
+    def extend(self, values) -> None:
+        """
+        Adds all samples in `values`.
+        """
+        for value in values:
+            self.add(value)
+
+    def clear(self) -> None:
+        self.count = 0
+        self.rejected = 0
+        self.mean = 0.0
+        self._m2 = 0.0
@@ -0,0 +1,226 @@
+from threading import Event, Thread
+from time import perf_counter_ns
+
+import numpy as np
+
+from use_the_force._logging import Logging
+from use_the_force.forceSensor import ForceSensor
+from use_the_force.serialReader import RingBuffer
+
+__all__ = ["SensorGroup"]
+
+
+class SensorGroup:
+    def __init__(self, PortNames: list[str], **kwargs) -> None:
+        """
+        Several force sensors that are read at the same time.
+
+        Every sensor streams from its own thread, so the throughput grows with the amount of ports.
+        All samples are stamped against a single shared `perf_counter_ns` epoch `T0`,
+        and can be written to a single log with one force column per sensor:
+        >>> with SensorGroup(["COM3", "COM4"]) as group:
+        ...     group.tare()
+        ...     log = Logging("DATA/group.csv")
+        ...     log.createLogGUI(group.header)
+        ...     group.start(log)
+        ...     sleep(10)
+        ...     group.stop()
+
+        :param PortNames: port of every sensor
+        :type PortNames: list[str]
+        :param nReads: lines per `CR` chunk
+        :type nReads: int
+        :param iReads: interval inbetween lines [ms]
+        :type iReads: int
+        :param size: amount of samples kept per sensor
+        :type size: int
+        :param writeInterval: time inbetween writes to the log [s]
+        :type writeInterval: float
+        """
+        self.nReads: int = int(kwargs.pop("nReads", 1000))
+        self.iReads: int = int(kwargs.pop("iReads", 0))
+        self.writeInterval: float = float(kwargs.pop("writeInterval", 0.1))
+        size: int = int(kwargs.pop("size", 65536))
+
+        self.PortNames: list[str] = list(PortNames)
+        self.sensors: list[ForceSensor] = []
+        try:
+            for PortName in self.PortNames:
+                self.sensors.append(ForceSensor(PortName, **kwargs))
+        except Exception:
+            for sensor in self.sensors:
+                sensor.ClosePort()
+            raise
+
+        # host times relative to `T0` [ns], device times and forces per sensor
+        self.samples: list[RingBuffer] = [RingBuffer(size) for _ in self.sensors]
+        self.errors: list[BaseException | None] = [None for _ in self.sensors]
+        self.T0: int = perf_counter_ns()
+
+        self.log: Logging | None = None
+        self._stop: Event = Event()
+        self._threads: list[Thread] = []
+        self._writerThread: Thread | None = None
+        # per sensor: index of the next sample to write and last force written
+        self._indices: list[int] = [0 for _ in self.sensors]
+        self._held: np.ndarray = np.full(len(self.sensors), np.nan)
+
+    def __enter__(self) -> "SensorGroup":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.sensors)
+
+    @property
+    def header(self) -> str:
+        """
+        Column names of the merged log, time followed by the force of every port.
+        """
+        return ",".join(["Time"] + [f"Force {PortName}" for PortName in self.PortNames])
+
+    def tare(self) -> None:
+        """
+        Tares all sensors at the same time.
+        """
+        threads: list[Thread] = [Thread(target=sensor.tare) for sensor in self.sensors]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def start(self, log: Logging | None = None) -> None:
+        """
+        Starts streaming from all sensors, resets the shared epoch `T0`.
+
+        :param log: log to write the merged samples to, already created with `header`
+        :type log: Logging | None
+        """
+        if self.running:
+            raise RuntimeError("SensorGroup is already running")
+        self._stop.clear()
+        self.log = log
+        for i, samples in enumerate(self.samples):
+            samples.clear()
+            self._indices[i] = samples.count
+            self.errors[i] = None
+        self._held[:] = np.nan
+
+        self.T0 = perf_counter_ns()
+        self._threads = [
+            Thread(target=self._acquire, args=(i,), name=f"SensorGroup-{PortName}", daemon=True)
+            for i, PortName in enumerate(self.PortNames)
+        ]
+        for thread in self._threads:
+            thread.start()
+        if self.log is not None:
+            self._writerThread = Thread(target=self._writer, name="SensorGroup-writer", daemon=True)
+            self._writerThread.start()
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def stop(self) -> None:
+        """
+        Stops streaming and writes the remaining samples.
+
+        :raises RuntimeError: If a sensor stopped with an error.
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        if self._writerThread is not None:
+            self._writerThread.join()
+            self._writerThread = None
+        if self.log is not None:
+            self._write(final=True)
+
+        for PortName, error in zip(self.PortNames, self.errors):
+            if error is not None:
+                raise RuntimeError(f"{PortName}: {error}") from error
+
+    def close(self) -> None:
+        """
+        Always close after use.
+        """
+        if self.running:
+            self._stop.set()
+            for thread in self._threads:
+                thread.join()
+        for sensor in self.sensors:
+            sensor.ClosePort()
+
+    def _acquire(self, i: int) -> None:
+        """
+        Streams a single sensor into its ring buffer, run by one thread per sensor.
+        """
+        sensor: ForceSensor = self.sensors[i]
+        samples: RingBuffer = self.samples[i]
+        stream = sensor.stream(self.nReads, self.iReads)
+        try:
+            for deviceTime, count in stream:
+                samples.append(perf_counter_ns() - self.T0, deviceTime, sensor.ForceFix(count))
+                if self._stop.is_set():
+                    break
+        except Exception as e:
+            self.errors[i] = e
+        finally:
+            try:
+                stream.close()
+            except Exception as e:
+                self.errors[i] = self.errors[i] or e
+
+    def merged(self, final: bool = False) -> list[list[float]]:
+        """
+        Takes all samples not merged yet as rows with one column per sensor.
+
+        Every sample becomes a row at its own host time, the other sensors hold their last value (`nan` before their first sample).
+        Samples are only taken up to the latest time every running sensor has reached, so rows stay in order.
+
+        :param final: take all remaining samples
+        :type final: bool
+
+        :returns: [[time], [force of the first sensor], ...], time in [s] since `T0`
+        :rtype: list[list[float]]
+        """
+        new: list[tuple[np.ndarray, np.ndarray]] = []
+        for i, samples in enumerate(self.samples):
+            hostTime, _, force, count = samples.since(self._indices[i])
+            new.append((hostTime, force))
+            self._indices[i] = count - len(hostTime)
+
+        if not final:
+            latest: list[int] = [
+                int(hostTime[-1]) if len(hostTime) > 0 else -1
+                for (hostTime, _), thread in zip(new, self._threads)
+                if thread.is_alive()
+            ]
+            cutoff: int = min(latest, default=np.iinfo(np.int64).max)
+            new = [
+                (hostTime[: np.searchsorted(hostTime, cutoff, side="right")], force)
+                for hostTime, force in new
+            ]
+
+        times: np.ndarray = np.sort(np.concatenate([hostTime for hostTime, _ in new]), kind="stable")
+        columns: list[list[float]] = [(times / 1e9).tolist()]
+        for i, (hostTime, force) in enumerate(new):
+            self._indices[i] += len(hostTime)
+            index: np.ndarray = np.searchsorted(hostTime, times, side="right") - 1
+            held: np.ndarray = np.full(len(times), self._held[i])
+            held[index >= 0] = force[index[index >= 0]]
+            if len(hostTime) > 0:
+                self._held[i] = force[len(hostTime) - 1]
+            columns.append(held.tolist())
+        return columns
+
+    def _write(self, final: bool = False) -> None:
+        columns: list[list[float]] = self.merged(final)
+        if len(columns[0]) > 0:
+            self.log.writeLogFull(columns)
+
+    def _writer(self) -> None:
+        while not self._stop.wait(self.writeInterval):
+            self._write()
@@ -0,0 +1,251 @@
+from collections import deque
+from threading import Condition, Lock, Thread
+from time import perf_counter_ns
+
+import numpy as np
+import serial
+
+__all__ = ["SerialReader", "RingBuffer"]
+
+
+def parseSample(line: str) -> tuple[int, float] | None:
+    """
+    Parses a line of `CR` output into `(time, force)`.
+
+    :param line: stripped line from the sensor
+    :type line: str
+
+    :returns: `(time, force)`, or `None` if the line is not a sample
+    :rtype: tuple[int, float] | None
+    """
+    values: list[str] = line.split(": ")[-1].replace(";", ",").split(",")
+    if len(values) != 2:
+        return None
+    try:
+        return int(values[0]), float(values[1])
+    except ValueError:
+        return None
+
+
+class RingBuffer:
+    def __init__(self, size: int = 65536) -> None:
+        """
+        Fixed-size buffer of samples that can be shared between threads.
+
+        Once full, the oldest samples are overwritten.
+        Every sample gets an ever increasing index, so multiple consumers can each keep track of what they already read:
+        >>> index = 0
+        >>> hostTime, deviceTime, force, index = buffer.since(index)
+
+        :param size: maximum amount of samples kept
+        :type size: int
+        """
+        self.size: int = int(size)
+        self.hostTime: np.ndarray = np.zeros(self.size, dtype=np.int64)
+        self.deviceTime: np.ndarray = np.zeros(self.size, dtype=np.int64)
+        self.force: np.ndarray = np.zeros(self.size, dtype=np.float64)
+        # total amount of samples ever written
+        self.count: int = 0
+        # index of the oldest sample kept after `clear()`
+        self._start: int = 0
+        self._lock: Lock = Lock()
+
+    def __len__(self) -> int:
+        return self.count - max(self.count - self.size, self._start)
+
+    def append(self, hostTime: int, deviceTime: int, force: float) -> None:
+        """
+        Adds a single sample, overwriting the oldest one if full.
+
+        :param hostTime: host timestamp [ns]
+        :type hostTime: int
+        :param deviceTime: device timestamp
+        :type deviceTime: int
+        :param force: read force
+        :type force: float
+        """
+        with self._lock:
+            i: int = self.count % self.size
+            self.hostTime[i] = hostTime
+            self.deviceTime[i] = deviceTime
+            self.force[i] = force
+            self.count += 1
+
+    def since(self, index: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """
+        Copies all samples written from `index` onwards.
+
+        If samples have already been overwritten, starts at the oldest sample still available.
+
+        :param index: index of the first sample to return
+        :type index: int
+
+        :returns: host times, device times, forces and the index to continue from
+        :rtype: tuple[np.ndarray, np.ndarray, np.ndarray, int]
+        """
+        with self._lock:
+            start: int = max(index, self.count - self.size, self._start)
+            positions: np.ndarray = np.arange(start, self.count) % self.size
+            return (
+                self.hostTime[positions],
+                self.deviceTime[positions],
+                self.force[positions],
+                self.count,
+            )
+
+    def extend(
+        self, hostTime: int | np.ndarray, deviceTime: np.ndarray, force: np.ndarray
+    ) -> None:
+        """
+        Adds a block of samples, overwriting the oldest ones if full.
+
+        :param hostTime: host timestamps [ns], or a single one for the whole block
+        :type hostTime: int | np.ndarray
+        :param deviceTime: device timestamps
+        :type deviceTime: np.ndarray
+        :param force: read forces
+        :type force: np.ndarray
+        """
+        n: int = len(force)
+        if n == 0:
+            return
+        # only the last `size` samples of the block are kept
+        keep: int = min(n, self.size)
+        hostTimes: np.ndarray = np.broadcast_to(hostTime, (n,))[n - keep :]
+        with self._lock:
+            positions: np.ndarray = np.arange(self.count + n - keep, self.count + n) % self.size
+            self.hostTime[positions] = hostTimes
+            self.deviceTime[positions] = deviceTime[n - keep :]
+            self.force[positions] = force[n - keep :]
+            self.count += n
+
+    def latest(self, n: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Copies the last `n` samples.
+
+        :param n: amount of samples
+        :type n: int
+
+        :returns: host times, device times and forces
+        :rtype: tuple[np.ndarray, np.ndarray, np.ndarray]
+        """
+        return self.since(self.count - n)[:3]
+
+    def clear(self) -> None:
+        """
+        Removes all samples, indices keep increasing.
+        """
+        with self._lock:
+            self._start = self.count
+
+
+class SerialReader(Thread):
+    def __init__(
+        self, serialConnection: serial.Serial, size: int = 65536, bufferSize: int = 1 << 20
+    ) -> None:
+        """
+        Thread that continuously drains the serial connection.
+
+        Received bytes are kept in order for a single consumer, `Commands`, which takes them in whole chunks with `read()`.
+        Samples that `Commands` parses from `CR` are published in `samples`, so any other thread can follow them.
+
+        >>> reader = SerialReader(sensor.ser)
+        >>> reader.start()
+        >>> sensor.cmds.reader = reader
+
+        :param serialConnection: serial connection to sensor
+        :type serialConnection: Serial
+        :param size: amount of samples kept in the ring buffer
+        :type size: int
+        :param bufferSize: maximum amount of bytes kept that were not read yet, once full the oldest lines are dropped and counted in `dropped`
+        :type bufferSize: int
+        """
+        super().__init__(name="SerialReader", daemon=True)
+        self.serialConnection: serial.Serial = serialConnection
+        self.samples: RingBuffer = RingBuffer(size)
+        self.bufferSize: int = int(bufferSize)
+
+        self.running: bool = False
+        # lines dropped because nothing read them in time
+        self.dropped: int = 0
+        # host time [ns] the latest bytes arrived
+        self.received: int = 0
+        self._data: bytearray = bytearray()
+        # lines dropped since the previous `read()`
+        self._unreported: int = 0
+        self._condition: Condition = Condition()
+    def start(self) -> None:
+        self.running = True
+        super().start()
+
+    def run(self) -> None:
+        while self.running and self.serialConnection.is_open:
+            try:
+                # blocks until at least a single byte is available, then takes everything
+                data: bytes = self.serialConnection.read(
+                    max(1, self.serialConnection.in_waiting)
+                )
+            except (serial.SerialException, OSError, TypeError):
+                break
+            if len(data) > 0:
+                self._feed(data, perf_counter_ns())
+        self.running = False
+        with self._condition:
+            self._condition.notify_all()
+
+    def _feed(self, data: bytes, hostTime: int) -> None:
+        """
+        Keeps received bytes for `read()`, dropping the oldest lines if more than `bufferSize` are waiting.
+        """
+        with self._condition:
+            self._data += data
+            self.received = hostTime
+            overflow: int = len(self._data) - self.bufferSize
+            if overflow > 0:
+                # up to the end of the line holding the last byte that does not fit
+                end: int = self._data.find(b"\n", overflow - 1)
+                end = len(self._data) if end < 0 else end + 1
+                lines: int = max(self._data.count(b"\n", 0, end), 1)
+                del self._data[:end]
+                self.dropped += lines
+                self._unreported += lines
+            self._condition.notify_all()
+
+    def read(self, timeout: float | None = None) -> tuple[bytes, int]:
+        """
+        Takes everything received so far, waits for the first bytes if nothing is waiting.
+
+        :param timeout: maximum time to wait [s], `None` waits forever
+        :type timeout: float | None
+
+        :returns: received bytes, empty if nothing arrived in time, and the amount of lines dropped since the previous read
+        :rtype: tuple[bytes, int]
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: len(self._data) > 0 or not self.running, timeout
+            )
+            data: bytes = bytes(self._data)
+            self._data.clear()
+            dropped: int = self._unreported
+            self._unreported = 0
+            return data, dropped
+
+    def clear(self) -> None:
+        """
+        Drops all bytes that have not been read yet, samples are kept.
+        """
+        with self._condition:
+            self._data.clear()
+
+    def stop(self) -> None:
+        """
+        Stops the thread, the serial connection stays open.
+        """
+        self.running = False
+        try:
+            self.serialConnection.cancel_read()
+        except (AttributeError, serial.SerialException, OSError):
+            pass
+        if self.is_alive():
+            self.join()
@@ -0,0 +1,287 @@
+import struct
+from threading import Condition, Lock
+from time import perf_counter_ns, time_ns
+from typing import BinaryIO, Iterator
+
+import serial
+
+__all__ = ["RecordingSerial", "ReplaySerial", "readTrace", "SENT", "RECEIVED"]
+
+# File layout: header, then a record per read or write
+#   header: magic, format version, wall clock time at the start [ns since epoch]
+#   record: time since the start [ns], direction, length, bytes
+_MAGIC: bytes = b"UTFTRACE"
+_VERSION: int = 1
+_HEADER: struct.Struct = struct.Struct("<8sBq")
+_RECORD: struct.Struct = struct.Struct("<qBI")
+
+SENT: int = 0
+RECEIVED: int = 1
+
+
+def readTrace(filename: str) -> Iterator[tuple[int, int, bytes]]:
+    """
+    Reads a trace written by `RecordingSerial`.
+
+    >>> for time, direction, data in readTrace("session.trace"):
+    ...     print(time, "->" if direction == SENT else "<-", data)
+
+    :param filename: trace file
+    :type filename: str
+
+    :returns: generator of `(time since the start [ns], SENT or RECEIVED, bytes)`
+    :rtype: Iterator[tuple[int, int, bytes]]
+
+    :raises ValueError: If the file is not a trace.
+    """
+    with open(filename, "rb") as file:
+        magic, version, _ = _HEADER.unpack(file.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{filename} is not a serial trace of version {_VERSION}")
+        while True:
+            head: bytes = file.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                # a recording that was cut off ends at the last complete record
+                return
+            time, direction, length = _RECORD.unpack(head)
+            data: bytes = file.read(length)
+            if len(data) < length:
+                return
+            yield time, direction, data
+
+
+class RecordingSerial:
+    def __init__(self, serialConnection: serial.Serial, filename: str) -> None:
+        """
+        Wraps a serial connection and writes every byte sent and received to a trace file.
+
+        Behaves like the wrapped connection, see `ForceSensor.record()`:
+        >>> sensor.record("session.trace")
+        >>> sensor.cmds.SR()
+        >>> sensor.stopRecording()
+
+        Only bytes that were actually read end up in the trace, so input that was discarded
+        with `reset_input_buffer()` is not replayed either.
+
+        :param serialConnection: connection to record
+        :type serialConnection: Serial
+        :param filename: trace file to write, overwritten if it exists
+        :type filename: str
+        """
+        # set directly, every other attribute goes to the wrapped connection
+        object.__setattr__(self, "serialConnection", serialConnection)
+        object.__setattr__(self, "filename", filename)
+        object.__setattr__(self, "_file", open(filename, "wb"))
+        object.__setattr__(self, "_lock", Lock())
+        object.__setattr__(self, "_start", perf_counter_ns())
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION, time_ns()))
+
+    def __getattr__(self, name: str):
+        return getattr(self.serialConnection, name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self.serialConnection, name, value)
+
+    def _record(self, time: int, direction: int, data: bytes) -> None:
+        if len(data) == 0:
+            return
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(_RECORD.pack(time - self._start, direction, len(data)))
+                self._file.write(data)
+
+    def write(self, data: bytes) -> int | None:
+        self._record(perf_counter_ns(), SENT, bytes(data))
+        return self.serialConnection.write(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data: bytes = self.serialConnection.read(size)
+        self._record(perf_counter_ns(), RECEIVED, data)
+        return data
+
+    def read_until(self, expected: bytes = b"\n", size: int | None = None) -> bytes:
+        data: bytes = self.serialConnection.read_until(expected, size)
+        self._record(perf_counter_ns(), RECEIVED, data)
+        return data
+
+    def stop(self) -> serial.Serial:
+        """
+        Closes the trace file, the connection itself stays open.
+
+        :returns: the wrapped connection
+        :rtype: Serial
+        """
+        with self._lock:
+            self._file.close()
+        return self.serialConnection
+
+
+class ReplaySerial:
+    def __init__(self, filename: str, **kwargs) -> None:
+        """
+        Serial connection that answers with the bytes of a trace written by `RecordingSerial`.
+
+        Received bytes are released in the order of the trace, but never before the bytes that were sent
+        ahead of them in the recording have been written again. So the same session can be replayed
+        through `Commands` without hardware:
+        >>> sensor = ForceSensor.replay("session.trace", realtime=False)
+        >>> sensor.cmds.SR()
+
+        With `realtime`, every received chunk also waits as long after the preceding write as it did
+        in the recording, divided by `speed`. Without it, the trace is replayed as fast as possible.
+
+        :param realtime: keep the timing of the recording
+        :type realtime: bool
+        :param speed: replay speed relative to the recording, with `realtime`
+        :type speed: float
+        :param timeout: read timeout [s], `None` waits forever
+        :type timeout: float | None
+        """
+        self.realtime: bool = bool(kwargs.pop("realtime", True))
+        self.speed: float = float(kwargs.pop("speed", 1.0))
+        self.timeout: float | None = kwargs.pop("timeout", 5)
+        self.port: str = filename
+        self.is_open: bool = False
+
+        # bytes sent in the recording at the end of every write, and its time
+        self._txEnds: list[int] = []
+        self._txTimes: list[int] = []
+        # received chunks: (time, index of the preceding write or -1, bytes)
+        self._rx: list[tuple[int, int, bytes]] = []
+        sent: int = 0
+        for time, direction, data in readTrace(filename):
+            if direction == SENT:
+                sent += len(data)
+                self._txEnds.append(sent)
+                self._txTimes.append(time)
+            else:
+                self._rx.append((time, len(self._txEnds) - 1, data))
+
+        self._condition: Condition = Condition()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._opened: int = perf_counter_ns()
+        self._written: int = 0
+        # host times at which every write of the recording was completed again
+        self._txDone: list[int] = []
+        self._rxIndex: int = 0
+        self._buffer: bytearray = bytearray()
+        self._cancelled: bool = False
+
+    @property
+    def finished(self) -> bool:
+        """
+        If all received bytes of the trace were read.
+        """
+        return self._rxIndex == len(self._rx) and len(self._buffer) == 0
+
+    def _release(self) -> int | None:
+        """
+        Moves all received chunks that are due into the input buffer.
+
+        :returns: host time the next chunk is due [ns], `None` if it waits for a write or the trace has ended
+        :rtype: int | None
+        """
+        while self._rxIndex < len(self._rx):
+            time, txIndex, data = self._rx[self._rxIndex]
+            if txIndex >= len(self._txDone):
+                return None
+            if self.realtime:
+                anchorHost: int = self._opened if txIndex < 0 else self._txDone[txIndex]
+                anchorTrace: int = 0 if txIndex < 0 else self._txTimes[txIndex]
+                due: int = anchorHost + int((time - anchorTrace) / self.speed)
+                if perf_counter_ns() < due:
+                    return due
+            self._buffer += data
+            self._rxIndex += 1
+        return None
+
+    def open(self) -> None:
+        with self._condition:
+            self._reset()
+            self.is_open = True
+
+    def close(self) -> None:
+        with self._condition:
+            self.is_open = False
+            self._condition.notify_all()
+
+    def setPort(self, port: str) -> None:
+        pass
+
+    def setRTS(self, level: bool = True) -> None:
+        pass
+
+    def setDTR(self, level: bool = True) -> None:
+        pass
+
+    @property
+    def in_waiting(self) -> int:
+        with self._condition:
+            self._release()
+            return len(self._buffer)
+
+    def write(self, data: bytes) -> int:
+        if not self.is_open:
+            raise serial.PortNotOpenError()
+        with self._condition:
+            self._written += len(data)
+            now: int = perf_counter_ns()
+            while (
+                len(self._txDone) < len(self._txEnds)
+                and self._written >= self._txEnds[len(self._txDone)]
+            ):
+                self._txDone.append(now)
+            self._condition.notify_all()
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        """
+        Waits until `size` bytes are available or the timeout has passed, like `Serial.read()`.
+        """
+        if not self.is_open:
+            raise serial.PortNotOpenError()
+        end: int | None = None
+        if self.timeout is not None:
+            end = perf_counter_ns() + int(self.timeout * 1e9)
+        with self._condition:
+            self._cancelled = False
+            while len(self._buffer) < size and self.is_open and not self._cancelled:
+                due: int | None = self._release()
+                if len(self._buffer) >= size:
+                    break
+                now: int = perf_counter_ns()
+                if end is not None and now >= end:
+                    break
+                wait: list[int] = [t - now for t in (due, end) if t is not None]
+                self._condition.wait(min(wait) / 1e9 if len(wait) > 0 else None)
+            data: bytes = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            return data
+
+    def read_until(self, expected: bytes = b"\n", size: int | None = None) -> bytes:
+        line: bytearray = bytearray()
+        while size is None or len(line) < size:
+            data: bytes = self.read(1)
+            if len(data) == 0:
+                break
+            line += data
+            if line.endswith(expected):
+                break
+        return bytes(line)
+
+    def cancel_read(self) -> None:
+        with self._condition:
+            self._cancelled = True
+            self._condition.notify_all()
+
+    def flush(self) -> None:
+        pass
+
+    def reset_input_buffer(self) -> None:
+        # every byte in the trace was read in the recording, so none are discarded here
+        pass
+
+    def reset_output_buffer(self) -> None:
+        pass
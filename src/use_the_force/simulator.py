@@ -0,0 +1,295 @@
+import heapq
+import os
+import random
+import select
+import tty
+from threading import Thread
+from time import perf_counter
+
+__all__ = ["SimulatedSensor"]
+
+
+class SimulatedSensor:
+    def __init__(self, **kwargs) -> None:
+        """
+        Simulated M5Din Meter firmware on a pseudo-terminal, to test and benchmark without hardware. Linux only.
+
+        Implements the `#CMD args;` protocol, `port` can be given to `ForceSensor` like any other port:
+        >>> with SimulatedSensor(latency=0.002, noise=50) as sim:
+        ...     sensor = ForceSensor(sim.port)
+        ...     sensor.cmds.SR()
+        411023.0
+
+        :param latency: delay before every reply [s]
+        :type latency: float
+        :param sampleRate: rate at which the load cell is read [Hz]
+        :type sampleRate: float
+        :param count: count without load
+        :type count: float
+        :param noise: standard deviation of the count
+        :type noise: float
+        :param stiffness: count added per mm that the stage is above `contactPos`
+        :type stiffness: float
+        :param contactPos: position at which the stage touches the load cell [mm]
+        :type contactPos: float
+        :param velocity: stage velocity, in the same units as `SV`
+        :type velocity: int
+        :param homePos: position the stage moves to after homing [mm]
+        :type homePos: int
+        :param homed: if the stage starts homed, otherwise `GP` returns -1 until `HM`
+        :type homed: bool
+        :param drift: relative rate error of the device clock
+        :type drift: float
+        :param errorRate: chance that a command is answered with an error
+        :type errorRate: float
+        :param garbageRate: chance that a line is garbled
+        :type garbageRate: float
+        :param version: firmware version returned by `VR`
+        :type version: str
+        :param motorID: motor ID returned by `ID`
+        :type motorID: str
+        :param seed: seed for the noise and error injection
+        :type seed: int | None
+        """
+        self.latency: float = float(kwargs.pop("latency", 0.0))
+        self.sampleRate: float = float(kwargs.pop("sampleRate", 80.0))
+        self.count: float = float(kwargs.pop("count", 411023.0))
+        self.noise: float = float(kwargs.pop("noise", 0.0))
+        self.stiffness: float = float(kwargs.pop("stiffness", 0.0))
+        self.contactPos: float = float(kwargs.pop("contactPos", 46.0))
+        self.velocity: int = int(kwargs.pop("velocity", 60))
+        self.homePos: int = int(kwargs.pop("homePos", 10))
+        self.drift: float = float(kwargs.pop("drift", 0.0))
+        self.errorRate: float = float(kwargs.pop("errorRate", 0.0))
+        self.garbageRate: float = float(kwargs.pop("garbageRate", 0.0))
+        self.version: str = str(kwargs.pop("version", "1.0.0"))
+        self.motorID: str = str(kwargs.pop("motorID", "SIM"))
+        self.random: random.Random = random.Random(kwargs.pop("seed", None))
+
+        self.minPos: int = 1
+        self.maxPos: int = 46
+        self.homed: bool = bool(kwargs.pop("homed", False))
+        # stage moves linearly from `_startPos` at `_startTime` to `_targetPos`
+        self._startPos: float = float(self.homePos)
+        self._targetPos: float = float(self.homePos)
+        self._startTime: float = 0.0
+
+        # commands received, for inspection in tests and benchmarks
+        self.received: list[str] = []
+
+        self.port: str
+        self.running: bool = False
+        self._thread: Thread | None = None
+        self._T0: float = perf_counter()
+        self._outgoing: list[tuple[float, int, bytes]] = []
+        self._sequence: int = 0
+        self._crRemaining: int = 0
+        self._crNext: float = 0.0
+        self._crInterval: float = 0.0
+        self._crFirst: bool = False
+
+    def __enter__(self) -> "SimulatedSensor":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self) -> str:
+        """
+        Opens the pseudo-terminal and starts answering commands.
+
+        :returns: port name to connect to
+        :rtype: str
+        """
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self._wakeRead, self._wakeWrite = os.pipe()
+        self.port = os.ttyname(self._slave)
+
+        self._T0 = perf_counter()
+        self.running = True
+        self._thread = Thread(target=self._serve, name="SimulatedSensor", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self) -> None:
+        """
+        Stops answering and closes the pseudo-terminal.
+        """
+        if not self.running:
+            return
+        self.running = False
+        os.write(self._wakeWrite, b"\0")
+        if self._thread is not None:
+            self._thread.join()
+        for fd in (self._master, self._slave, self._wakeRead, self._wakeWrite):
+            os.close(fd)
+
+    #########
+    # STAGE #
+    #########
+    def position(self, now: float | None = None) -> float:
+        """
+        Current position of the stage [mm].
+        """
+        if now is None:
+            now = perf_counter()
+        distance: float = self._targetPos - self._startPos
+        travelled: float = (now - self._startTime) * self.velocity / 60
+        if travelled >= abs(distance):
+            return self._targetPos
+        return self._startPos + travelled * (1 if distance > 0 else -1)
+
+    def _move(self, position: float, now: float) -> None:
+        self._startPos = self.position(now)
+        self._startTime = now
+        self._targetPos = float(position)
+
+    def read(self, now: float | None = None) -> float:
+        """
+        Current count of the load cell.
+        """
+        load: float = max(0.0, self.position(now) - self.contactPos) * self.stiffness
+        return round(self.count + load + self.random.gauss(0.0, self.noise))
+
+    ###########
+    # SERVING #
+    ###########
+    def _serve(self) -> None:
+        incoming: bytearray = bytearray()
+        outgoing: bytearray = bytearray()
+        while self.running:
+            now: float = perf_counter()
+            while len(self._outgoing) > 0 and self._outgoing[0][0] <= now:
+                outgoing += heapq.heappop(self._outgoing)[2]
+            while self._crRemaining > 0 and self._crNext <= now:
+                self._emitSample(self._crNext, outgoing)
+
+            deadlines: list[float] = [item[0] for item in self._outgoing[:1]]
+            if self._crRemaining > 0:
+                deadlines.append(self._crNext)
+            timeout: float | None = None
+            if len(deadlines) > 0:
+                timeout = max(0.0, min(deadlines) - now)
+
+            readable, writable, _ = select.select(
+                [self._master, self._wakeRead],
+                [self._master] if len(outgoing) > 0 else [],
+                [],
+                timeout,
+            )
+            if self._master in writable:
+                try:
+                    written: int = os.write(self._master, outgoing)
+                    del outgoing[:written]
+                except BlockingIOError:
+                    pass
+            if self._master in readable:
+                try:
+                    incoming += os.read(self._master, 4096)
+                except (BlockingIOError, OSError):
+                    continue
+                while b";" in incoming:
+                    frame, _, rest = incoming.partition(b";")
+                    incoming = bytearray(rest)
+                    self._handle(frame.decode(errors="replace"), perf_counter())
+
+    def _reply(self, line: str, due: float) -> None:
+        data: bytes = (line + "\n").encode()
+        if self.garbageRate > 0 and self.random.random() < self.garbageRate:
+            junk: bytes = bytes(self.random.randrange(33, 127) for _ in range(3))
+            data = junk + data[self.random.randrange(len(data)) :]
+        heapq.heappush(self._outgoing, (due, self._sequence, data))
+        self._sequence += 1
+
+    def _emitSample(self, due: float, outgoing: bytearray) -> None:
+        separator: str = ";" if self._crFirst else ","
+        self._crFirst = False
+        deviceTime: int = int((due - self._T0) * 1000 * (1 + self.drift))
+        self._reply(f"[CR]: {deviceTime}{separator}{self.read(due):.0f}", due)
+        while len(self._outgoing) > 0 and self._outgoing[0][0] <= due:
+            outgoing += heapq.heappop(self._outgoing)[2]
+        self._crRemaining -= 1
+        self._crNext += self._crInterval
+
+    def _handle(self, frame: str, now: float) -> None:
+        """
+        Answers a single `#CMD args` frame.
+        """
+        frame = frame.strip()
+        if not frame.startswith("#"):
+            return
+        self.received.append(frame)
+        cmd: str = frame[1:3]
+        args: str = frame[3:].strip()
+        due: float = now + self.latency
+
+        if self.errorRate > 0 and self.random.random() < self.errorRate:
+            self._reply("[ERROR]: simulated error", due)
+            return
+
+        if cmd == "SR":
+            self._reply(f"[SR]: {self.read(now):.0f}", due)
+        elif cmd == "CR":
+            try:
+                nReads, iReads = (int(arg) for arg in args.split(","))
+            except ValueError:
+                self._reply("[ERROR]: invalid arguments", due)
+                return
+            self._crRemaining = nReads + 1
+            self._crFirst = True
+            self._crInterval = max(iReads / 1000, 1 / self.sampleRate)
+            self._crNext = due
+        elif cmd == "AB":
+            self._crRemaining = 0
+            self._reply("[AB]: aborted", due)
+        elif cmd == "GP":
+            target: int = round(self._targetPos) if self.homed else -1
+            self._reply(f"[GP]: {target}", due)
+        elif cmd == "GV":
+            self._reply(f"[GV]: {self.velocity}", due)
+        elif cmd == "SV":
+            try:
+                velocity: int = int(args)
+            except ValueError:
+                self._reply("[ERROR]: invalid arguments", due)
+                return
+            if velocity < 1 or velocity > 120:
+                self._reply("[ERROR]: velocity out of range", due)
+                return
+            # continue the running movement at the new velocity
+            self._move(self._targetPos, now)
+            self.velocity = velocity
+            self._reply(f"[SV]: {velocity}", due)
+        elif cmd == "SP":
+            try:
+                position: int = int(args)
+            except ValueError:
+                self._reply("[ERROR]: invalid arguments", due)
+                return
+            if not self.homed:
+                self._reply("[ERROR]: movement aborted, home to unlock", due)
+            elif position < self.minPos or position > self.maxPos:
+                self._reply("[ERROR]: position out of range", due)
+            else:
+                self._move(position, now)
+                self._reply(f"[SP]: {position}", due)
+        elif cmd == "HM":
+            self.homed = True
+            self._startPos, self._startTime = 0.0, now
+            self._targetPos = float(self.homePos)
+            self._reply("[HM]: homing", due)
+        elif cmd == "ST":
+            self._move(self.position(now), now)
+            self.homed = False
+            self._reply("[ST]: stopped", due)
+        elif cmd == "VR":
+            self._reply(f"[VR]: {self.version}", due)
+        elif cmd == "ID":
+            self._reply(f"[ID]: {self.motorID}", due)
+        elif cmd in ("CM", "CZ", "DC", "SF", "TR", "UL", "UU", "UX", "UY"):
+            self._reply(f"[{cmd}]: OK", due)
+        else:
+            self._reply(f"[ERROR]: unknown command {cmd}", due)
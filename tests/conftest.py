@@ -0,0 +1,23 @@
+import warnings
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(params=["installed", "strict"])
+def fromstring(request, monkeypatch):
+    """
+    Runs a test with the installed NumPy, and with `np.fromstring()` raising on text it cannot parse like newer NumPy.
+    """
+    if request.param == "strict":
+        original = np.fromstring
+
+        def strict(*args, **kwargs):
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", DeprecationWarning)
+                try:
+                    return original(*args, **kwargs)
+                except DeprecationWarning as e:
+                    raise ValueError(str(e)) from e
+
+        monkeypatch.setattr(np, "fromstring", strict)
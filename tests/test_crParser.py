@@ -0,0 +1,79 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from use_the_force.crParser import CRParser
+
+
+def crOutput(n: int, start: int = 0) -> list[bytes]:
+    """
+    Lines of `CR` output, the time counts up from `start` and the force is ten times the time.
+    """
+    return [f"[CR]: {t},{10 * t}\n".encode() for t in range(start, start + n)]
+
+
+@pytest.mark.parametrize("n", [5, 40])
+def test_feed_whole_lines(n, fromstring):
+    parser = CRParser(size=4)
+
+    assert parser.feed(b"".join(crOutput(n))) == b""
+
+    times, forces = parser.samples
+    np.testing.assert_array_equal(times, np.arange(n))
+    np.testing.assert_allclose(forces, 10 * np.arange(n))
+    assert parser.lines == n
+    assert parser.skipped == 0
+
+
+def test_feed_keeps_partial_line():
+    data = b"".join(crOutput(40))
+    parser = CRParser()
+
+    for i in range(0, len(data), 7):
+        parser.feed(data[i : i + 7])
+
+    np.testing.assert_array_equal(parser.samples[0], np.arange(40))
+
+
+@pytest.mark.parametrize("n", [8, 40])
+def test_feed_skips_garbled_line(n, fromstring):
+    lines = crOutput(n)
+    lines[n // 2] = b"[CR]: 1x2,..3\n"
+    parser = CRParser()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        parser.feed(b"".join(lines))
+
+    expected = np.delete(np.arange(n), n // 2)
+    np.testing.assert_array_equal(parser.samples[0], expected)
+    np.testing.assert_allclose(parser.samples[1], 10 * expected)
+    assert parser.lines == n
+    assert parser.skipped == 1
+
+
+@pytest.mark.parametrize("n", [8, 40])
+def test_feed_stops_at_error(n, fromstring):
+    lines = crOutput(n)
+    lines[n // 2] = b"[ERROR]: movement aborted\n"
+    parser = CRParser()
+
+    leftover = parser.feed(b"".join(lines))
+
+    assert parser.error == "[ERROR]: movement aborted"
+    np.testing.assert_array_equal(parser.samples[0], np.arange(n // 2))
+    assert parser.lines == n // 2 + 1
+    assert leftover == b"".join(lines[n // 2 + 1 :])
+    # nothing is parsed after an error
+    assert parser.feed(b"".join(crOutput(2))) == b"".join(crOutput(2))
+    assert len(parser) == n // 2
+
+
+def test_feed_maxLines_returns_rest():
+    parser = CRParser()
+
+    leftover = parser.feed(b"".join(crOutput(40)) + b"[AB]: aborted\n", maxLines=40)
+
+    assert parser.lines == 40
+    assert leftover == b"[AB]: aborted\n"
@@ -0,0 +1,241 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from use_the_force.forceSensor import ForceSensor
+from use_the_force.framing import FramingError, ReplyTimeout
+
+# the simulator runs on a pseudo-terminal, which is Linux only
+SimulatedSensor = pytest.importorskip("use_the_force.simulator").SimulatedSensor
+
+
+@pytest.fixture
+def sim():
+    with SimulatedSensor(latency=0.002, seed=0) as sim:
+        yield sim
+
+
+@pytest.fixture
+def sensor(sim):
+    sensor = ForceSensor(sim.port, timeout=1)
+    yield sensor
+    sensor.ClosePort()
+
+
+def inject(sim, line: str) -> None:
+    """
+    Lets the simulated sensor send `line` on its own, outside of any reply.
+    """
+    os.write(sim._master, (line + "\n").encode())
+    # wait until the line can be read on the other end
+    time.sleep(0.02)
+
+
+def test_queue_sends_once_and_resolves_in_order(sim, sensor):
+    replies = [sensor.cmds.queue("SR") for _ in range(5)]
+    replies.append(sensor.cmds.queue("GV"))
+    assert sim.received == []
+
+    sensor.cmds.send()
+    # waiting on the last reply resolves all replies before it
+    assert replies[-1].result() == "[GV]: 60"
+    assert all(reply.done() for reply in replies)
+    assert [reply.result() for reply in replies[:-1]] == ["[SR]: 411023"] * 5
+    assert sim.received == ["#SR"] * 5 + ["#GV"]
+    assert len({reply.sent for reply in replies}) == 1
+    assert all(reply.received >= reply.sent for reply in replies)
+
+
+def test_SRBatch(sim, sensor):
+    assert sensor.cmds.SRBatch(10) == [411023.0] * 10
+    assert sensor.metrics["SR"].calls == 10
+
+
+def test_submit_and_drain(sim, sensor):
+    replies = [sensor.cmds.submit("GP") for _ in range(3)]
+    sensor.cmds.drain()
+
+    assert all(reply.done() for reply in replies)
+    assert replies[0].result() == "[GP]: -1"
+
+
+def test_error_reply(sensor):
+    with pytest.raises(RuntimeError, match="ERROR"):
+        sensor.cmds.customCmd("SV", 500)
+    assert sensor.metrics["SV"].errors == 1
+    # the next command is still matched to its own reply
+    assert sensor.cmds.GV() == 60
+
+
+def test_stale_line_is_dropped(sim, sensor):
+    inject(sim, "[GP]: 12")
+
+    assert sensor.cmds.SR() == 411023.0
+    assert sensor.cmds.framer.dropped == 1
+
+
+def test_unsolicited_error(sim):
+    errors = []
+    sensor = ForceSensor(sim.port, timeout=1, onUnsolicited=errors.append)
+    try:
+        inject(sim, "[ERROR]: motor stalled")
+
+        assert sensor.cmds.GV() == 60
+        assert errors == ["[ERROR]: motor stalled"]
+        assert sensor.cmds.framer.unsolicited == 1
+    finally:
+        sensor.ClosePort()
+
+
+def test_garbage_in_front_of_reply(sim, sensor):
+    sim.latency = 0.05
+    reply = sensor.cmds.submit("SR")
+    inject(sim, "#%&[GP]: 12")
+
+    # a line that is garbage up to the frame of another command is stale
+    assert reply.result() == "[SR]: 411023"
+    assert sensor.cmds.framer.resynced == 1
+    assert sensor.cmds.framer.dropped == 1
+
+
+def test_garbled_reply(sim, sensor):
+    sim.latency = 0.05
+    reply = sensor.cmds.submit("SR")
+    inject(sim, "411023")
+
+    with pytest.raises(FramingError):
+        reply.result()
+    assert sensor.cmds.framer.dropped == 1
+
+
+def test_garbled_replies_stay_in_step():
+    with SimulatedSensor(garbageRate=0.5, seed=1) as sim:
+        sensor = ForceSensor(sim.port, timeout=1)
+        try:
+            failed = 0
+            for _ in range(50):
+                try:
+                    assert sensor.cmds.GV() == 60
+                except FramingError:
+                    failed += 1
+            assert 0 < failed < 50
+
+            sim.garbageRate = 0
+            assert sensor.cmds.SR() == 411023.0
+            assert sensor.cmds.GP() == -1
+        finally:
+            sensor.ClosePort()
+
+
+def test_reply_timeout(sim, sensor):
+    sim.latency = 0.05
+    sensor.cmds.deadlines["SR"] = 0.005
+
+    with pytest.raises(ReplyTimeout):
+        sensor.cmds.SR()
+    assert sensor.metrics["SR"].errors == 1
+
+    # the late reply is dropped as stale, instead of answering the next command
+    time.sleep(0.1)
+    assert sensor.cmds.GV() == 60
+    assert sensor.cmds.framer.dropped == 1
+
+
+def test_timeout_in_queue(sim, sensor):
+    sim.latency = 0.05
+    sensor.cmds.deadlines["GV"] = 0.005
+    first = sensor.cmds.queue("GV")
+    second = sensor.cmds.queue("GP")
+    sensor.cmds.send()
+
+    with pytest.raises(ReplyTimeout):
+        first.result()
+    # the late reply on `GV` is dropped, the next reply still gets its own line
+    assert second.result() == "[GP]: -1"
+    assert sensor.cmds.framer.dropped == 1
+
+
+def test_cache(sim, sensor):
+    assert sensor.cmds.VR() == "[VR]: 1.0.0"
+    assert sensor.cmds.VR() == "[VR]: 1.0.0"
+    assert sensor.cmds.version == (1, 0, 0)
+    assert sim.received.count("#VR") == 1
+
+    # not cached by default
+    sensor.cmds.GV()
+    sensor.cmds.GV()
+    assert sim.received.count("#GV") == 2
+
+
+def test_cache_cleared_by_unsolicited_line(sim, sensor):
+    sensor.cmds.ID()
+    inject(sim, "[ERROR]: motor stalled")
+
+    sensor.cmds.ID()
+    assert sim.received.count("#ID") == 2
+
+
+def test_cache_cleared_by_error(sim, sensor):
+    sensor.cmds.ID()
+    sim.errorRate = 1
+    with pytest.raises(RuntimeError):
+        sensor.cmds.GV()
+    sim.errorRate = 0
+
+    sensor.cmds.ID()
+    assert sim.received.count("#ID") == 2
+
+
+def test_CRArrays(sim, sensor):
+    times, forces = sensor.cmds.CRArrays(20, 0)
+
+    assert len(times) == 21
+    assert np.all(np.diff(times) > 0)
+    np.testing.assert_array_equal(forces, 411023.0)
+    assert len(sensor.clockSync) == 1
+
+
+def test_CRArrays_with_reader(sim, sensor):
+    reader = sensor.startReader()
+    times, forces = sensor.cmds.CRArrays(20, 0)
+    sensor.stopReader()
+
+    assert len(times) == 21
+    # every block read is published to the ring buffer, except the first line
+    _, deviceTimes, _, _ = reader.samples.since(0)
+    np.testing.assert_array_equal(deviceTimes, times[1:])
+
+
+def test_stream_aborts_on_close(sim, sensor):
+    samples = sensor.stream(nReads=10)
+    times = []
+    for deviceTime, _ in samples:
+        times.append(deviceTime)
+        if len(times) == 25:
+            break
+    samples.close()
+
+    assert len(times) == 25
+    assert sim.received.count("#CR 10,0") == 3
+    assert sim.received[-1] == "#AB"
+    # nothing of the aborted chunk is left over for the next command
+    assert sensor.cmds.GV() == 60
+
+
+def test_record_and_replay(sim, sensor, tmp_path):
+    trace = str(tmp_path / "session.trace")
+    sensor.record(trace)
+    recorded = sensor.cmds.CRArrays(10, 0)
+    version = sensor.cmds.VR()
+    sensor.stopRecording()
+
+    replay = ForceSensor.replay(trace, realtime=False)
+    try:
+        replayed = replay.cmds.CRArrays(10, 0)
+        for expected, actual in zip(recorded, replayed):
+            np.testing.assert_array_equal(actual, expected)
+        assert replay.cmds.VR() == version
+    finally:
+        replay.ClosePort()
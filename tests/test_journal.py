@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+
+from use_the_force.journal import SessionJournal, recoverSession
+
+
+def journal(directory, columns) -> SessionJournal:
+    """
+    Journal of `columns`, checkpointed by hand.
+    """
+    return SessionJournal(
+        lambda start: [column[start:] for column in columns],
+        directory=str(directory),
+        interval=3600,
+    )
+
+
+def test_recover_checkpoints(tmp_path):
+    columns = [[], [], []]
+    session = journal(tmp_path / "RECOVERY", columns)
+    session.start()
+    for start in (0, 10):
+        for i in range(start, start + 10):
+            for column in columns:
+                column.append(float(i))
+        assert session.checkpoint() == 10
+    # a row that is only partly appended waits for the next checkpoint
+    columns[0].append(20.0)
+    assert session.checkpoint() == 0
+
+    manifest, recovered = recoverSession(str(tmp_path / "RECOVERY"))
+    assert manifest["header"] == "Time,Displacement,Force"
+    for column in recovered:
+        np.testing.assert_array_equal(column, np.arange(20))
+    session.stop(discard=True)
+    assert recoverSession(str(tmp_path / "RECOVERY")) is None
+
+
+def test_recover_torn_checkpoint(tmp_path):
+    columns = [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]
+    session = journal(tmp_path / "RECOVERY", columns)
+    session.start()
+    session.checkpoint()
+    for column in columns:
+        column.append(7.0)
+    session.stop()
+
+    # cut off the last checkpoint, like a crash while writing it
+    segment = tmp_path / "RECOVERY" / "segment_000000.wal"
+    segment.write_bytes(segment.read_bytes()[:-4])
+
+    _, recovered = recoverSession(str(tmp_path / "RECOVERY"), str(tmp_path / "recovered.csv"))
+    np.testing.assert_array_equal(recovered[0], [1.0, 2.0])
+    assert (tmp_path / "recovered.csv").exists()
+    assert not (tmp_path / "RECOVERY").exists()
+
+
+def test_start_moves_unrecovered_session_aside(tmp_path):
+    first = journal(tmp_path / "RECOVERY", [[1.0], [2.0], [3.0]])
+    first.start()
+    first.stop()
+
+    second = journal(tmp_path / "RECOVERY", [[], [], []])
+    second.start()
+    second.stop(discard=True)
+
+    assert second.movedAside is not None
+    assert os.path.dirname(second.movedAside) == str(tmp_path)
+    _, recovered = recoverSession(second.movedAside)
+    np.testing.assert_array_equal(recovered[2], [3.0])
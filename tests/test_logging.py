@@ -0,0 +1,41 @@
+import numpy as np
+
+from use_the_force._logging import Logging, parseCSV
+
+
+def test_readLog_roundtrip(tmp_path):
+    log = Logging(str(tmp_path / "log.csv"))
+    log.createLogGUI()
+    log.writeLogFull([[0.0, 0.5, 1.0], [1.0, 2.0, 3.0], [0.25, -0.5, 12.345]])
+    log.writeLog([1.5, 4.0, 7.0])
+    log.closeFile()
+
+    blocks = list(Logging().readLog(filename=log.full_filename, chunkRows=2))
+
+    columns = [np.concatenate(column) for column in zip(*blocks)]
+    np.testing.assert_allclose(columns[0], [0.0, 0.5, 1.0, 1.5])
+    np.testing.assert_allclose(columns[1], [1.0, 2.0, 3.0, 4.0])
+    np.testing.assert_allclose(columns[2], [0.25, -0.5, 12.345, 7.0])
+
+
+def test_readLog_window(tmp_path):
+    log = Logging(str(tmp_path / "log.csv"))
+    log.createLogGUI()
+    log.writeLogFull([list(range(10)), list(range(10)), list(range(10))])
+    log.closeFile()
+
+    blocks = list(Logging().readLog(filename=log.full_filename, start=2, end=5))
+
+    np.testing.assert_allclose(np.concatenate([block[0] for block in blocks]), [2, 3, 4, 5])
+
+
+def test_parseCSV_skips_bad_lines():
+    lines = ["0,1,2\n", "Time,Displacement,Force\n", "1,2\n", "3,4,5\n"]
+
+    np.testing.assert_allclose(parseCSV(lines, 3), [[0, 1, 2], [3, 4, 5]])
+
+
+def test_parseCSV_special_values():
+    lines = ["nan,-inf,1e-05\n", " 1, 2 ,3\r\n", "4,5,6,7\n"]
+
+    np.testing.assert_allclose(parseCSV(lines, 3), [[np.nan, -np.inf, 1e-05], [1, 2, 3]])